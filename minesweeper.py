@@ -1,4 +1,9 @@
+import os
 import random
+import sys
+from array import array
+from collections import defaultdict, deque
+from functools import lru_cache
 
 
 # Fraction of cells that will be mines based on difficulty
@@ -6,6 +11,26 @@ EASY_DIFFICULTY = 0.1
 MEDIUM_DIFFICULTY = 0.3
 HARD_DIFFICULTY = 0.5
 
+# Small integer codes used by the compact boards for the game board cells.
+# Revealed cells store their number of adjacent mines (0 to 8).
+UNKNOWN_CODE = -2
+FLAG_CODE = -3
+
+# Code of each game board cell, see encode_cell()
+CELL_CODES = {'?': UNKNOWN_CODE, '\u2691': FLAG_CODE}
+CELL_CODES.update((str(count), count) for count in range(9))
+
+# Neighbour tables are cached for the last few board shapes, but only for
+# boards up to this many cells: a table takes about 700 bytes per cell, a
+# lot more than the board itself, so bigger boards compute the neighbours
+# when asked. At this size the cached tables stay under about 120 MB.
+NEIGHBOUR_TABLE_MAX_CELLS = 40000
+NEIGHBOUR_TABLE_CACHE_SIZE = 4
+
+# Set to a dictionary to have solve() add up the work done by its loop in
+# it, by name (see minesweeper_profile). Left to None, nothing is added.
+SOLVER_COUNTERS = None
+
 
 def init_board(nb_rows, nb_cols, value):
     """
@@ -42,6 +67,31 @@ def init_board(nb_rows, nb_cols, value):
     return board
 
 
+def array_backend(board):
+    """
+    Get the NumPy backend if a board is a NumPy array.
+
+    NumPy isn't imported here: a board can only be an array if NumPy was
+    already imported, so the game runs without it.
+
+    Parameters:
+        board: Any game board or helper board.
+
+    Returns:
+        backend (module): minesweeper_numpy for an array, else None.
+
+    Examples:
+        >>> array_backend([['?']]) is None
+        True
+    """
+
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(board, numpy.ndarray):
+        import minesweeper_numpy
+        return minesweeper_numpy
+    return None
+
+
 def count_total(board, value):
     """
     Count how many times a given value appears on the board.
@@ -53,6 +103,8 @@ def count_total(board, value):
     Returns:
         count (int): Number of occurrences of the value.
 
+    On a NumPy game board, '?' and '⚑' count the cells with their codes.
+
     Examples:
         >>> count_total([[0, 1], [1, 0]], 1)
         2
@@ -62,6 +114,17 @@ def count_total(board, value):
         3
     """
 
+    # Boards that keep their own counts (like the compact or chunked
+    # boards) are asked directly instead of being scanned
+    count_method = getattr(board, 'count_total', None)
+    if count_method is not None:
+        return count_method(value)
+
+    backend = array_backend(board)
+    if backend is not None:
+        return backend.count_total_array(board, CELL_CODES.get(value, value)
+                                         if isinstance(value, str) else value)
+
     # Initialize counter
     count = 0
 
@@ -77,6 +140,58 @@ def count_total(board, value):
     return count
 
 
+def encode_cell(value):
+    """
+    Convert a game board cell to its small integer code.
+
+    Parameters:
+        value (str): '?', '⚑' or a revealed number like '3'.
+
+    Returns:
+        code (int): UNKNOWN_CODE, FLAG_CODE or the revealed number.
+
+    Examples:
+        >>> encode_cell('?')
+        -2
+        >>> encode_cell('⚑')
+        -3
+        >>> encode_cell('3')
+        3
+    """
+
+    if value == '?':
+        return UNKNOWN_CODE
+    elif value == '\u2691':
+        return FLAG_CODE
+    return int(value)
+
+
+def decode_cell(code):
+    """
+    Convert a small integer code back to the game board cell it stands for.
+
+    Parameters:
+        code (int): UNKNOWN_CODE, FLAG_CODE or a revealed number.
+
+    Returns:
+        value (str): '?', '⚑' or the revealed number as a string.
+
+    Examples:
+        >>> decode_cell(-2)
+        '?'
+        >>> decode_cell(-3)
+        '⚑'
+        >>> decode_cell(0)
+        '0'
+    """
+
+    if code == UNKNOWN_CODE:
+        return '?'
+    elif code == FLAG_CODE:
+        return '\u2691'
+    return str(code)
+
+
 def is_valid_position(board, row, col):
     """
     Check if a (row, col) position is part of the board.
@@ -102,6 +217,198 @@ def is_valid_position(board, row, col):
     return 0 <= row < len(board) and 0 <= col < len(board[0])
 
 
+def compute_neighbours(nb_rows, nb_cols, row, col):
+    """
+    Compute the neighbour positions of a cell on a board of a given shape.
+
+    Parameters:
+        nb_rows (int): Number of rows of the board.
+        nb_cols (int): Number of columns of the board.
+        row (int): Row index of the central cell.
+        col (int): Column index of the central cell.
+
+    Returns:
+        neighbours (tuple): Tuple of (row, col) pairs of neighbours.
+
+    Examples:
+        >>> compute_neighbours(2, 2, 0, 0)
+        ((0, 1), (1, 0), (1, 1))
+        >>> compute_neighbours(1, 3, 0, 1)
+        ((0, 0), (0, 2))
+    """
+
+    neighbours = []
+
+    # The neighbours' coordinates can either be the same, be one more, or one
+    # less than the ones of the cell, as long as they are on the board.
+    for i in range(max(row - 1, 0), min(row + 2, nb_rows)):
+        for j in range(max(col - 1, 0), min(col + 2, nb_cols)):
+            if i != row or j != col:
+                neighbours.append((i, j))
+
+    return tuple(neighbours)
+
+
+@lru_cache(maxsize=NEIGHBOUR_TABLE_CACHE_SIZE)
+def neighbour_table(nb_rows, nb_cols):
+    """
+    Precompute the neighbours of every cell for one board shape.
+
+    The result is cached for the last NEIGHBOUR_TABLE_CACHE_SIZE shapes.
+    It is immutable, so it can safely be shared by every board of that
+    shape.
+
+    Parameters:
+        nb_rows (int): Number of rows of the board.
+        nb_cols (int): Number of columns of the board.
+
+    Returns:
+        table (tuple): table[row][col] is the tuple of (row, col) pairs
+                       of the neighbours of that cell.
+
+    Examples:
+        >>> neighbour_table(2, 2)[1][1]
+        ((0, 0), (0, 1), (1, 0))
+        >>> neighbour_table(2, 2) is neighbour_table(2, 2)
+        True
+    """
+
+    return tuple(tuple(compute_neighbours(nb_rows, nb_cols, row, col)
+                       for col in range(nb_cols))
+                 for row in range(nb_rows))
+
+
+@lru_cache(maxsize=NEIGHBOUR_TABLE_CACHE_SIZE)
+def flat_neighbour_table(nb_rows, nb_cols):
+    """
+    Precompute the neighbours of every cell as flat indices.
+
+    Cell (row, col) has the flat index row * nb_cols + col.
+
+    Parameters:
+        nb_rows (int): Number of rows of the board.
+        nb_cols (int): Number of columns of the board.
+
+    Returns:
+        table (tuple): table[index] is the tuple of the flat indices of
+                       the neighbours of that cell.
+
+    Examples:
+        >>> flat_neighbour_table(2, 3)[0]
+        (1, 3, 4)
+        >>> flat_neighbour_table(2, 3)[4]
+        (0, 1, 2, 3, 5)
+    """
+
+    table = []
+    for row in range(nb_rows):
+        for col in range(nb_cols):
+            table.append(tuple(i * nb_cols + j for i, j
+                               in compute_neighbours(nb_rows, nb_cols,
+                                                     row, col)))
+
+    return tuple(table)
+
+
+class _ComputedNeighbourTable:
+    """
+    Stand-in for neighbour_table() on boards too big to cache a table.
+
+    table[row][col] gives the same tuples, computed on each access.
+    """
+
+    __slots__ = ('nb_rows', 'nb_cols')
+
+    def __init__(self, nb_rows, nb_cols):
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+
+    def __getitem__(self, row):
+        return _ComputedNeighbourRow(self.nb_rows, self.nb_cols, row)
+
+
+class _ComputedNeighbourRow:
+    __slots__ = ('nb_rows', 'nb_cols', 'row')
+
+    def __init__(self, nb_rows, nb_cols, row):
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+        self.row = row
+
+    def __getitem__(self, col):
+        return compute_neighbours(self.nb_rows, self.nb_cols, self.row, col)
+
+
+def get_neighbour_table(board):
+    """
+    Get the neighbour table to use for a board.
+
+    Boards up to NEIGHBOUR_TABLE_MAX_CELLS cells use the cached
+    neighbour_table() of their shape. Bigger boards get a table that
+    computes the neighbours on each access instead.
+
+    Parameters:
+        board (list): A list of lists representing the board.
+
+    Returns:
+        table: Indexed as table[row][col], giving (row, col) pairs.
+
+    Examples:
+        >>> get_neighbour_table([[0, 0], [0, 0]])[0][0]
+        ((0, 1), (1, 0), (1, 1))
+    """
+
+    nb_rows = len(board)
+    nb_cols = len(board[0])
+
+    if nb_rows * nb_cols <= NEIGHBOUR_TABLE_MAX_CELLS:
+        return neighbour_table(nb_rows, nb_cols)
+    return _ComputedNeighbourTable(nb_rows, nb_cols)
+
+
+def flat_neighbours(nb_rows, nb_cols):
+    """
+    Get a function giving the neighbours of a cell by flat index.
+
+    Boards up to NEIGHBOUR_TABLE_MAX_CELLS cells look them up in the
+    cached flat_neighbour_table() of their shape, bigger boards compute
+    them on each call.
+
+    Parameters:
+        nb_rows (int): Number of rows of the board.
+        nb_cols (int): Number of columns of the board.
+
+    Returns:
+        neighbours (callable): Gives the tuple of the flat indices of the
+                               neighbours of a flat index.
+
+    Examples:
+        >>> flat_neighbours(2, 3)(4)
+        (0, 1, 2, 3, 5)
+        >>> flat_neighbours(1000, 1000)(1001)
+        (0, 1, 2, 1000, 1002, 2000, 2001, 2002)
+    """
+
+    if nb_rows * nb_cols <= NEIGHBOUR_TABLE_MAX_CELLS:
+        return flat_neighbour_table(nb_rows, nb_cols).__getitem__
+
+    # Index differences to the 8 neighbours of a cell inside the board
+    offsets = (-nb_cols - 1, -nb_cols, -nb_cols + 1, -1,
+               1, nb_cols - 1, nb_cols, nb_cols + 1)
+
+    def neighbours(index):
+        row, col = divmod(index, nb_cols)
+
+        # Cells away from the edges use the offsets directly
+        if 0 < row < nb_rows - 1 and 0 < col < nb_cols - 1:
+            return tuple(map(index.__add__, offsets))
+
+        return tuple(i * nb_cols + j for i, j
+                     in compute_neighbours(nb_rows, nb_cols, row, col))
+
+    return neighbours
+
+
 def get_neighbour_positions(board, row, col):
     """
     Get all the valid neighbour positions around a cell.
@@ -109,6 +416,9 @@ def get_neighbour_positions(board, row, col):
     Neighbours include up to 8 surrounding cells (horizontally,
     vertically, and diagonally).
 
+    The engine itself reads get_neighbour_table() directly, which
+    doesn't build a new list on each call.
+
     Parameters:
         board (list): A list of lists representing the board.
         row (int): Row index of the central cell.
@@ -127,22 +437,8 @@ def get_neighbour_positions(board, row, col):
         >>> get_neighbour_positions([[0, 0], [0, 0]], 1, 1)
         [[0, 0], [0, 1], [1, 0]]
     """
-    neighbour_positions = []
-
-    # The neighbours' coordinates can either be the same, be one more, or one
-    # less than the ones of the cell.
-    for i in range(-1, 2):
-        for j in range(-1, 2):
-
-            # If the neighbouring positon is part of the board, and it's not
-            # the position of the original cell, add it to the list.
-            if (is_valid_position(board, row + i, col + j)
-                    and (i != 0 or j != 0)):
 
-                neighbour_positions.append([row + i, col + j])
-
-    # Return the list of positions
-    return neighbour_positions
+    return [list(pos) for pos in get_neighbour_table(board)[row][col]]
 
 
 def count_neighbours(board, row, col, value):
@@ -169,26 +465,27 @@ def count_neighbours(board, row, col, value):
         >>> count_neighbours(b, 2, 0, 1)
         2
     """
-    neighbours = get_neighbour_positions(board, row, col)
+    neighbours = get_neighbour_table(board)[row][col]
 
     count = 0
 
     # Go through every neighbouring cell
-    for pos in neighbours:
+    for i, j in neighbours:
 
         # Add 1 if it contains the value
-        if board[pos[0]][pos[1]] == value:
+        if board[i][j] == value:
             count += 1
 
     return count
 
 
-def new_mine_position(board):
+def new_mine_position(board, rng=None):
     """
     Pick a random position on the board that does not already contain a mine.
 
     Parameters:
         board (list): Helper board containing mine locations.
+        rng (Random): Random generator to use, the random module by default.
 
     Returns:
         position (tuple): A pair (row, col) for a free cell.
@@ -205,10 +502,13 @@ def new_mine_position(board):
         (0, 0)
     """
 
+    if rng is None:
+        rng = random
+
     # Loop until the position isn't already a mine
     while True:
-        rand_row = random.randint(0, len(board)-1)
-        rand_col = random.randint(0, len(board[0])-1)
+        rand_row = rng.randint(0, len(board)-1)
+        rand_col = rng.randint(0, len(board[0])-1)
 
         # Stop and return once the new mine position is created
         if board[rand_row][rand_col] != -1:
@@ -252,23 +552,195 @@ def new_mine(board):
     board[row][col] = -1
 
     # Add 1 to the number of adjacent mines for all neighbours
-    adj_pos = get_neighbour_positions(board, row, col)
-    for pos in adj_pos:
-        if board[pos[0]][pos[1]] != -1:
-            board[pos[0]][pos[1]] += 1
+    for i, j in get_neighbour_table(board)[row][col]:
+        if board[i][j] != -1:
+            board[i][j] += 1
+
+
+def place_mines(board, nb_mines, rng=None):
+    """
+    Place mines at random free positions without updating any counts.
+
+    The positions are drawn with new_mine_position() in the same order as
+    new_mine() would, so a given random seed gives the same mines.
+
+    Parameters:
+        board (list): Helper board to place the mines on.
+        nb_mines (int): Number of mines to place.
+        rng (Random): Random generator to use, the random module by default.
+
+    Returns:
+        None
+
+    Examples:
+        >>> random.seed(3)
+        >>> b = init_board(2, 3, 0)
+        >>> place_mines(b, 2)
+        >>> count_total(b, -1)
+        2
+        >>> count_total(b, 0)
+        4
+    """
+
+    for _ in range(nb_mines):
+        row, col = new_mine_position(board, rng)
+        board[row][col] = -1
+
+
+def fill_neighbour_counts(board):
+    """
+    Write the number of adjacent mines in every safe cell, in a single pass.
+
+    Parameters:
+        board (list): Helper board where mines are already marked with -1.
+
+    Returns:
+        None
+
+    Examples:
+        >>> b = [[-1, 0, 0], [0, 0, -1]]
+        >>> fill_neighbour_counts(b)
+        >>> b
+        [[-1, 2, 1], [1, 2, -1]]
+        >>> b = [[0, 0], [0, 0]]
+        >>> fill_neighbour_counts(b)
+        >>> b
+        [[0, 0], [0, 0]]
+    """
+
+    # The 3x3 area around a cell is read with slices of the rows around
+    # it, which needs no neighbour table. The cell itself isn't a mine, so
+    # it doesn't change the count, and counts written so far are never -1.
+    for i in range(len(board)):
+        row = board[i]
+        rows_around = board[max(i - 1, 0):i + 2]
+        for j in range(len(row)):
+            if row[j] != -1:
+                start = max(j - 1, 0)
+                count = 0
+                for around in rows_around:
+                    count += around[start:j + 2].count(-1)
+                row[j] = count
+
+
+def sample_mine_positions(nb_rows, nb_cols, nb_mines, excluded=(), rng=None):
+    """
+    Pick distinct random mine positions without ever drawing a mine twice.
+
+    The cells are numbered row by row and a partial Fisher-Yates shuffle
+    is done over those numbers. Only the swapped numbers are stored in a
+    dictionary, so each mine costs one random draw no matter how full the
+    board gets.
+
+    Parameters:
+        nb_rows (int): Number of rows.
+        nb_cols (int): Number of columns.
+        nb_mines (int): Number of mines to place.
+        excluded (iterable): (row, col) positions that can't be mines.
+        rng (Random): Random generator to use, the random module by default.
+
+    Returns:
+        positions (list): List of nb_mines distinct (row, col) pairs.
+
+    Examples:
+        >>> random.seed(0)
+        >>> sample_mine_positions(2, 2, 4)
+        [(1, 1), (1, 0), (0, 1), (0, 0)]
+        >>> random.seed(1)
+        >>> sorted(sample_mine_positions(3, 3, 8, [(1, 1)]))
+        [(0, 0), (0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)]
+        >>> sample_mine_positions(2, 2, 5)
+        Traceback (most recent call last):
+        ...
+        ValueError: Can't place 5 mines on 4 free cells
+    """
+
+    nb_cells = nb_rows * nb_cols
+    excluded_cells = {row * nb_cols + col for row, col in excluded}
+    nb_free = nb_cells - len(excluded_cells)
+
+    if nb_mines < 0 or nb_mines > nb_free:
+        raise ValueError("Can't place " + str(nb_mines) + " mines on "
+                         + str(nb_free) + " free cells")
+
+    # Only the first nb_free cell numbers are shuffled, so every excluded
+    # cell in that range is swapped with a free cell from the end.
+    swapped = {}
+    tail = nb_free
+    for cell in sorted(excluded_cells):
+        if cell < nb_free:
+            while tail in excluded_cells:
+                tail += 1
+            swapped[cell] = tail
+            tail += 1
+
+    if rng is None:
+        rng = random
 
+    positions = []
+    for i in range(nb_mines):
+        # Swap a random remaining cell into position i
+        j = rng.randrange(i, nb_free)
+        cell = swapped.get(j, j)
+        swapped[j] = swapped.get(i, i)
 
-def generate_helper_board(nb_rows, nb_cols, nb_mines):
+        positions.append(divmod(cell, nb_cols))
+
+    return positions
+
+
+def safe_zone(nb_rows, nb_cols, row, col):
+    """
+    Get the 3x3 area around a cell that must stay free of mines.
+
+    Parameters:
+        nb_rows (int): Number of rows.
+        nb_cols (int): Number of columns.
+        row (int): Row index of the first revealed cell.
+        col (int): Column index of the first revealed cell.
+
+    Returns:
+        zone (list): The (row, col) pairs of the cell and its neighbours.
+
+    Examples:
+        >>> safe_zone(3, 3, 1, 1)
+        [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2)]
+        >>> safe_zone(4, 4, 0, 0)
+        [(0, 0), (0, 1), (1, 0), (1, 1)]
+        >>> safe_zone(1, 3, 0, 2)
+        [(0, 1), (0, 2)]
+    """
+
+    zone = []
+    for i in range(max(row - 1, 0), min(row + 2, nb_rows)):
+        for j in range(max(col - 1, 0), min(col + 2, nb_cols)):
+            zone.append((i, j))
+
+    return zone
+
+
+def generate_helper_board(nb_rows, nb_cols, nb_mines, excluded=None,
+                          lazy=False, rng=None):
     """
     Generate the helper board containing mines and neighbour counts.
 
     The helper board stores -1 for mines and integers for the number
     of adjacent mines in each safe cell.
 
+    Up to HARD_DIFFICULTY, mines are picked with new_mine_position() so
+    seeded boards stay the same as before. Denser boards, and boards with
+    excluded cells, use sample_mine_positions() instead.
+
+    With lazy=True, a LazyHelperBoard with the same mines is returned
+    instead, which only counts the neighbours of the cells that are read.
+
     Parameters:
         nb_rows (int): Number of rows.
         nb_cols (int): Number of columns.
         nb_mines (int): Number of mines to place.
+        excluded (list): Optional (row, col) positions that can't be mines.
+        lazy (bool): Whether to return a LazyHelperBoard.
+        rng (Random): Random generator to use, the random module by default.
 
     Returns:
         board (list): The fully initialized helper board.
@@ -286,28 +758,215 @@ def generate_helper_board(nb_rows, nb_cols, nb_mines):
         >>> h = generate_helper_board(1, 4, 1)
         >>> count_total(h, -1)
         1
+        >>> random.seed(3)
+        >>> h = generate_helper_board(3, 3, 8, [(0, 0)])
+        >>> h[0][0]
+        3
     """
 
+    if lazy:
+        return LazyHelperBoard(nb_rows, nb_cols, nb_mines, excluded, rng)
+
     # Generate a board filled with 0
     board = init_board(nb_rows, nb_cols, 0)
 
-    # Generate the board with the chosen amount of mines
-    for n in range(nb_mines):
-        # I wasn't sure if I should've used 'for _ in range(nb_mines):'
-        # because i forgot if we saw it in class.
-
-        # Add the mine
-        new_mine(board)
+    # Place every mine first, then count the neighbours only once at the end
+    # instead of recounting the whole board after each new mine.
+    if not excluded and nb_mines <= HARD_DIFFICULTY * nb_rows * nb_cols:
+        place_mines(board, nb_mines, rng)
+    else:
+        for row, col in sample_mine_positions(nb_rows, nb_cols, nb_mines,
+                                              excluded or (), rng):
+            board[row][col] = -1
 
-        # Update the value of the neighbouring cells
-        for i in range(len(board)):
-            for j in range(len(board[i])):
-                if board[i][j] != -1:
-                    board[i][j] = count_neighbours(board, i, j, -1)
+    fill_neighbour_counts(board)
 
     return board
 
 
+class LazyHelperBoard:
+    """
+    A helper board that only stores its mines and counts cells when read.
+
+    The mines are drawn like generate_helper_board() draws them, so a
+    given random seed gives the same board, but only their positions are
+    kept. The number of a safe cell is counted the first time the cell
+    is read, and cached. Creating the board costs time in the number of
+    mines, and playing it costs time in the number of cells read, which
+    is much less than the whole board in short or lost games.
+
+    board[row][col] reads cells like the list of lists helper boards, so
+    reveal(), reveal_cascade() and the solver work with it.
+
+    Examples:
+        >>> random.seed(5)
+        >>> h = LazyHelperBoard(4, 5, 6)
+        >>> h[1][2], h.computed()
+        (4, 1)
+        >>> random.seed(5)
+        >>> h.to_lists() == generate_helper_board(4, 5, 6)
+        True
+        >>> count_total(h, -1), len(h), len(h[0])
+        (6, 4, 5)
+    """
+
+    def __init__(self, nb_rows, nb_cols, nb_mines, excluded=None, rng=None):
+        """
+        Place the mines, without counting any neighbours.
+
+        Parameters:
+            nb_rows (int): Number of rows.
+            nb_cols (int): Number of columns.
+            nb_mines (int): Number of mines to place.
+            excluded (list): Optional (row, col) positions that can't be
+                             mines.
+            rng (Random): Random generator to use, the random module by
+                          default.
+        """
+
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+        self.num_mines = nb_mines
+
+        # Cell numbers (row * nb_cols + col) of the mines, and the
+        # neighbour counts computed so far by cell number
+        self.mines = set()
+        self.counts = {}
+
+        if rng is None:
+            rng = random
+
+        if not excluded and nb_mines <= HARD_DIFFICULTY * nb_rows * nb_cols:
+            # Same draws as new_mine_position()
+            for _ in range(nb_mines):
+                while True:
+                    row = rng.randint(0, nb_rows - 1)
+                    col = rng.randint(0, nb_cols - 1)
+                    if row * nb_cols + col not in self.mines:
+                        break
+                self.mines.add(row * nb_cols + col)
+        else:
+            for row, col in sample_mine_positions(nb_rows, nb_cols, nb_mines,
+                                                  excluded or (), rng):
+                self.mines.add(row * nb_cols + col)
+
+    def __len__(self):
+        return self.nb_rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.nb_rows:
+            raise IndexError("board row out of range")
+        return _LazyHelperRow(self, row)
+
+    def is_mine(self, row, col):
+        """
+        Check if a cell is a mine, without counting its neighbours.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            mine (bool): True if there is a mine on the cell.
+        """
+
+        return row * self.nb_cols + col in self.mines
+
+    def value(self, row, col):
+        """
+        Get the helper board value of a cell: -1 or its neighbour count.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            value (int): -1 for a mine, the number of adjacent mines otherwise.
+        """
+
+        nb_cols = self.nb_cols
+        cell = row * nb_cols + col
+        mines = self.mines
+        if cell in mines:
+            return -1
+
+        count = self.counts.get(cell)
+        if count is None:
+            count = 0
+            for i, j in compute_neighbours(self.nb_rows, nb_cols, row, col):
+                if i * nb_cols + j in mines:
+                    count += 1
+            self.counts[cell] = count
+
+        return count
+
+    def count_total(self, value):
+        """
+        Count the cells with a value, see count_total().
+
+        Mines are counted from the stored positions. Any other value needs
+        every count, so the whole board is computed.
+
+        Parameters:
+            value (int): -1 or a neighbour count.
+
+        Returns:
+            count (int): Number of cells with that value.
+        """
+
+        if value == -1:
+            return len(self.mines)
+
+        count = 0
+        for row in range(self.nb_rows):
+            for col in range(self.nb_cols):
+                if self.value(row, col) == value:
+                    count += 1
+        return count
+
+    def computed(self):
+        """
+        Get the number of neighbour counts computed so far.
+
+        Returns:
+            count (int): Number of safe cells in the cache.
+        """
+
+        return len(self.counts)
+
+    def to_lists(self):
+        """
+        Get the whole helper board as a list of lists.
+
+        Returns:
+            board (list): Same board as generate_helper_board() gives.
+        """
+
+        board = init_board(self.nb_rows, self.nb_cols, 0)
+        for cell in self.mines:
+            row, col = divmod(cell, self.nb_cols)
+            board[row][col] = -1
+        fill_neighbour_counts(board)
+
+        return board
+
+
+class _LazyHelperRow:
+    __slots__ = ('board', 'row')
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.nb_cols
+
+    def __getitem__(self, col):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        return self.board.value(self.row, col)
+
+
 def flag(board, row, col):
     """
     Switch between '?' and '⚑' on the game board
@@ -336,6 +995,10 @@ def flag(board, row, col):
         [['?', '?'], ['⚑', '?']]
     """
 
+    backend = array_backend(board)
+    if backend is not None:
+        return backend.flag_array(board, row, col)
+
     # Switch between '?' and '⚑' on the game board
     if board[row][col] == '?':
         board[row][col] = '\u2691'
@@ -343,7 +1006,7 @@ def flag(board, row, col):
         board[row][col] = '?'
 
 
-def reveal(helper_board, game_board, row, col):
+def reveal(helper_board, game_board, row, col, cascade=False):
     """
     Reveal the value of a cell on the visible game board.
 
@@ -351,14 +1014,20 @@ def reveal(helper_board, game_board, row, col):
     AssertionError is raised. Otherwise the number of adjacent
     mines is revealed on the game board.
 
+    With cascade=True, a revealed 0 also opens every connected 0 and
+    the numbers around them (see reveal_cascade()).
+
+    NumPy boards are revealed with minesweeper_numpy.
+
     Parameters:
         helper_board (list): Board with mine locations and counts.
         game_board (list): Visible board shown to the player.
         row (int): Row index to reveal.
         col (int): Column index to reveal.
+        cascade (bool): Whether to open the zero region around the cell.
 
     Returns:
-        None
+        None, or with cascade the list of newly revealed (row, col) pairs.
 
     Examples:
         >>> h = [[0, 1], [-1, 2]]
@@ -370,23 +1039,126 @@ def reveal(helper_board, game_board, row, col):
         >>> g
         [['0', '1'], ['?', '?']]
         >>> # reveal(h, g, 1, 0)  # would raise AssertionError ("BOOM! You lost.")
+        >>> reveal([[0, 1, -1]], [['?', '?', '?']], 0, 0, True)
+        [(0, 0), (0, 1)]
     """
 
+    # NumPy boards store codes, so they are revealed by their backend
+    backend = array_backend(game_board)
+    if backend is not None:
+        if cascade:
+            return backend.reveal_cascade_array(helper_board, game_board,
+                                                row, col)
+        return backend.reveal_array(helper_board, game_board, row, col)
+
     # If that cell is a bomb, the game is lost
     if helper_board[row][col] == -1:
         raise AssertionError("BOOM! You lost.")
 
+    # Open the whole zero region if asked to
+    elif cascade:
+        return reveal_cascade(helper_board, game_board, row, col)
+
     # If not, replace '?' with the value on the helper board
     else:
         game_board[row][col] = str(helper_board[row][col])
 
 
-def print_board(board):
+def reveal_cascade(helper_board, game_board, row, col):
+    """
+    Reveal a cell and, if it is a 0, every cell connected to it by 0s.
+
+    The region is explored with a queue instead of recursion, so it works
+    on any board size, and each cell is revealed at most once. Flagged
+    cells are left as they are, except the chosen cell itself.
+
+    Parameters:
+        helper_board (list): Board with mine locations and counts.
+        game_board (list): Visible board shown to the player.
+        row (int): Row index to reveal.
+        col (int): Column index to reveal.
+
+    Returns:
+        revealed (list): The (row, col) pairs of the newly revealed cells.
+
+    Examples:
+        >>> h = [[0, 0, 1], [1, 1, 2], [1, -1, -1]]
+        >>> g = init_board(3, 3, '?')
+        >>> reveal_cascade(h, g, 0, 0)
+        [(0, 0), (0, 1), (1, 0), (1, 1), (0, 2), (1, 2)]
+        >>> g
+        [['0', '0', '1'], ['1', '1', '2'], ['?', '?', '?']]
+        >>> reveal_cascade(h, g, 0, 0)
+        []
+    """
+
+    # If that cell is a bomb, the game is lost
+    if helper_board[row][col] == -1:
+        raise AssertionError("BOOM! You lost.")
+
+    # Nothing new if the cell is already revealed
+    if game_board[row][col] not in ('?', '\u2691'):
+        return []
+
+    nb_rows = len(game_board)
+    nb_cols = len(game_board[0])
+
+    game_board[row][col] = str(helper_board[row][col])
+    revealed = [(row, col)]
+    queue = deque(revealed)
+
+    while queue:
+        i, j = queue.popleft()
+
+        # Only the neighbours of a 0 are sure to be safe
+        if helper_board[i][j] != 0:
+            continue
+
+        # The neighbours are walked with the row bounds directly, since the
+        # region can be much bigger than a cached neighbour table
+        for k in range(max(i - 1, 0), min(i + 2, nb_rows)):
+            game_row = game_board[k]
+            helper_row = helper_board[k]
+            for l in range(max(j - 1, 0), min(j + 2, nb_cols)):
+                if game_row[l] == '?':
+                    # Reveal when queued so a cell is never added twice
+                    game_row[l] = str(helper_row[l])
+                    revealed.append((k, l))
+                    queue.append((k, l))
+
+    return revealed
+
+
+def format_board(board):
+    """
+    Build the text of the whole board, one line per row.
+
+    Parameters:
+        board (list): A list of lists representing the board.
+
+    Returns:
+        text (str): The rows, with the values separated by spaces.
+
+    Examples:
+        >>> format_board([[0, 1], [2, 3]]).split()
+        ['0', '1', '2', '3']
+        >>> format_board([['?', '⚑']])
+        '? ⚑'
+    """
+
+    return "\n".join(" ".join(str(value) for value in row) for row in board)
+
+
+def print_board(board, file=None):
     """
     Print the board to the console, row by row.
 
+    The whole board is built as one string first and written at once,
+    instead of printing every cell separately.
+
     Parameters:
         board (list): A list of lists representing the board.
+        file (file): Where to write, the console by default.
 
     Returns:
         None
@@ -403,26 +1175,122 @@ def print_board(board):
         False
     """
 
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            # Print the values with a space, without going to next line
-            print(board[i][j], end=" ")
+    if file is None:
+        file = sys.stdout
+    file.write(format_board(board) + "\n")
+
 
-        # Go to next line after each row
-        print("")
+def print_changes(board, cells, file=None):
+    """
+    Print only some cells of the board, one "row col: value" line each.
 
+    This is much cheaper than printing the whole board after a click
+    that only changed a few cells.
 
-def init_game(difficulty, num_cols, num_rows):
+    Parameters:
+        board (list): A list of lists representing the board.
+        cells (list): The (row, col) pairs of the cells to print.
+        file (file): Where to write, the console by default.
+
+    Returns:
+        None
+
+    Examples:
+        >>> print_changes([['?', '1'], ['⚑', '?']], [(0, 1), (1, 0)])
+        0 1: 1
+        1 0: ⚑
+        >>> print_changes([['?']], [])
+    """
+
+    if not cells:
+        return
+    if file is None:
+        file = sys.stdout
+    file.write("".join(str(row) + " " + str(col) + ": "
+                       + str(board[row][col]) + "\n" for row, col in cells))
+
+
+def get_difficulty(difficulty):
+    """
+    Get the fraction of cells that are mines for a difficulty.
+
+    Difficulty is one of "EASY", "MEDIUM", or "HARD", or a custom
+    fraction of cells given as a number or as a string like "0.8".
+
+    Parameters:
+        difficulty (str): Chosen difficulty level.
+
+    Returns:
+        fraction (float): Fraction of cells that will be mines.
+
+    Examples:
+        >>> get_difficulty("MEDIUM")
+        0.3
+        >>> get_difficulty("0.8")
+        0.8
+    """
+
+    # Select the right difficulty
+    if difficulty == "EASY":
+        return EASY_DIFFICULTY
+    elif difficulty == "MEDIUM":
+        return MEDIUM_DIFFICULTY
+    elif difficulty == "HARD":
+        return HARD_DIFFICULTY
+    return float(difficulty)
+
+
+def get_num_mines(difficulty, num_cols, num_rows):
+    """
+    Compute the number of mines for a difficulty and a board size.
+
+    Parameters:
+        difficulty (str): Chosen difficulty level (see get_difficulty()).
+        num_cols (int): Number of columns of the board.
+        num_rows (int): Number of rows of the board.
+
+    Returns:
+        num_mines (int): Number of mines to place.
+
+    Examples:
+        >>> get_num_mines("EASY", 5, 5)
+        2
+        >>> get_num_mines("0.8", 10, 10)
+        80
+        >>> get_num_mines(0.9, 3, 3)
+        8
+    """
+
+    # Compute the number of mines required
+    return int(get_difficulty(difficulty) * num_rows * num_cols)
+
+
+def init_game(difficulty, num_cols, num_rows, first_click=None, lazy=False,
+              rng=None, arrays=False):
     """
     Initialize the game boards and choose the number of mines.
 
     Difficulty is one of "EASY", "MEDIUM", or "HARD" and controls
-    the fraction of cells that will contain mines.
+    the fraction of cells that will contain mines. A custom fraction
+    can also be given (see get_num_mines()).
+
+    If first_click is given, no mine is placed in the 3x3 area around
+    it, so that first reveal is always safe. On boards too small for
+    that, only the clicked cell itself is kept free.
+
+    With lazy=True, the helper board is a LazyHelperBoard, which counts
+    the neighbours of a cell only when it is read. With arrays=True, both
+    boards are NumPy arrays from minesweeper_numpy.init_game_array(),
+    which the other functions of this module pass to minesweeper_numpy.
 
     Parameters:
         difficulty (str): Chosen difficulty level.
         num_cols (int): Number of columns of the board.
         num_rows (int): Number of rows of the board.
+        first_click (tuple): Optional (row, col) of the first reveal.
+        lazy (bool): Whether the helper board is a LazyHelperBoard.
+        rng (Random): Random generator to use, the random module by default.
+        arrays (bool): Whether the boards are NumPy arrays (needs NumPy).
 
     Returns:
         game_board (list): Visible board filled with '?'.
@@ -442,21 +1310,32 @@ def init_game(difficulty, num_cols, num_rows):
         >>> g, h, m = init_game("HARD", 3, 3)
         >>> count_total(h, -1)
         4
+        >>> random.seed(3)
+        >>> g, h, m = init_game(0.5, 4, 4, (0, 0))
+        >>> [h[row][col] for row, col in safe_zone(4, 4, 0, 0)].count(-1)
+        0
     """
 
-    # Select the right difficulty
-    if difficulty == "EASY":
-        difficulty = EASY_DIFFICULTY
-    elif difficulty == "MEDIUM":
-        difficulty = MEDIUM_DIFFICULTY
-    elif difficulty == "HARD":
-        difficulty = HARD_DIFFICULTY
+    if arrays:
+        if lazy:
+            raise ValueError("a lazy helper board can't be an array")
+        import minesweeper_numpy
+        return minesweeper_numpy.init_game_array(difficulty, num_cols,
+                                                 num_rows, first_click, rng)
 
-    # Compute the number of mines required
-    num_mines = int(difficulty * num_rows * num_cols)
+    num_mines = get_num_mines(difficulty, num_cols, num_rows)
+
+    # Keep the area around the first click free of mines
+    excluded = None
+    if first_click is not None:
+        excluded = safe_zone(num_rows, num_cols,
+                             first_click[0], first_click[1])
+        if num_mines > num_rows * num_cols - len(excluded):
+            excluded = [tuple(first_click)]
 
     # Initialize the two boards
-    helper_board = generate_helper_board(num_rows, num_cols, num_mines)
+    helper_board = generate_helper_board(num_rows, num_cols, num_mines,
+                                         excluded, lazy, rng)
     game_board = init_board(num_rows, num_cols, '?')
 
     return game_board, helper_board, num_mines
@@ -488,6 +1367,15 @@ def is_game_over(game_board, helper_board):
         True
     """
 
+    backend = array_backend(game_board)
+    if backend is not None:
+        return backend.is_game_over_array(game_board, helper_board)
+
+    # Boards that can check themselves are asked directly
+    game_over_method = getattr(game_board, 'is_game_over', None)
+    if game_over_method is not None:
+        return game_over_method(helper_board)
+
     # Go through all cells
     for i in range(len(game_board)):
         for j in range(len(game_board[i])):
@@ -499,56 +1387,594 @@ def is_game_over(game_board, helper_board):
     return True
 
 
-def play():
+class GameState:
+    """
+    Keep running counts of a game so each move is checked in constant time.
+
+    The counts are the flags placed, the revealed cells, and the safe
+    cells that are still '?'. The game is over when that last count
+    reaches 0, which matches is_game_over(). The boards are only scanned
+    once, when the state is created, so moves must go through
+    GameState.reveal() and GameState.flag().
+
+    With debug=True, the counts are compared with a full scan of the
+    boards after every move.
+
+    Examples:
+        >>> state = GameState([['?', '?'], ['?', '?']], [[0, 1], [-1, 1]], 1)
+        >>> state.flag(1, 0)
+        [(1, 0)]
+        >>> state.mines_left(), state.is_game_over()
+        (0, False)
+        >>> state.reveal(0, 0)
+        [(0, 0)]
+        >>> state.reveal(0, 1), state.reveal(1, 1)
+        ([(0, 1)], [(1, 1)])
+        >>> state.is_game_over(), state.revealed
+        (True, 3)
+    """
+
+    def __init__(self, game_board, helper_board, num_mines, debug=False,
+                 fresh=False):
+        """
+        Create the state of a game and count its cells once.
+
+        Parameters:
+            game_board (list): Visible board.
+            helper_board (list): Board with mines and counts, or None if
+                                 the mines aren't placed yet.
+            num_mines (int): Total number of mines.
+            debug (bool): Whether to check the counts after every move.
+            fresh (bool): Whether the game board is known to be all '?',
+                          which skips the scan (needed for boards too big
+                          to scan, like chunked boards).
+        """
+
+        self.game_board = game_board
+        self.helper_board = helper_board
+        self.num_mines = num_mines
+        self.debug = debug
+
+        self.flags = 0
+        self.revealed = 0
+        self.safe_left = 0
+        if fresh and helper_board is not None:
+            self.safe_left = len(game_board) * len(game_board[0]) - num_mines
+        else:
+            self.recount()
+
+    def recount(self):
+        """
+        Recompute every count with a full scan of the boards.
+
+        Returns:
+            counts (tuple): The new (flags, revealed, safe_left).
+        """
+
+        game_board = self.game_board
+        helper_board = self.helper_board
+
+        # Compact boards count their cells without decoding each of them
+        count_method = getattr(game_board, 'count_states', None)
+        if count_method is not None:
+            self.flags, self.revealed, self.safe_left = count_method(
+                helper_board)
+            return self.flags, self.revealed, self.safe_left
+
+        # Lazy helper boards can tell mines apart without counting
+        is_mine = getattr(helper_board, 'is_mine', None)
+        if is_mine is None and helper_board is not None:
+            def is_mine(i, j):
+                return helper_board[i][j] == -1
+
+        self.flags = 0
+        self.revealed = 0
+        self.safe_left = 0
+        for i in range(len(game_board)):
+            for j in range(len(game_board[i])):
+                value = game_board[i][j]
+                if value == '\u2691':
+                    self.flags += 1
+                elif value != '?':
+                    self.revealed += 1
+                elif helper_board is not None and not is_mine(i, j):
+                    self.safe_left += 1
+
+        return self.flags, self.revealed, self.safe_left
+
+    def set_helper_board(self, helper_board, num_mines):
+        """
+        Give the state its helper board once the mines are placed.
+
+        Parameters:
+            helper_board (list): Board with mines and counts.
+            num_mines (int): Total number of mines placed.
+
+        Returns:
+            None
+        """
+
+        self.helper_board = helper_board
+        self.num_mines = num_mines
+        self.recount()
+
+    def check(self):
+        """
+        Make sure the running counts match a full scan of the boards.
+
+        Returns:
+            None
+        """
+
+        counts = self.flags, self.revealed, self.safe_left
+        if self.recount() != counts:
+            raise AssertionError("Game state counts " + str(counts)
+                                 + " don't match the boards "
+                                 + str(self.recount()))
+
+    def reveal(self, row, col, cascade=False):
+        """
+        Reveal a cell and update the counts.
+
+        Parameters:
+            row (int): Row index to reveal.
+            col (int): Column index to reveal.
+            cascade (bool): Whether to open the zero region around the cell.
+
+        Returns:
+            revealed (list): The (row, col) pairs of the newly revealed cells.
+        """
+
+        before = self.game_board[row][col]
+
+        if cascade:
+            revealed = reveal_cascade(self.helper_board, self.game_board,
+                                      row, col)
+        else:
+            reveal(self.helper_board, self.game_board, row, col)
+            revealed = [(row, col)] if before in ('?', '\u2691') else []
+
+        # Every newly revealed cell was '?', except maybe the chosen one
+        self.revealed += len(revealed)
+        self.safe_left -= len(revealed)
+        if revealed and before == '\u2691':
+            self.flags -= 1
+            self.safe_left += 1
+
+        if self.debug:
+            self.check()
+
+        return revealed
+
+    def flag(self, row, col):
+        """
+        Switch a flag on a cell and update the counts.
+
+        A flagged safe cell isn't '?' anymore, so like in is_game_over()
+        it doesn't count as a safe cell left to reveal.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            changed (list): [(row, col)] if the cell changed, else [].
+        """
+
+        before = self.game_board[row][col]
+        flag(self.game_board, row, col)
+
+        safe = (self.helper_board is not None
+                and self.helper_board[row][col] != -1)
+        if before == '?':
+            self.flags += 1
+            if safe:
+                self.safe_left -= 1
+        elif before == '\u2691':
+            self.flags -= 1
+            if safe:
+                self.safe_left += 1
+        else:
+            return []
+
+        if self.debug:
+            self.check()
+
+        return [(row, col)]
+
+    def mines_left(self):
+        """
+        Get the supposed number of mines left based on the flags.
+
+        Returns:
+            mines_left (int): Number of mines minus number of flags.
+        """
+
+        return self.num_mines - self.flags
+
+    def is_game_over(self):
+        """
+        Check if all safe cells have been revealed.
+
+        Returns:
+            over (bool): True if the game is won, False otherwise.
+        """
+
+        return self.helper_board is not None and self.safe_left == 0
+
+
+class Game:
+    """
+    A game driven by method calls, for scripts, bots and play().
+
+    new() starts a game, reveal() and flag() play moves and return the
+    cells that changed, and status() tells if the game is 'playing',
+    'won' or 'lost'. Nothing is printed and nothing is asked, so moves
+    cost only what the engine does.
+
+    Examples:
+        >>> game = Game()
+        >>> game.start([['?', '?'], ['?', '?']], [[0, 1], [-1, 1]], 1)
+        >>> game.reveal(0, 0), game.flag(1, 0), game.status()
+        ([(0, 0)], [(1, 0)], 'playing')
+        >>> game.reveal(0, 1), game.reveal(1, 1), game.status()
+        ([(0, 1)], [(1, 1)], 'won')
+        >>> game.reveal(0, 0)
+        Traceback (most recent call last):
+        ...
+        ValueError: The game is over
+    """
+
+    def __init__(self, cascade=False, debug=False, lazy=False):
+        """
+        Create a game object, with no game started yet.
+
+        Parameters:
+            cascade (bool): Whether reveals open connected zero regions.
+            debug (bool): Whether to check the game state after every move.
+            lazy (bool): Whether new games use a LazyHelperBoard.
+        """
+
+        self.cascade = cascade
+        self.debug = debug
+        self.lazy = lazy
+        self.state = None
+        self.difficulty = None
+        self.lost = False
+
+    def new(self, num_rows, num_cols, difficulty, safe_first_click=False):
+        """
+        Start a new game.
+
+        With safe_first_click, the mines are only placed on the first
+        reveal, away from the 3x3 area around it (see init_game()).
+
+        Parameters:
+            num_rows (int): Number of rows of the board.
+            num_cols (int): Number of columns of the board.
+            difficulty (str): Difficulty level or custom fraction.
+            safe_first_click (bool): Whether the first reveal is always safe.
+
+        Returns:
+            None
+
+        Examples:
+            >>> game = Game(cascade=True)
+            >>> game.new(9, 9, "EASY", safe_first_click=True)
+            >>> len(game.reveal(4, 4)) >= 9, game.status()
+            (True, 'playing')
+        """
+
+        self.difficulty = difficulty
+        if safe_first_click:
+            game_board = init_board(num_rows, num_cols, '?')
+            helper_board = None
+            num_mines = get_num_mines(difficulty, num_cols, num_rows)
+        else:
+            game_board, helper_board, num_mines = (
+                init_game(difficulty, num_cols, num_rows, lazy=self.lazy))
+
+        self.start(game_board, helper_board, num_mines)
+
+    def start(self, game_board, helper_board, num_mines, fresh=False):
+        """
+        Start a game on existing boards, like saved or seeded ones.
+
+        Parameters:
+            game_board (list): Visible board.
+            helper_board (list): Board with mines and counts, or None to
+                                 place the mines on the first reveal.
+            num_mines (int): Total number of mines.
+            fresh (bool): Whether the game board is known to be all '?'
+                          (see GameState).
+
+        Returns:
+            None
+        """
+
+        # Keep running counts instead of scanning the boards after every move
+        self.state = GameState(game_board, helper_board, num_mines,
+                               self.debug, fresh)
+        self.lost = False
+
+    @property
+    def board(self):
+        """
+        The visible game board.
+        """
+
+        return self.state.game_board
+
+    def place_mines(self, row, col):
+        """
+        Place the mines away from the first reveal, if not done yet.
+
+        Parameters:
+            row (int): Row index of the first reveal.
+            col (int): Column index of the first reveal.
+
+        Returns:
+            placed (bool): True if the mines were placed by this call.
+        """
+
+        if self.state.helper_board is not None:
+            return False
+
+        game_board = self.state.game_board
+        _, helper_board, num_mines = init_game(
+            self.difficulty, len(game_board[0]), len(game_board), (row, col),
+            self.lazy)
+        self.state.set_helper_board(helper_board, num_mines)
+
+        return True
+
+    def check_move(self, row, col):
+        """
+        Make sure a move can be played.
+
+        Parameters:
+            row (int): Row index of the move.
+            col (int): Column index of the move.
+
+        Returns:
+            None
+        """
+
+        if self.state is None:
+            raise ValueError("No game started")
+        if self.status() != 'playing':
+            raise ValueError("The game is over")
+        if not is_valid_position(self.state.game_board, row, col):
+            raise ValueError("Position " + str((row, col))
+                             + " is out of the board")
+
+    def reveal(self, row, col):
+        """
+        Reveal a cell, placing the mines first if they aren't yet.
+
+        Parameters:
+            row (int): Row index to reveal.
+            col (int): Column index to reveal.
+
+        Returns:
+            revealed (list): The (row, col) pairs of the newly revealed cells.
+
+        Raises:
+            AssertionError: If the cell is a mine, like reveal(). The game
+                            is then 'lost'.
+            ValueError: If the game is over or the cell is off the board.
+        """
+
+        self.check_move(row, col)
+        self.place_mines(row, col)
+
+        try:
+            return self.state.reveal(row, col, self.cascade)
+        except AssertionError:
+            self.lost = True
+            raise
+
+    def flag(self, row, col):
+        """
+        Switch a flag on a cell.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            changed (list): [(row, col)] if the cell changed, else [].
+
+        Raises:
+            ValueError: If the game is over or the cell is off the board.
+        """
+
+        self.check_move(row, col)
+        return self.state.flag(row, col)
+
+    def status(self):
+        """
+        Get where the game is at.
+
+        Returns:
+            status (str): 'playing', 'won' or 'lost'.
+        """
+
+        if self.lost:
+            return 'lost'
+        elif self.state.is_game_over():
+            return 'won'
+        return 'playing'
+
+    def mines_left(self):
+        """
+        Get the supposed number of mines left based on the flags.
+
+        Returns:
+            mines_left (int): Number of mines minus number of flags.
+        """
+
+        return self.state.mines_left()
+
+
+def play(safe_first_click=False, debug=False, cascade=False, viewport=None,
+         save_path=None, log_path=None):
     """
     Run the full interactive Minesweeper game.
 
     The function asks the user for board size and difficulty,
     then repeatedly asks the player to reveal or flag cells
-    until the game is won or a mine is revealed.
+    until the game is won or a mine is revealed. The moves are
+    played through a Game.
+
+    With safe_first_click, the mines are only placed after the first
+    reveal, away from the 3x3 area around it. With cascade, revealing
+    a 0 opens the whole zero region around it. With viewport, only a
+    window of the board around the last move is drawn, and updated in
+    place (see minesweeper_terminal.ViewportRenderer).
+
+    With save_path, the game is saved to that file as soon as the mines
+    are placed, and every move is then written to it (see
+    minesweeper_storage). If the file already exists, that game is
+    resumed instead of asking for a new one.
+
+    With log_path, every move is recorded in a move log once the mines
+    are placed, with snapshots of the board to replay it quickly (see
+    minesweeper_replay).
+
+    Otherwise, moves can be undone with 2 and redone with 3. The game
+    board is then a VersionedBoard, which keeps a snapshot before every
+    move without copying the board (see minesweeper_versioned).
 
     Parameters:
-        None
+        safe_first_click (bool): Whether the first reveal is always safe.
+        debug (bool): Whether to check the game state after every move.
+        cascade (bool): Whether reveals open connected zero regions.
+        viewport (tuple): Optional (height, width) of the window to draw.
+        save_path (str): Optional file to save the game to or resume from.
+        log_path (str): Optional file to record the moves in.
 
     Returns:
         None
     """
 
-    # Ask the user for the game parameters
-    num_rows = int(input("Enter number of rows for the board: "))
-    num_cols = int(input("Enter number of columns for the board: "))
-    difficulty = input("Enter difficulty: ")
+    if save_path is not None:
+        import minesweeper_storage
+    if log_path is not None:
+        import minesweeper_replay
 
-    # Initialize the game
-    game_board, helper_board, num_mines = (
-        init_game(difficulty, num_cols, num_rows))
+    game = Game(cascade, debug)
 
-    # Play as long as the game isn't over
-    game_over = False
-    while not game_over:
-        # Compute the supposed number of mines left based on user's flags
-        mines_left = num_mines - count_total(game_board, "\u2691")
+    # Resume the saved game, or ask the user for the game parameters
+    resumed = save_path is not None and os.path.exists(save_path)
+    if resumed:
+        game.start(*minesweeper_storage.load_game(save_path)[:3])
+    else:
+        num_rows = int(input("Enter number of rows for the board: "))
+        num_cols = int(input("Enter number of columns for the board: "))
+        difficulty = input("Enter difficulty: ")
+
+        # Initialize the game, or wait for the first reveal to place the mines
+        game.new(num_rows, num_cols, difficulty, safe_first_click)
+
+    def mines_placed():
+        # Play on the saved boards from now on, flags placed so far included
+        if save_path is not None and not resumed:
+            minesweeper_storage.save_game(
+                save_path, game.board, game.state.helper_board,
+                game.state.num_mines)
+            game.start(*minesweeper_storage.load_game(save_path)[:3])
+
+        if log_path is not None:
+            return minesweeper_replay.MoveLog(
+                log_path, game.board, game.state.helper_board,
+                game.state.num_mines)
+        return None
+
+    log = None
+    if game.state.helper_board is not None:
+        log = mines_placed()
+
+    # Undo and redo, on boards that aren't saved or logged
+    history = None
+    if save_path is None and log_path is None:
+        import minesweeper_versioned
+        game.state.game_board = minesweeper_versioned.VersionedBoard(
+            game.board)
+        history = minesweeper_versioned.History(game.state)
+
+    renderer = None
+    if viewport is not None:
+        from minesweeper_terminal import ViewportRenderer
+        renderer = ViewportRenderer(game.board, viewport[0], viewport[1])
+
+    changed = []
+    focus = None
 
-        # Print the board and the amount of mines left
-        print("Current Board: (" + str(mines_left) + " mines remaining)")
-        print_board(game_board)
+    # Play as long as the game isn't over
+    while game.status() == 'playing':
+        # Print the board and the amount of mines left based on user's flags
+        status = ("Current Board: (" + str(game.mines_left())
+                  + " mines remaining)")
+        if renderer is None:
+            print(status)
+            print_board(game.board)
+        else:
+            renderer.render(changed, focus, status)
 
         # Let the user chose the next move
-        chosen_move = int(input("Choose 0 to reveal or 1 to flag: "))
+        if history is None:
+            chosen_move = int(input("Choose 0 to reveal or 1 to flag: "))
+        else:
+            chosen_move = int(input("Choose 0 to reveal, 1 to flag, "
+                                    "2 to undo or 3 to redo: "))
+
+            if chosen_move in (2, 3):
+                if chosen_move == 2 and not history.undo():
+                    print("Nothing to undo")
+                elif chosen_move == 3 and not history.redo():
+                    print("Nothing to redo")
+
+                # The changed cells aren't known, so redraw the window
+                changed = []
+                if renderer is not None:
+                    renderer.top = None
+                continue
+
         chosen_row = int(input("Which row? "))
         chosen_col = int(input("Which column? "))
+        focus = (chosen_row, chosen_col)
 
         # Reveal or flag the chosen cell accordingly
         if chosen_move == 0:
-            reveal(helper_board, game_board, chosen_row, chosen_col)
+            # Place the mines now that the first cell is known
+            game.check_move(chosen_row, chosen_col)
+            if history is not None:
+                history.record()
+            if game.place_mines(chosen_row, chosen_col):
+                log = mines_placed()
+                if renderer is not None:
+                    renderer.board = game.board
+
+            # Record the move first, so a losing reveal is logged too
+            if log is not None:
+                op = (minesweeper_replay.REVEAL_CASCADE if cascade
+                      else minesweeper_replay.REVEAL)
+                log.record(op, chosen_row, chosen_col)
+                log.flush()
+
+            changed = game.reveal(chosen_row, chosen_col)
         elif chosen_move == 1:
-            flag(game_board, chosen_row, chosen_col)
+            game.check_move(chosen_row, chosen_col)
+            if history is not None:
+                history.record()
+            if log is not None:
+                log.record(minesweeper_replay.FLAG, chosen_row, chosen_col)
+                log.flush()
 
-        # Check if the game is over
-        game_over = is_game_over(game_board, helper_board)
+            changed = game.flag(chosen_row, chosen_col)
 
-    # Congratulate when the game is over
-    print("Congratulations! You won!")
+    game_board = game.board
 
     # Replace remaining '?' with flags
     for i in range(len(game_board)):
@@ -556,9 +1982,19 @@ def play():
             if game_board[i][j] == '?':
                 game_board[i][j] = '\u2691'
 
-    # Print the final board
-    print("Final Board:")
-    print_board(game_board)
+    if save_path is not None:
+        minesweeper_storage.sync_game(game_board)
+    if log is not None:
+        log.close()
+
+    # Print the final board and congratulate when the game is over
+    if renderer is None:
+        print("Congratulations! You won!")
+        print("Final Board:")
+        print_board(game_board)
+    else:
+        renderer.top = None
+        renderer.render(focus=focus, status="Congratulations! You won!")
 
 
 def apply_click_to_neighbours(board, col, row, click_function):
@@ -579,18 +2015,12 @@ def apply_click_to_neighbours(board, col, row, click_function):
         None
     """
 
-    # Get all neighbouring positions
-    neighbour_pos = get_neighbour_positions(board, row, col)
-
     # Go through all neighbouring positions
-    for pos in neighbour_pos:
+    for i, j in get_neighbour_table(board)[row][col]:
 
-        # Check if it's a valid one
-        if is_valid_position(board, pos[0], pos[1]):
-
-            # Apply the function to unrevealed cells
-            if board[pos[0]][pos[1]] == '?':
-                click_function(pos[0], pos[1])
+        # Apply the function to unrevealed cells
+        if board[i][j] == '?':
+            click_function(i, j)
 
 
 def solve_cell(board, row, col, left_click, right_click):
@@ -622,7 +2052,7 @@ def solve_cell(board, row, col, left_click, right_click):
     except ValueError:
         return  # Not a digit, so exit the function
 
-    n_neigh = len(get_neighbour_positions(board, row, col))
+    n_neigh = len(get_neighbour_table(board)[row][col])
 
     # Count the number of neighbouring flags
     adj_flags = count_neighbours(board, row, col, '\u2691')
@@ -641,29 +2071,518 @@ def solve_cell(board, row, col, left_click, right_click):
     # Otherwise, do nothing
 
 
-def solve(board, left_click, right_click):
+def solve(board, left_click, right_click, exact=False, start=None):
     """
-    Repeatedly try to solve every cell on the board.
+    Solve the board with the rules of solve_cell(), using a work queue.
+
+    The queue starts with every revealed number. A number is checked with
+    the same two rules as solve_cell(), using counts of its unknown and
+    flagged neighbours. Those counts are taken the first time a cell is
+    checked and then kept up to date after each click. After a click,
+    only the revealed neighbours of the clicked cell are queued again.
+    The solver stops once the queue is empty: either every cell is known,
+    or no rule applies anymore and the board is stuck.
+
+    With exact=True, a stuck board goes through solve_constraints(), and
+    the cells it proves safe or mined are clicked before the queue starts
+    again.
+
+    Giving the start cells skips the scan of the whole board, so boards
+    too big to scan (like chunked boards) can be solved from the cells
+    that were revealed so far. The number of unknown cells then comes
+    from count_total(), which such boards answer without a scan.
 
-    The function calls solve_cell on every cell while there are still
-    unknown cells ('?') on the board.
+    The click functions must change the clicked cell only, since the
+    solver reads the board after each click to update its counts. The
+    loop itself is solve_cells(), shared with the compact boards.
 
     Parameters:
         board (list): Visible game board.
         left_click (callable): Function used to reveal a cell.
         right_click (callable): Function used to flag a cell.
+        exact (bool): Whether to use solve_constraints() when stuck.
+        start (list): Optional (row, col) cells to start the queue with.
 
     Returns:
-        None
+        result (dict): 'status' is 'solved' or 'stuck', and 'left_clicks',
+                       'right_clicks', 'cells_checked' and 'exact_moves'
+                       count the work. With exact, a stuck result also has
+                       the 'probabilities' of the frontier cells.
+
+    When SOLVER_COUNTERS is a dictionary, the queue pops, the neighbour
+    scans, the rule checks and the rules applied are added to it.
+
+    Examples:
+        >>> h = [[0, 1, -1]]
+        >>> g = [['0', '?', '?']]
+        >>> def left(row, col):
+        ...     reveal(h, g, row, col)
+        >>> def right(row, col):
+        ...     flag(g, row, col)
+        >>> result = solve(g, left, right)
+        >>> result['status'], result['left_clicks'], result['right_clicks']
+        ('solved', 1, 1)
+        >>> g
+        [['0', '1', '⚑']]
+        >>> h = [[-1, 1, -1], [1, 2, 1]]
+        >>> g = [['?', '?', '?'], ['1', '2', '1']]
+        >>> solve(g, left, right)['status']
+        'stuck'
+        >>> result = solve(g, left, right, exact=True)
+        >>> result['status'], result['exact_moves']
+        ('solved', 3)
+        >>> h = [[0, 1, -1]]
+        >>> g = [['0', '?', '?']]
+        >>> solve(g, left, right, start=[(0, 0)])['status']
+        'solved'
+    """
+
+    nb_rows = len(board)
+    nb_cols = len(board[0])
+
+    # The core works on flat indices, with the codes of the cells
+    if start is None:
+        codes = array('b', [CELL_CODES[value] for row in board
+                            for value in row])
+        unknown_total = codes.count(UNKNOWN_CODE)
+        start = range(nb_rows * nb_cols)
+        adj_counts = [None] * (nb_rows * nb_cols)
+    else:
+        # Boards too big to scan are read as the solver gets to them, and
+        # the memory stays to the explored area
+        codes = _CellCodes(board, nb_cols)
+        unknown_total = count_total(board, '?')
+        start = [row * nb_cols + col for row, col in start]
+        adj_counts = defaultdict(lambda: None)
+
+    def read(index):
+        row, col = divmod(index, nb_cols)
+        code = codes[index] = CELL_CODES[board[row][col]]
+        return code
+
+    def left(index):
+        left_click(*divmod(index, nb_cols))
+
+    def right(index):
+        right_click(*divmod(index, nb_cols))
+
+    return solve_cells(board, codes, read, flat_neighbours(nb_rows, nb_cols),
+                       left, right, start, unknown_total, adj_counts, exact)
+
+
+def solve_cells(board, codes, read, neighbours, left_click, right_click,
+                start, unknown_total, adj_counts, exact=False):
+    """
+    Run the work queue and the rules of solve() on cells by flat index.
+
+    This is the loop shared by solve() and the compact boards: the board
+    is only seen through the codes of its cells and the accessors, so
+    each kind of board gives the fastest way it has to read and click
+    its cells. After a click, the new code of the clicked cell is taken
+    from read(), which also updates codes when they are a copy of the
+    board. A click that leaves the cell unknown isn't counted as a move
+    by the loop, but is still counted in the result.
+
+    Parameters:
+        board (list): The game board, only given to solve_constraints().
+        codes: codes[index] is the code of a cell (UNKNOWN_CODE, FLAG_CODE
+               or the revealed number), like an array or a dictionary.
+        read (callable): Gives the code of a clicked cell.
+        neighbours (callable): Gives the flat indices around a cell.
+        left_click (callable): Reveals a cell, by flat index.
+        right_click (callable): Flags a cell, by flat index.
+        start (iterable): Flat indices to start the queue with, the ones
+                          that aren't revealed are skipped.
+        unknown_total (int): Number of unknown cells on the board.
+        adj_counts: Where to keep the counts of each checked cell, giving
+                    None for the cells not checked yet.
+        exact (bool): Whether to use solve_constraints() when stuck.
+
+    Returns:
+        result (dict): Same as solve().
+
+    Examples:
+        >>> codes = [0, UNKNOWN_CODE, UNKNOWN_CODE]
+        >>> helper = [0, 1, -1]
+        >>> def left(index):
+        ...     codes[index] = helper[index]
+        >>> def right(index):
+        ...     codes[index] = FLAG_CODE
+        >>> result = solve_cells(None, codes, codes.__getitem__,
+        ...                      flat_neighbours(1, 3), left, right,
+        ...                      range(3), 2, [None] * 3)
+        >>> result['status'], codes
+        ('solved', [0, 1, -3])
+    """
+
+    nb_cols = len(board[0]) if exact else None
+
+    # Cells waiting to be checked, and a set of them to avoid duplicates
+    queue = deque()
+    queued = set()
+    for index in start:
+        if index not in queued and codes[index] >= 0:
+            queue.append(index)
+            queued.add(index)
+
+    result = {'status': 'stuck', 'left_clicks': 0, 'right_clicks': 0,
+              'cells_checked': 0, 'exact_moves': 0}
+    neighbour_scans = 0
+    rule_checks = 0
+    rules_applied = 0
+
+    def click(cell, click_function, counter):
+        # Click an unknown cell, then update the counts of its neighbours
+        # from what the click did and queue the revealed ones again
+        nonlocal unknown_total
+
+        click_function(cell)
+        result[counter] += 1
+
+        code = read(cell)
+        if code == UNKNOWN_CODE:
+            return
+        unknown_total -= 1
+
+        for index in neighbours(cell):
+            counts = adj_counts[index]
+            if counts is not None:
+                counts[0] -= 1
+                if code == FLAG_CODE:
+                    counts[1] += 1
+
+            if index not in queued and codes[index] >= 0:
+                queue.append(index)
+                queued.add(index)
+
+        # A newly revealed number can be checked too
+        if code != FLAG_CODE and cell not in queued:
+            queue.append(cell)
+            queued.add(cell)
+
+    while queue:
+        while queue:
+            index = queue.popleft()
+            queued.discard(index)
+            result['cells_checked'] += 1
+
+            # Count the unknown and flagged neighbours the first time only
+            counts = adj_counts[index]
+            if counts is None:
+                neighbour_scans += 1
+                counts = [0, 0]
+                for neighbour in neighbours(index):
+                    code = codes[neighbour]
+                    if code == UNKNOWN_CODE:
+                        counts[0] += 1
+                    elif code == FLAG_CODE:
+                        counts[1] += 1
+                adj_counts[index] = counts
+            unknown, flags = counts
+
+            # Nothing left to do around this cell
+            if unknown == 0:
+                continue
+
+            rule_checks += 1
+            value = codes[index]
+
+            # No more unflagged mines, or all unrevealed neighbours are mines
+            if flags == value:
+                click_function = left_click
+                counter = 'left_clicks'
+            elif value - flags == unknown:
+                click_function = right_click
+                counter = 'right_clicks'
+            else:
+                continue
+
+            rules_applied += 1
+            for neighbour in neighbours(index):
+                if codes[neighbour] == UNKNOWN_CODE:
+                    click(neighbour, click_function, counter)
+
+        # When the simple rules are stuck, try the exact constraints
+        if exact and unknown_total != 0:
+            forced = solve_constraints(board)
+            for row, col in forced['safe']:
+                click(row * nb_cols + col, left_click, 'left_clicks')
+            for row, col in forced['mines']:
+                click(row * nb_cols + col, right_click, 'right_clicks')
+            result['exact_moves'] += len(forced['safe']) + len(forced['mines'])
+
+            if not queue:
+                result['probabilities'] = forced['probabilities']
+
+    if unknown_total == 0:
+        result['status'] = 'solved'
+        result.pop('probabilities', None)
+
+    counters = SOLVER_COUNTERS
+    if counters is not None:
+        for name, total in (('queue_pops', result['cells_checked']),
+                            ('neighbour_scans', neighbour_scans),
+                            ('rule_checks', rule_checks),
+                            ('rules_applied', rules_applied)):
+            counters[name] = counters.get(name, 0) + total
+
+    return result
+
+
+class _CellCodes(dict):
     """
+    Codes of the cells of a board, read from the board when first asked.
+    """
+
+    __slots__ = ('board', 'nb_cols')
+
+    def __init__(self, board, nb_cols):
+        super().__init__()
+        self.board = board
+        self.nb_cols = nb_cols
+
+    def __missing__(self, index):
+        row, col = divmod(index, self.nb_cols)
+        code = self[index] = CELL_CODES[self.board[row][col]]
+        return code
+
+
+def frontier_constraints(board):
+    """
+    Build the constraints the revealed numbers put on the unknown cells.
+
+    Each revealed number with unknown neighbours gives one constraint:
+    the number of mines among those unknown neighbours equals the number
+    minus the flags around it.
+
+    Parameters:
+        board (list): Visible game board.
+
+    Returns:
+        constraints (list): List of (cells, mines) pairs, where cells is a
+                            tuple of (row, col) unknown cells.
+
+    Examples:
+        >>> frontier_constraints([['1', '?'], ['⚑', '?']])
+        [(((0, 1), (1, 1)), 0)]
+        >>> frontier_constraints([['?', '?']])
+        []
+    """
+
+    table = get_neighbour_table(board)
+    constraints = []
+
+    for i in range(len(board)):
+        for j in range(len(board[i])):
+            value = board[i][j]
+            if value == '?' or value == '\u2691':
+                continue
+
+            cells = []
+            mines = int(value)
+            for k, l in table[i][j]:
+                if board[k][l] == '?':
+                    cells.append((k, l))
+                elif board[k][l] == '\u2691':
+                    mines -= 1
+
+            if cells:
+                constraints.append((tuple(cells), mines))
+
+    return constraints
+
+
+def split_components(constraints):
+    """
+    Split constraints into groups that don't share any unknown cell.
+
+    The cells of each group are listed in breadth-first order, so cells
+    that appear in the same constraints end up close to each other.
+
+    Parameters:
+        constraints (list): List of (cells, mines) pairs.
+
+    Returns:
+        components (list): List of (cells, constraints) pairs, one per group.
+
+    Examples:
+        >>> c = [(((0, 0), (0, 1)), 1), (((0, 1),), 0), (((5, 5),), 1)]
+        >>> for cells, group in split_components(c):
+        ...     print(cells, len(group))
+        [(0, 0), (0, 1)] 2
+        [(5, 5)] 1
+    """
+
+    # Constraints that contain each cell
+    cell_constraints = {}
+    for index, (cells, _) in enumerate(constraints):
+        for cell in cells:
+            cell_constraints.setdefault(cell, []).append(index)
+
+    components = []
+    seen_cells = set()
+    seen_constraints = set()
+
+    for start in cell_constraints:
+        if start in seen_cells:
+            continue
+
+        # Walk every cell reachable through shared constraints
+        cells = [start]
+        group = []
+        seen_cells.add(start)
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            for index in cell_constraints[cell]:
+                if index in seen_constraints:
+                    continue
+                seen_constraints.add(index)
+                group.append(constraints[index])
+                for other in constraints[index][0]:
+                    if other not in seen_cells:
+                        seen_cells.add(other)
+                        cells.append(other)
+                        queue.append(other)
+
+        components.append((cells, group))
+
+    return components
+
+
+def count_component_solutions(cells, constraints, max_states=100000):
+    """
+    Count the mine layouts of one group of cells that satisfy its constraints.
+
+    The cells are decided one at a time. A partial layout only matters
+    through how many mines each constraint still needs, so partial layouts
+    with the same needs are merged and counted together instead of being
+    explored separately. A backward pass then finds, for each cell, how
+    many full layouts put a mine on it.
+
+    Parameters:
+        cells (list): The unknown cells of the group, in the order to use.
+        constraints (list): List of (cells, mines) pairs of the group.
+        max_states (int): Give up if one step has more distinct needs.
+
+    Returns:
+        total (int): Number of valid layouts (0 if there is a contradiction).
+        mine_counts (list): For each cell, the number of layouts with a mine
+                            on it. None if max_states was exceeded.
+
+    Examples:
+        >>> count_component_solutions([(0, 0), (0, 1)], [(((0, 0), (0, 1)), 1)])
+        (2, [1, 1])
+        >>> count_component_solutions([(0, 0), (0, 1)],
+        ...                           [(((0, 0), (0, 1)), 1), (((0, 1),), 0)])
+        (1, [1, 0])
+    """
+
+    position = {cell: i for i, cell in enumerate(cells)}
+    nb_cells = len(cells)
+
+    # Constraints of each cell, and how many of a constraint's cells come
+    # after each position (so a need that can't be met is cut early)
+    cell_constraints = [[] for _ in range(nb_cells)]
+    remaining_after = []
+    for index, (constraint_cells, _) in enumerate(constraints):
+        positions = sorted(position[cell] for cell in constraint_cells)
+        for pos in positions:
+            cell_constraints[pos].append(index)
+        remaining_after.append({pos: len(positions) - k - 1
+                                for k, pos in enumerate(positions)})
+
+    def next_state(state, i, mine):
+        needs = list(state)
+        for index in cell_constraints[i]:
+            need = needs[index] - mine
+            if need < 0 or need > remaining_after[index][i]:
+                return None
+            needs[index] = need
+        return tuple(needs)
+
+    # Forward pass: number of partial layouts reaching each state
+    layers = [{tuple(mines for _, mines in constraints): 1}]
+    for i in range(nb_cells):
+        layer = {}
+        for state, count in layers[i].items():
+            for mine in (0, 1):
+                new_state = next_state(state, i, mine)
+                if new_state is not None:
+                    layer[new_state] = layer.get(new_state, 0) + count
+
+        if len(layer) > max_states:
+            return 0, None
+        layers.append(layer)
+
+    # Backward pass: number of ways to finish the layout from each state
+    completions = {state: 1 for state in layers[nb_cells]}
+    mine_counts = [0] * nb_cells
+    for i in range(nb_cells - 1, -1, -1):
+        previous = {}
+        for state, count in layers[i].items():
+            ways = 0
+            for mine in (0, 1):
+                new_state = next_state(state, i, mine)
+                if new_state is not None:
+                    finish = completions[new_state]
+                    ways += finish
+                    if mine:
+                        mine_counts[i] += count * finish
+            previous[state] = ways
+        completions = previous
+
+    total = sum(completions.values())
+    return total, mine_counts
+
+
+def solve_constraints(board, max_states=100000):
+    """
+    Find forced moves and mine probabilities from all the revealed numbers.
+
+    The constraints of the unknown frontier are split into independent
+    groups (see split_components()), and every mine layout of each group
+    is counted (see count_component_solutions()). A cell that is a mine
+    in no layout is safe, and one that is a mine in every layout is a
+    mine. The probabilities assume every valid layout of a group is
+    equally likely. Unknown cells away from the numbers are left out.
+
+    Parameters:
+        board (list): Visible game board.
+        max_states (int): Limit given to count_component_solutions().
+
+    Returns:
+        result (dict): 'safe' and 'mines' are lists of (row, col) cells,
+                       'probabilities' maps each frontier cell to its
+                       chance of being a mine.
+
+    Examples:
+        >>> r = solve_constraints([['?', '?', '?'],
+        ...                        ['1', '2', '1']])
+        >>> r['safe'], r['mines']
+        ([(0, 1)], [(0, 0), (0, 2)])
+        >>> solve_constraints([['1', '?'], ['?', '?']])['probabilities'][0, 1]
+        0.3333333333333333
+    """
+
+    result = {'safe': [], 'mines': [], 'probabilities': {}}
+
+    for cells, constraints in split_components(frontier_constraints(board)):
+        total, mine_counts = count_component_solutions(cells, constraints,
+                                                       max_states)
+
+        # Skip groups with a contradiction or too many layouts to count
+        if total == 0 or mine_counts is None:
+            continue
 
-    # Loop until all cells are revealed
-    while count_total(board, '?') != 0:
+        for cell, mines in zip(cells, mine_counts):
+            result['probabilities'][cell] = mines / total
+            if mines == 0:
+                result['safe'].append(cell)
+            elif mines == total:
+                result['mines'].append(cell)
 
-        # Try to solve each cell on the board
-        for row in range(len(board)):
-            for col in range(len(board[row])):
-                solve_cell(board, row, col, left_click, right_click)
+    return result
 
 
 if __name__ == "__main__":
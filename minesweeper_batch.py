@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+import minesweeper as m
+
+
+# Names of the moves, with the numbers play() uses for them
+MOVE_NAMES = {'reveal': 'reveal', 'flag': 'flag', '0': 'reveal', '1': 'flag'}
+
+
+def parse_move(line):
+    """
+    Read one move from a line like "reveal 3 4", "flag 3 4" or "0 3 4".
+
+    Empty lines and lines starting with # are skipped.
+
+    Parameters:
+        line (str): One line of the moves file.
+
+    Returns:
+        move (tuple): ('reveal' or 'flag', row, col), or None to skip.
+
+    Raises:
+        ValueError: If the line isn't a move.
+
+    Examples:
+        >>> parse_move("reveal 3 4"), parse_move("1 0 2")
+        (('reveal', 3, 4), ('flag', 0, 2))
+        >>> parse_move("  # first click"), parse_move("")
+        (None, None)
+        >>> parse_move("dig 1 1")
+        Traceback (most recent call last):
+        ...
+        ValueError: Not a move: 'dig 1 1'
+    """
+
+    words = line.split()
+    if not words or words[0].startswith("#"):
+        return None
+
+    if len(words) != 3 or words[0].lower() not in MOVE_NAMES:
+        raise ValueError("Not a move: " + repr(line.strip()))
+
+    return MOVE_NAMES[words[0].lower()], int(words[1]), int(words[2])
+
+
+def run_moves(game, lines, results=None):
+    """
+    Play every move of a stream on a game, until the game is over.
+
+    Nothing is printed between moves. Moves that can't be played, like
+    moves off the board, are skipped and reported in the results.
+
+    Parameters:
+        game (Game): A started game.
+        lines (iterable): Lines of moves (see parse_move()).
+        results (file): Where to write one JSON line per move, or None.
+
+    Returns:
+        summary (dict): 'status' of the game, number of 'moves' played,
+                        of 'errors', and of 'revealed' cells.
+
+    Examples:
+        >>> game = m.Game()
+        >>> game.start(m.init_board(1, 3, '?'), [[0, 1, -1]], 1)
+        >>> run_moves(game, ["flag 0 2", "reveal 0 0", "0 0 1", "1 0 0"])
+        {'status': 'won', 'moves': 3, 'errors': 0, 'revealed': 2}
+    """
+
+    moves = 0
+    errors = 0
+    revealed = 0
+
+    for number, line in enumerate(lines, 1):
+        if game.status() != 'playing':
+            break
+
+        result = None
+        try:
+            move = parse_move(line)
+            if move is None:
+                continue
+            name, row, col = move
+
+            if name == 'reveal':
+                try:
+                    changed = game.reveal(row, col)
+                except AssertionError:
+                    changed = []
+                revealed += len(changed)
+            else:
+                changed = game.flag(row, col)
+            moves += 1
+
+            if results is not None:
+                result = {'line': number, 'move': name, 'row': row,
+                          'col': col, 'changed': len(changed),
+                          'status': game.status()}
+        except ValueError as error:
+            errors += 1
+            if results is not None:
+                result = {'line': number, 'error': str(error)}
+
+        if result is not None:
+            results.write(json.dumps(result) + "\n")
+
+    return {'status': game.status(), 'moves': moves, 'errors': errors,
+            'revealed': revealed}
+
+
+def main(argv=None):
+    """
+    Play a file of moves on a new or saved game from the command line.
+
+    The final board goes to standard output, followed by the outcome as
+    JSON, and the per-move results go to --results.
+
+    A game opened with --load is never changed on disk. The game is only
+    written when --save is given, which may be the loaded file itself,
+    and once its mines are placed.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        None
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper moves read from a file or stdin.")
+    parser.add_argument("moves", nargs="?", default="-",
+                        help="file of moves, '-' for standard input")
+    parser.add_argument("--rows", type=int, default=16)
+    parser.add_argument("--cols", type=int, default=16)
+    parser.add_argument("--difficulty", default="EASY")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--safe-first-click", action="store_true")
+    parser.add_argument("--cascade", action="store_true")
+    parser.add_argument("--load",
+                        help="play on a saved game (see minesweeper_storage)")
+    parser.add_argument("--save",
+                        help="write the game to this file after the moves")
+    parser.add_argument("--results",
+                        help="write one JSON line per move to this file")
+    args = parser.parse_args(argv)
+
+    if args.load or args.save:
+        import minesweeper_storage
+
+    game = m.Game(cascade=args.cascade)
+    seed = args.seed
+    if args.load:
+        # Copy on write, so the moves don't change the saved file
+        loaded = minesweeper_storage.load_game(args.load, False)
+        game.start(*loaded[:3])
+        seed = loaded[3]
+    else:
+        if args.seed is not None:
+            random.seed(args.seed)
+        game.new(args.rows, args.cols, args.difficulty, args.safe_first_click)
+
+    moves = sys.stdin if args.moves == "-" else open(args.moves)
+    results = open(args.results, "w") if args.results else None
+    try:
+        summary = run_moves(game, moves, results)
+    finally:
+        if moves is not sys.stdin:
+            moves.close()
+        if results is not None:
+            results.close()
+
+    if args.save and game.state.helper_board is None:
+        # With --safe-first-click, the mines wait for the first reveal
+        parser.error("can't --save a game whose mines aren't placed yet, "
+                     "reveal a cell first")
+
+    if args.save:
+        # Written next to it first, since the loaded file may be the same
+        # and is still mapped
+        temporary = args.save + ".tmp"
+        minesweeper_storage.save_game(temporary, game.board,
+                                      game.state.helper_board,
+                                      game.state.num_mines, seed)
+        os.replace(temporary, args.save)
+
+    m.print_board(game.board)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
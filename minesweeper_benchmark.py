@@ -0,0 +1,367 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import minesweeper as m
+import minesweeper_storage
+
+
+# Board sizes (rows = columns) used to check how generation time grows
+GENERATION_SIZES = [50, 100, 200, 400]
+
+# Board sizes and difficulties of the full benchmark suite
+BENCHMARK_SIZES = [10, 100, 500, 1000, 2000]
+BENCHMARK_DIFFICULTIES = ["EASY", "MEDIUM", "HARD"]
+
+# A timing is a regression when it is this much slower than the baseline.
+# Timings under MIN_COMPARED_TIME seconds are too noisy to compare.
+REGRESSION_THRESHOLD = 0.25
+MIN_COMPARED_TIME = 0.001
+
+
+def time_generation(size, difficulty, seed=0):
+    """
+    Time how long it takes to generate one square helper board.
+
+    Parameters:
+        size (int): Number of rows and columns of the board.
+        difficulty (float): Fraction of cells that will be mines.
+        seed (int): Seed given to random before generating the board.
+
+    Returns:
+        elapsed (float): Generation time in seconds.
+    """
+
+    nb_mines = int(difficulty * size * size)
+
+    random.seed(seed)
+    start = time.perf_counter()
+    m.generate_helper_board(size, size, nb_mines)
+    return time.perf_counter() - start
+
+
+def benchmark_generation(sizes=GENERATION_SIZES):
+    """
+    Print the generation time of every size at every difficulty.
+
+    The time per cell is printed as well: it should stay roughly the same
+    from one size to the next, which means generation is linear in the
+    number of cells.
+
+    Parameters:
+        sizes (list): Board sizes to benchmark.
+
+    Returns:
+        None
+    """
+
+    difficulties = [("EASY", m.EASY_DIFFICULTY),
+                    ("MEDIUM", m.MEDIUM_DIFFICULTY),
+                    ("HARD", m.HARD_DIFFICULTY)]
+
+    for name, difficulty in difficulties:
+        for size in sizes:
+            elapsed = time_generation(size, difficulty)
+            per_cell = elapsed / (size * size) * 1e9
+            print(name, str(size) + "x" + str(size),
+                  "%.4f s" % elapsed, "%.0f ns/cell" % per_cell)
+
+
+def time_call(repeat, function, *args):
+    """
+    Call a function several times and keep its fastest time.
+
+    The random seed isn't touched, so a seeded function gives the same
+    result on every call only if the caller seeds it before each call.
+
+    Parameters:
+        repeat (int): Number of calls.
+        function (callable): The function to time.
+        *args: Arguments given to the function.
+
+    Returns:
+        elapsed (float): Fastest time in seconds.
+        result (any): What the last call returned.
+    """
+
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, result
+
+
+def benchmark_case(size, difficulty, seed=0):
+    """
+    Time every engine function on one square board.
+
+    The board is played from a safe click in the middle (see
+    time_play()).
+
+    Parameters:
+        size (int): Number of rows and columns of the board.
+        difficulty (str): Difficulty level.
+        seed (int): Seed given to random before each seeded step.
+
+    Returns:
+        timings (dict): Seconds taken by each function, by name.
+    """
+
+    # Small boards are timed a few times to get past the noise
+    repeat = 5 if size <= 100 else 1
+    num_mines = m.get_num_mines(difficulty, size, size)
+    first_click = (size // 2, size // 2)
+    timings = {}
+
+    timings['init_board'], _ = time_call(repeat, m.init_board,
+                                         size, size, '?')
+
+    random.seed(seed)
+    timings['generate_helper_board'], _ = time_call(
+        1, m.generate_helper_board, size, size, num_mines)
+
+    random.seed(seed)
+    timings['init_game'], boards = time_call(
+        1, m.init_game, difficulty, size, size, first_click)
+    game_board, helper_board, _ = boards
+
+    timings.update(time_play(game_board, helper_board, first_click, repeat))
+
+    # Same game with the neighbour counts computed only when read
+    random.seed(seed)
+    timings['lazy_init_game'], boards = time_call(
+        1, m.init_game, difficulty, size, size, first_click, True)
+    game_board, helper_board, _ = boards
+    timings['lazy_solve'] = time_play(game_board, helper_board,
+                                      first_click)['solve']
+
+    return timings
+
+
+def time_play(game_board, helper_board, first_click, repeat=1):
+    """
+    Time the solver, is_game_over() and print_board() on a new game.
+
+    The solver starts from a safe cascade click, like the simulation
+    harness. is_game_over() is timed on the board the solver finished
+    with, and print_board() writes to memory instead of the terminal.
+
+    Parameters:
+        game_board (list): Visible board, all '?'.
+        helper_board (list): Board with mines and counts.
+        first_click (tuple): (row, col) of a cell without a mine.
+        repeat (int): Number of calls of the functions that can be repeated.
+
+    Returns:
+        timings (dict): Seconds taken by each function, by name.
+    """
+
+    timings = {}
+
+    def left_click(row, col):
+        m.reveal(helper_board, game_board, row, col)
+
+    def right_click(row, col):
+        m.flag(game_board, row, col)
+
+    def play():
+        m.reveal(helper_board, game_board, first_click[0], first_click[1],
+                 cascade=True)
+
+        # Compact boards solve themselves on their codes
+        solve_method = getattr(game_board, 'solve', None)
+        if solve_method is not None:
+            return solve_method(helper_board)
+        return m.solve(game_board, left_click, right_click)
+
+    timings['solve'], _ = time_call(1, play)
+
+    timings['is_game_over'], _ = time_call(repeat, m.is_game_over,
+                                           game_board, helper_board)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        timings['print_board'], _ = time_call(repeat, m.print_board,
+                                              game_board)
+
+    return timings
+
+
+def benchmark_fixture(path):
+    """
+    Time loading a saved game and playing it, like benchmark_case().
+
+    The fixture is a file written by minesweeper_storage, whose first
+    click is the middle cell. It is opened without writing back to it,
+    so it can be used again.
+
+    Parameters:
+        path (str): Saved game to load.
+
+    Returns:
+        timings (dict): Seconds taken by each function, by name.
+    """
+
+    timings = {}
+    timings['load_game'], loaded = time_call(
+        1, minesweeper_storage.load_game, path, False)
+    game_board, helper_board, _, _ = loaded
+
+    first_click = (len(game_board) // 2, len(game_board[0]) // 2)
+    timings.update(time_play(game_board, helper_board, first_click))
+
+    return timings
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES,
+                   difficulties=BENCHMARK_DIFFICULTIES, seed=0, log=None,
+                   fixtures=()):
+    """
+    Run benchmark_case() for every size and difficulty.
+
+    Parameters:
+        sizes (list): Board sizes to benchmark.
+        difficulties (list): Difficulty levels to benchmark.
+        seed (int): Seed used for every case.
+        log (file): Where to print progress, or None.
+        fixtures (list): Saved games to run benchmark_fixture() on too.
+
+    Returns:
+        report (dict): 'meta' describes the run and 'results' maps names
+                       like '100x100/EASY' or 'fixture:big.msw' to their
+                       timings.
+    """
+
+    report = {'meta': {'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'seed': seed},
+              'results': {}}
+
+    for size in sizes:
+        for difficulty in difficulties:
+            name = str(size) + "x" + str(size) + "/" + difficulty
+            report['results'][name] = benchmark_case(size, difficulty, seed)
+
+            if log is not None:
+                print(name, json.dumps(report['results'][name]), file=log)
+
+    for path in fixtures:
+        name = "fixture:" + os.path.basename(path)
+        report['results'][name] = benchmark_fixture(path)
+
+        if log is not None:
+            print(name, json.dumps(report['results'][name]), file=log)
+
+    return report
+
+
+def compare_reports(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Find the timings that got slower than a baseline by more than a margin.
+
+    Cases or functions missing from either report are skipped, and so are
+    timings under MIN_COMPARED_TIME in both reports.
+
+    Parameters:
+        report (dict): New report from run_benchmarks().
+        baseline (dict): Older report to compare against.
+        threshold (float): Allowed slowdown, 0.25 meaning 25% slower.
+
+    Returns:
+        regressions (list): (case, function, old, new) for each regression.
+
+    Examples:
+        >>> old = {'results': {'10x10/EASY': {'solve': 0.010}}}
+        >>> new = {'results': {'10x10/EASY': {'solve': 0.020}}}
+        >>> compare_reports(new, old)
+        [('10x10/EASY', 'solve', 0.01, 0.02)]
+        >>> compare_reports(old, new)
+        []
+    """
+
+    regressions = []
+
+    for case, timings in report['results'].items():
+        old_timings = baseline['results'].get(case, {})
+        for function, new in timings.items():
+            old = old_timings.get(function)
+            if old is None or max(old, new) < MIN_COMPARED_TIME:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append((case, function, old, new))
+
+    return regressions
+
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line.
+
+    Returns a non-zero exit code when --compare finds a regression, so it
+    can be used as a check.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        status (int): 0 if there is no regression, 1 otherwise.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Time the Minesweeper engine on growing boards.")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=BENCHMARK_SIZES)
+    parser.add_argument("--difficulties", nargs="+",
+                        default=BENCHMARK_DIFFICULTIES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON baseline to compare with")
+    parser.add_argument("--threshold", type=float,
+                        default=REGRESSION_THRESHOLD)
+    parser.add_argument("--generation", action="store_true",
+                        help="only print the generation scaling table")
+    parser.add_argument("--fixtures", nargs="+", default=[],
+                        help="saved games to benchmark instead of "
+                             "generated boards (see minesweeper_storage)")
+    args = parser.parse_args(argv)
+
+    if args.generation:
+        benchmark_generation()
+        return 0
+
+    sizes = [] if args.fixtures else args.sizes
+    report = run_benchmarks(sizes, args.difficulties, args.seed,
+                            sys.stderr, args.fixtures)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare_reports(report, baseline, args.threshold)
+        for case, function, old, new in regressions:
+            print("REGRESSION", case, function,
+                  "%.4f s -> %.4f s" % (old, new), file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
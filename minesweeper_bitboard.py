@@ -0,0 +1,625 @@
+"""
+Bitboard version of the Minesweeper boards, using Python integers as bitsets.
+
+The mines, the revealed cells and the flags are each stored as one
+integer with one bit per cell. Cell (row, col) is bit row * stride + col,
+where the stride is the number of columns plus one: the extra bit at the
+end of each row is always 0, so shifting a whole board left or right by
+one never moves a cell into the next row. Neighbour counts for every
+cell come from 8 shifts added together with bit-sliced adders, and the
+solver rules from a few masks, with no loop over the cells and no
+third-party module.
+"""
+
+import random
+from array import array
+
+import minesweeper as m
+
+
+# Every byte spread over 8 bytes, one bit per byte with the lowest first
+_SPREAD_BYTE = [bytes((byte >> k) & 1 for k in range(8))
+                for byte in range(256)]
+
+
+def popcount(bits):
+    """
+    Count the bits set in a bitset.
+
+    Parameters:
+        bits (int): The bitset.
+
+    Returns:
+        count (int): Number of bits set.
+
+    Examples:
+        >>> popcount(0b10110)
+        3
+    """
+
+    return bin(bits).count("1")
+
+
+def add_bits(planes, bits):
+    """
+    Add a bitset to a bit-sliced counter, one bit per cell.
+
+    planes[k] holds bit k of every cell's count, so adding a bitset is a
+    ripple of half adders over the planes.
+
+    Parameters:
+        planes (list): The counter planes, changed in place.
+        bits (int): Cells to add 1 to.
+
+    Returns:
+        None
+
+    Examples:
+        >>> planes = [0, 0, 0, 0]
+        >>> for bits in (0b11, 0b10, 0b10):
+        ...     add_bits(planes, bits)
+        >>> planes
+        [3, 2, 0, 0]
+    """
+
+    for k in range(len(planes)):
+        carry = planes[k] & bits
+        planes[k] ^= bits
+        bits = carry
+        if not bits:
+            return
+
+
+def equal_planes(first, second, full):
+    """
+    Find the cells where two bit-sliced counters are equal.
+
+    Parameters:
+        first (list): Planes of the first counter.
+        second (list): Planes of the second counter.
+        full (int): Bitset of every cell of the board.
+
+    Returns:
+        equal (int): Bitset of the cells with the same count.
+
+    Examples:
+        >>> equal_planes([0b01, 0b10], [0b11, 0b10], 0b11)
+        1
+    """
+
+    equal = full
+    for a, b in zip(first, second):
+        equal &= ~(a ^ b)
+    return equal
+
+
+class BitBoard:
+    """
+    The mines, revealed cells and flags of a game as three bitsets.
+
+    Examples:
+        >>> bb = BitBoard.from_boards([['0', '1', '?']], [[0, 1, -1]])
+        >>> bb.helper_lists()
+        [[0, 1, -1]]
+        >>> bb.is_game_over()
+        True
+        >>> bb.game_lists()
+        [['0', '1', '?']]
+    """
+
+    def __init__(self, nb_rows, nb_cols, mines=0, revealed=0, flags=0):
+        """
+        Create a bitboard.
+
+        Parameters:
+            nb_rows (int): Number of rows.
+            nb_cols (int): Number of columns.
+            mines (int): Bitset of the mines.
+            revealed (int): Bitset of the revealed cells.
+            flags (int): Bitset of the flags.
+        """
+
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+        self.stride = nb_cols + 1
+
+        self.mines = mines
+        self.revealed = revealed
+        self.flags = flags
+
+        # Every cell of the board, without the padding bit of each row
+        row_bits = (1 << nb_cols) - 1
+        self.full = self.spread_rows(row_bits)
+
+        # Neighbour counts of the mines, computed when first needed
+        self._counts = None
+
+    def spread_rows(self, row_bits):
+        """
+        Repeat the bits of one row on every row of the board.
+
+        Parameters:
+            row_bits (int): Bits of a single row.
+
+        Returns:
+            bits (int): The same bits on every row.
+        """
+
+        # Doubling the number of rows each time keeps this logarithmic
+        bits = row_bits
+        rows = 1
+        while rows < self.nb_rows:
+            count = min(rows, self.nb_rows - rows)
+            bits |= (bits & ((1 << count * self.stride) - 1)) << (
+                rows * self.stride)
+            rows += count
+        return bits
+
+    def index(self, row, col):
+        """
+        Get the bit index of a cell.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            index (int): Position of the cell's bit.
+        """
+
+        return row * self.stride + col
+
+    def bits_from_positions(self, positions):
+        """
+        Build a bitset from (row, col) positions.
+
+        Bits are set in a bytearray first, since setting them one by one
+        on an integer would copy the integer every time.
+
+        Parameters:
+            positions (iterable): The (row, col) pairs to set.
+
+        Returns:
+            bits (int): Bitset of those cells.
+
+        Examples:
+            >>> BitBoard(2, 2).bits_from_positions([(0, 1), (1, 0)]) == (
+            ...     0b01010)
+            True
+        """
+
+        data = bytearray((self.nb_rows * self.stride + 7) // 8)
+        for row, col in positions:
+            index = row * self.stride + col
+            data[index >> 3] |= 1 << (index & 7)
+        return int.from_bytes(data, "little")
+
+    @classmethod
+    def from_boards(cls, game_board, helper_board):
+        """
+        Build a bitboard from list of lists boards.
+
+        Parameters:
+            game_board (list): Visible board, or None for an unplayed game.
+            helper_board (list): Board with mines and counts.
+
+        Returns:
+            bitboard (BitBoard): The same game as bitsets.
+        """
+
+        nb_rows = len(helper_board)
+        nb_cols = len(helper_board[0])
+        board = cls(nb_rows, nb_cols)
+
+        mines = []
+        revealed = []
+        flags = []
+        for i in range(nb_rows):
+            helper_row = helper_board[i]
+            game_row = game_board[i] if game_board is not None else None
+            for j in range(nb_cols):
+                if helper_row[j] == -1:
+                    mines.append((i, j))
+                if game_row is not None:
+                    value = game_row[j]
+                    if value == '⚑':
+                        flags.append((i, j))
+                    elif value != '?':
+                        revealed.append((i, j))
+
+        board.mines = board.bits_from_positions(mines)
+        board.revealed = board.bits_from_positions(revealed)
+        board.flags = board.bits_from_positions(flags)
+        return board
+
+    def shift(self, bits, d_row, d_col):
+        """
+        Move every cell's bit to the cell (d_row, d_col) away from it.
+
+        After the shift, a cell's bit is the bit its neighbour in that
+        direction had. Bits leaving the board are dropped.
+
+        Parameters:
+            bits (int): The bitset to shift.
+            d_row (int): Row offset of the neighbour (-1, 0 or 1).
+            d_col (int): Column offset of the neighbour (-1, 0 or 1).
+
+        Returns:
+            shifted (int): The shifted bitset.
+        """
+
+        offset = d_row * self.stride + d_col
+        if offset > 0:
+            return (bits >> offset) & self.full
+        return (bits << -offset) & self.full
+
+    def neighbour_planes(self, bits):
+        """
+        Count, for every cell, how many of its neighbours are set.
+
+        Parameters:
+            bits (int): The bitset to count.
+
+        Returns:
+            planes (list): 4 bitsets, bit k of every cell's count.
+
+        Examples:
+            >>> bb = BitBoard(2, 3)
+            >>> planes = bb.neighbour_planes(
+            ...     bb.bits_from_positions([(0, 0), (1, 2)]))
+            >>> bb.planes_to_lists(planes)
+            [[0, 2, 1], [1, 2, 0]]
+        """
+
+        planes = [0, 0, 0, 0]
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                if d_row or d_col:
+                    add_bits(planes, self.shift(bits, d_row, d_col))
+        return planes
+
+    def dilate(self, bits):
+        """
+        Get the cells that have at least one neighbour set.
+
+        Parameters:
+            bits (int): The bitset to grow.
+
+        Returns:
+            grown (int): Bitset of the neighbours of the set cells.
+        """
+
+        grown = 0
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                if d_row or d_col:
+                    grown |= self.shift(bits, d_row, d_col)
+        return grown
+
+    def counts(self):
+        """
+        Get the neighbour counts of the mines, computed once.
+
+        Returns:
+            planes (list): 4 bitsets, bit k of every cell's count.
+        """
+
+        if self._counts is None:
+            self._counts = self.neighbour_planes(self.mines)
+        return self._counts
+
+    def spread(self, bits):
+        """
+        Turn a bitset into an integer with one byte per bit position.
+
+        Parameters:
+            bits (int): The bitset.
+
+        Returns:
+            spread (int): Byte i is 1 if bit i is set, 0 otherwise.
+        """
+
+        data = bits.to_bytes((self.nb_rows * self.stride + 7) // 8,
+                             "little")
+        return int.from_bytes(b"".join([_SPREAD_BYTE[byte] for byte in data]),
+                              "little")
+
+    def spread_cells(self, planes, marks=()):
+        """
+        Get one signed byte per cell from counter planes.
+
+        Since a count is at most 8, adding the spread planes with their
+        weights never carries from one byte to the next.
+
+        Parameters:
+            planes (list): Counter planes.
+            marks (list): (bits, byte) pairs, whose cells get that byte
+                          instead of their count, in order.
+
+        Returns:
+            cells (array): Bytes of the board rows, stride bytes per row.
+        """
+
+        total = 0
+        for k, plane in enumerate(planes):
+            if plane:
+                total += self.spread(plane) << k
+
+        for bits, byte in marks:
+            if bits:
+                spread_bits = self.spread(bits)
+                total &= ~(spread_bits * 0xFF)
+                total |= spread_bits * byte
+
+        cells = array('b')
+        cells.frombytes(total.to_bytes(self.nb_rows * self.stride + 8,
+                                       "little"))
+        return cells
+
+    def planes_to_lists(self, planes, marks=()):
+        """
+        Convert counter planes to a list of lists of counts.
+
+        Parameters:
+            planes (list): Counter planes.
+            marks (list): (bits, byte) pairs, see spread_cells().
+
+        Returns:
+            board (list): The counts, row by row.
+        """
+
+        cells = self.spread_cells(planes, marks)
+        return [cells[row * self.stride:row * self.stride + self.nb_cols]
+                .tolist() for row in range(self.nb_rows)]
+
+    def helper_lists(self):
+        """
+        Get the helper board as a list of lists, like generate_helper_board().
+
+        Returns:
+            board (list): -1 for mines and neighbour counts otherwise.
+        """
+
+        return self.planes_to_lists(self.counts(), [(self.mines, 0xFF)])
+
+    def game_lists(self):
+        """
+        Get the game board as a list of lists of characters.
+
+        Returns:
+            board (list): '?', '⚑' or the revealed number of each cell.
+        """
+
+        hidden = self.full & ~self.revealed
+        codes = self.planes_to_lists(
+            [plane & self.revealed for plane in self.counts()],
+            [(hidden, m.UNKNOWN_CODE & 0xFF),
+             (self.flags, m.FLAG_CODE & 0xFF)])
+
+        return [[m.decode_cell(code) for code in row] for row in codes]
+
+    def is_game_over(self):
+        """
+        Check if every safe cell is revealed, with a single mask compare.
+
+        Like minesweeper.is_game_over(), a flagged safe cell isn't '?'
+        anymore, so it counts as done.
+
+        Returns:
+            over (bool): True if the game is won, False otherwise.
+        """
+
+        return (self.revealed | self.flags | self.mines) == self.full
+
+    def reveal(self, row, col):
+        """
+        Reveal a cell, like reveal().
+
+        Parameters:
+            row (int): Row index to reveal.
+            col (int): Column index to reveal.
+
+        Returns:
+            None
+        """
+
+        bit = 1 << self.index(row, col)
+        if self.mines & bit:
+            raise AssertionError("BOOM! You lost.")
+        self.revealed |= bit
+        self.flags &= ~bit
+
+    def reveal_cascade(self, row, col):
+        """
+        Reveal a cell and open the zero region around it.
+
+        The unknown neighbours of every revealed zero are revealed, the
+        whole board at once, until no zero has unknown neighbours left.
+        This opens the same cells as reveal_cascade() from a new board.
+
+        Parameters:
+            row (int): Row index to reveal.
+            col (int): Column index to reveal.
+
+        Returns:
+            count (int): Number of cells revealed.
+
+        Examples:
+            >>> bb = BitBoard.from_boards(None, [[0, 0, 1, -1]])
+            >>> bb.reveal_cascade(0, 0), bb.game_lists()
+            (3, [['0', '0', '1', '?']])
+        """
+
+        before = self.revealed
+        self.reveal(row, col)
+
+        # Cells with a count of 0 that aren't mines
+        nonzero = self.mines
+        for plane in self.counts():
+            nonzero |= plane
+        zeros = self.full & ~nonzero
+
+        opened = self.revealed & zeros
+        while opened:
+            new = self.dilate(opened) & ~(self.revealed | self.flags)
+            self.revealed |= new
+            opened = new & zeros
+
+        return popcount(self.revealed & ~before)
+
+    def flag(self, row, col):
+        """
+        Switch between unknown and flagged on a cell, like flag().
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            None
+        """
+
+        bit = 1 << self.index(row, col)
+        if not self.revealed & bit:
+            self.flags ^= bit
+
+    def solve_step(self):
+        """
+        Find every move the two rules of solve_cell() allow right now.
+
+        A revealed number whose flags match it makes its unknown
+        neighbours safe, and a revealed number that needs all its unknown
+        neighbours to be mines makes them flags. The comparisons are done
+        on the bit-sliced counts of the whole board at once.
+
+        Returns:
+            safe (int): Bitset of the unknown cells to reveal.
+            mines (int): Bitset of the unknown cells to flag.
+
+        Examples:
+            >>> bb = BitBoard.from_boards([['?', '2', '?']], [[-1, 2, -1]])
+            >>> bb.solve_step() == (0, bb.mines)
+            True
+        """
+
+        unknown = self.full & ~(self.revealed | self.flags)
+        unknown_planes = self.neighbour_planes(unknown)
+        flag_planes = self.neighbour_planes(self.flags)
+        numbers = [plane & self.revealed for plane in self.counts()]
+
+        # flags + unknown, added one plane at a time
+        needed = list(flag_planes) + [0]
+        for k, plane in enumerate(unknown_planes):
+            carry = plane
+            for level in range(k, len(needed)):
+                next_carry = needed[level] & carry
+                needed[level] ^= carry
+                carry = next_carry
+                if not carry:
+                    break
+
+        has_unknown = 0
+        for plane in unknown_planes:
+            has_unknown |= plane
+        sources = self.revealed & has_unknown
+
+        done = sources & equal_planes(numbers, flag_planes, self.full)
+        full = sources & equal_planes(numbers + [0], needed, self.full)
+
+        return unknown & self.dilate(done), unknown & self.dilate(full)
+
+    def solve(self):
+        """
+        Apply solve_step() until nothing changes, like solve().
+
+        Both rules only make moves that are certain, so the board ends
+        the same as with solve() and plain reveal() and flag() clicks,
+        with the same number of clicks.
+
+        Returns:
+            result (dict): 'status' is 'solved' or 'stuck', with the
+                           'left_clicks', 'right_clicks' and 'steps'.
+
+        Examples:
+            >>> bb = BitBoard.from_boards([['0', '?', '?']], [[0, 1, -1]])
+            >>> result = bb.solve()
+            >>> result['status'], result['left_clicks'], result['right_clicks']
+            ('solved', 1, 1)
+            >>> bb.game_lists()
+            [['0', '1', '⚑']]
+        """
+
+        result = {'status': 'stuck', 'left_clicks': 0, 'right_clicks': 0,
+                  'steps': 0}
+
+        while True:
+            safe, mines = self.solve_step()
+            result['steps'] += 1
+            if not safe and not mines:
+                break
+
+            if safe & self.mines:
+                raise AssertionError("BOOM! You lost.")
+
+            self.revealed |= safe
+            self.flags |= mines
+            result['left_clicks'] += popcount(safe)
+            result['right_clicks'] += popcount(mines)
+
+        if (self.revealed | self.flags) == self.full:
+            result['status'] = 'solved'
+
+        return result
+
+
+def generate_helper_board(nb_rows, nb_cols, nb_mines, excluded=None,
+                          rng=None):
+    """
+    Generate a bitboard with mines, like minesweeper.generate_helper_board().
+
+    The mines are drawn in the same order from rng, so a seed gives the
+    same board as minesweeper.generate_helper_board().
+
+    Parameters:
+        nb_rows (int): Number of rows.
+        nb_cols (int): Number of columns.
+        nb_mines (int): Number of mines to place.
+        excluded (list): Optional (row, col) positions that can't be mines.
+        rng (Random): Random generator to use, the random module by default.
+
+    Returns:
+        bitboard (BitBoard): Board with the mines and nothing revealed.
+
+    Examples:
+        >>> random.seed(5)
+        >>> lists = m.generate_helper_board(6, 7, 12)
+        >>> random.seed(5)
+        >>> generate_helper_board(6, 7, 12).helper_lists() == lists
+        True
+        >>> board = generate_helper_board(6, 7, 12, rng=random.Random(5))
+        >>> board.helper_lists() == lists
+        True
+    """
+
+    if rng is None:
+        rng = random
+
+    board = BitBoard(nb_rows, nb_cols)
+
+    if not excluded and nb_mines <= m.HARD_DIFFICULTY * nb_rows * nb_cols:
+        # Same draws as new_mine_position() called by place_mines()
+        taken = set()
+        positions = []
+        while len(positions) < nb_mines:
+            row = rng.randint(0, nb_rows - 1)
+            col = rng.randint(0, nb_cols - 1)
+            if (row, col) not in taken:
+                taken.add((row, col))
+                positions.append((row, col))
+    else:
+        positions = m.sample_mine_positions(nb_rows, nb_cols, nb_mines,
+                                            excluded or (), rng)
+
+    board.mines = board.bits_from_positions(positions)
+    return board
+
@@ -0,0 +1,481 @@
+from array import array
+
+import minesweeper as m
+
+
+# Byte translations turning each cell into 1 or 0: unknown game cells,
+# and safe helper cells
+_UNKNOWN_BYTES = bytes(int(byte == m.UNKNOWN_CODE & 0xFF)
+                       for byte in range(256))
+_SAFE_BYTES = bytes(int(byte != 0xFF) for byte in range(256))
+
+# Cells counted at a time by count_states()
+_COUNT_BLOCK = 1 << 20
+
+
+class Board:
+    """
+    A compact board stored as one flat array of small integers.
+
+    Cell (row, col) is at index row * nb_cols + col. A game board stores
+    the codes from minesweeper (UNKNOWN_CODE, FLAG_CODE or the revealed
+    number) and a helper board stores -1 for mines and the neighbour counts
+    otherwise, so every cell takes a single byte.
+
+    board[row][col] reads and writes cells like the list of lists boards,
+    with game board cells shown as '?', '⚑' or the number as a string.
+    Each of those reads builds a row object and decodes the cell, so the
+    loops that matter, like solve(), work on the codes of cells instead.
+
+    Examples:
+        >>> g = Board(2, 3)
+        >>> g.flag(0, 1)
+        >>> g.print_board()
+        ? ⚑ ?
+        ? ? ?
+        >>> g[0][1], len(g), len(g[0])
+        ('⚑', 2, 3)
+        >>> h = Board.from_lists([[0, 1], [-1, 1]], game=False)
+        >>> h[1][0]
+        -1
+    """
+
+    __slots__ = ('nb_rows', 'nb_cols', 'cells', 'game', 'offsets')
+
+    def __init__(self, nb_rows, nb_cols, value=m.UNKNOWN_CODE, game=True,
+                 cells=None):
+        """
+        Create a board filled with a single code.
+
+        Parameters:
+            nb_rows (int): Number of rows.
+            nb_cols (int): Number of columns.
+            value (int): Code stored in every cell.
+            game (bool): True for a game board, False for a helper board.
+            cells (array): Optional existing cells to use instead, an
+                           array or a memoryview of signed bytes.
+        """
+
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+        self.game = game
+
+        if cells is None:
+            cells = array('b', [value]) * (nb_rows * nb_cols)
+        self.cells = cells
+
+        # Index differences to the 8 neighbours of a cell inside the board
+        self.offsets = (-nb_cols - 1, -nb_cols, -nb_cols + 1, -1,
+                        1, nb_cols - 1, nb_cols, nb_cols + 1)
+
+    @classmethod
+    def from_lists(cls, board, game=True):
+        """
+        Build a Board from a list of lists board.
+
+        Parameters:
+            board (list): Game board of characters or helper board of ints.
+            game (bool): True for a game board, False for a helper board.
+
+        Returns:
+            board (Board): The same board stored compactly.
+
+        Examples:
+            >>> Board.from_lists([['?', '⚑'], ['1', '?']]).cells.tolist()
+            [-2, -3, 1, -2]
+        """
+
+        cells = array('b')
+        for row in board:
+            cells.extend(m.encode_cell(value) for value in row)
+
+        return cls(len(board), len(board[0]), game=game, cells=cells)
+
+    def to_lists(self):
+        """
+        Convert the Board back to a list of lists board.
+
+        Returns:
+            board (list): Characters for a game board, ints for a helper.
+
+        Examples:
+            >>> Board(1, 2).to_lists()
+            [['?', '?']]
+            >>> Board(1, 2, 0, game=False).to_lists()
+            [[0, 0]]
+        """
+
+        return [self[row][:] for row in range(self.nb_rows)]
+
+    def __len__(self):
+        return self.nb_rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.nb_rows:
+            raise IndexError("board row out of range")
+        return _BoardRow(self, row * self.nb_cols)
+
+    def get(self, row, col):
+        """
+        Get the raw code of a cell.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            code (int): The code stored in the cell.
+        """
+
+        return self.cells[row * self.nb_cols + col]
+
+    def count_total(self, value):
+        """
+        Count how many times a value appears on the board.
+
+        Parameters:
+            value (any): A code, or a game board character like '?'.
+
+        Returns:
+            count (int): Number of occurrences of the value.
+
+        Examples:
+            >>> Board.from_lists([['?', '⚑'], ['1', '?']]).count_total('?')
+            2
+        """
+
+        code = m.encode_cell(value)
+        if isinstance(self.cells, array):
+            return self.cells.count(code)
+
+        # Cells viewed from a mapped file are counted a block at a time
+        target = bytes([code & 0xFF])
+        block = 1 << 20
+        return sum(self.cells[start:start + block].tobytes().count(target)
+                   for start in range(0, len(self.cells), block))
+
+    def neighbour_indices(self, index):
+        """
+        Get the flat indices of all the neighbours of a flat index.
+
+        Parameters:
+            index (int): Flat index of the central cell.
+
+        Returns:
+            neighbours (tuple): Flat indices of the neighbouring cells.
+
+        Examples:
+            >>> Board(3, 3).neighbour_indices(4)
+            (0, 1, 2, 3, 5, 6, 7, 8)
+            >>> Board(2, 2).neighbour_indices(0)
+            (1, 2, 3)
+        """
+
+        # Small boards share the cached table of their shape
+        if self.nb_rows * self.nb_cols <= m.NEIGHBOUR_TABLE_MAX_CELLS:
+            return m.flat_neighbour_table(self.nb_rows, self.nb_cols)[index]
+
+        row, col = divmod(index, self.nb_cols)
+
+        # Cells away from the edges use the precomputed offsets directly
+        if 0 < row < self.nb_rows - 1 and 0 < col < self.nb_cols - 1:
+            return tuple(index + offset for offset in self.offsets)
+
+        neighbours = []
+        for i in range(max(row - 1, 0), min(row + 2, self.nb_rows)):
+            for j in range(max(col - 1, 0), min(col + 2, self.nb_cols)):
+                if i != row or j != col:
+                    neighbours.append(i * self.nb_cols + j)
+
+        return tuple(neighbours)
+
+    def get_neighbour_positions(self, row, col):
+        """
+        Get all the valid neighbour positions around a cell.
+
+        Parameters:
+            row (int): Row index of the central cell.
+            col (int): Column index of the central cell.
+
+        Returns:
+            neighbour_positions (list): List of [row, col] pairs.
+
+        Examples:
+            >>> Board(2, 2).get_neighbour_positions(1, 1)
+            [[0, 0], [0, 1], [1, 0]]
+        """
+
+        return [list(divmod(index, self.nb_cols))
+                for index in self.neighbour_indices(row * self.nb_cols + col)]
+
+    def count_neighbours(self, row, col, value):
+        """
+        Count how many neighbouring cells contain a given value.
+
+        Parameters:
+            row (int): Row index of the central cell.
+            col (int): Column index of the central cell.
+            value (any): A code, or a game board character like '⚑'.
+
+        Returns:
+            count (int): Number of neighbouring cells with the value.
+
+        Examples:
+            >>> h = Board.from_lists([[-1, 1, 0], [1, 2, 1], [0, 1, -1]],
+            ...                      game=False)
+            >>> h.count_neighbours(1, 1, -1)
+            2
+        """
+
+        code = m.encode_cell(value)
+        cells = self.cells
+
+        count = 0
+        for index in self.neighbour_indices(row * self.nb_cols + col):
+            if cells[index] == code:
+                count += 1
+
+        return count
+
+    def flag(self, row, col):
+        """
+        Switch between unknown and flagged on a game board.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            None
+
+        Examples:
+            >>> g = Board(1, 2)
+            >>> g.flag(0, 0)
+            >>> g.to_lists()
+            [['⚑', '?']]
+            >>> g.flag(0, 0)
+            >>> g.to_lists()
+            [['?', '?']]
+        """
+
+        index = row * self.nb_cols + col
+        if self.cells[index] == m.UNKNOWN_CODE:
+            self.cells[index] = m.FLAG_CODE
+        elif self.cells[index] == m.FLAG_CODE:
+            self.cells[index] = m.UNKNOWN_CODE
+
+    def reveal(self, helper_board, row, col):
+        """
+        Reveal a cell of this game board using a helper Board.
+
+        Parameters:
+            helper_board (Board): Helper board with mines and counts.
+            row (int): Row index to reveal.
+            col (int): Column index to reveal.
+
+        Returns:
+            None
+
+        Examples:
+            >>> h = Board.from_lists([[0, 1], [-1, 2]], game=False)
+            >>> g = Board(2, 2)
+            >>> g.reveal(h, 0, 1)
+            >>> g.to_lists()
+            [['?', '1'], ['?', '?']]
+        """
+
+        index = row * self.nb_cols + col
+        value = helper_board.cells[index]
+
+        if value == -1:
+            raise AssertionError("BOOM! You lost.")
+
+        self.cells[index] = value
+
+    def solve(self, helper_board, exact=False):
+        """
+        Solve this game board like minesweeper.solve(), on the codes.
+
+        This runs minesweeper.solve_cells() like minesweeper.solve(), but
+        on the array of codes itself, without building rows or decoding
+        cells. The clicks reveal from helper_board and flag this board
+        directly.
+
+        Parameters:
+            helper_board (Board): Helper board with mines and counts.
+            exact (bool): Whether to use solve_constraints() when stuck.
+
+        Returns:
+            result (dict): Same as minesweeper.solve().
+
+        Examples:
+            >>> h = Board.from_lists([[0, 1, -1]], game=False)
+            >>> g = Board.from_lists([['0', '?', '?']])
+            >>> result = g.solve(h)
+            >>> result['status'], result['left_clicks'], g.to_lists()
+            ('solved', 1, [['0', '1', '⚑']])
+            >>> h = Board.from_lists([[-1, 1, -1], [1, 2, 1]], game=False)
+            >>> g = Board.from_lists([['?', '?', '?'], ['1', '2', '1']])
+            >>> g.solve(h)['status'], g.solve(h, exact=True)['exact_moves']
+            ('stuck', 3)
+        """
+
+        cells = self.cells
+        helper_cells = helper_board.cells
+        nb_cells = self.nb_rows * self.nb_cols
+
+        def left_click(index):
+            value = helper_cells[index]
+            if value == -1:
+                raise AssertionError("BOOM! You lost.")
+            cells[index] = value
+
+        def right_click(index):
+            cells[index] = m.FLAG_CODE
+
+        # The cells are the codes already, so reading them back is direct
+        return m.solve_cells(self, cells, cells.__getitem__,
+                             m.flat_neighbours(self.nb_rows, self.nb_cols),
+                             left_click, right_click, range(nb_cells),
+                             cells.count(m.UNKNOWN_CODE), [None] * nb_cells,
+                             exact)
+
+    def count_states(self, helper_board):
+        """
+        Count the flags, the revealed cells and the safe unknown cells.
+
+        The cells are counted a block at a time as bytes, without reading
+        each cell in Python, which is what GameState.recount() needs when
+        a saved game is opened.
+
+        Parameters:
+            helper_board (Board): Helper board with mines and counts, or
+                                  None if the mines aren't placed yet.
+
+        Returns:
+            counts (tuple): (flags, revealed, safe_left), like
+                            GameState.recount().
+
+        Examples:
+            >>> h = Board.from_lists([[0, 1], [-1, 1]], game=False)
+            >>> Board.from_lists([['0', '?'], ['⚑', '?']]).count_states(h)
+            (1, 1, 2)
+        """
+
+        flag = bytes([m.FLAG_CODE & 0xFF])
+        unknown = bytes([m.UNKNOWN_CODE & 0xFF])
+        nb_cells = self.nb_rows * self.nb_cols
+        flags = 0
+        unknowns = 0
+        safe_left = 0
+
+        for start in range(0, nb_cells, _COUNT_BLOCK):
+            data = bytes(self.cells[start:start + _COUNT_BLOCK])
+            flags += data.count(flag)
+            unknowns += data.count(unknown)
+
+            # One bit per byte for unknown cells and for safe cells, and
+            # the cells that are both are the bits left by a bitwise and
+            if isinstance(helper_board, Board):
+                unknown_bits = int.from_bytes(data.translate(_UNKNOWN_BYTES),
+                                              "little")
+                safe_bits = int.from_bytes(
+                    bytes(helper_board.cells[start:start + _COUNT_BLOCK])
+                    .translate(_SAFE_BYTES), "little")
+                safe_left += bin(unknown_bits & safe_bits).count("1")
+
+        # Other helper boards are read for the unknown cells only
+        if helper_board is not None and not isinstance(helper_board, Board):
+            nb_cols = self.nb_cols
+            for index, code in enumerate(self.cells):
+                if (code == m.UNKNOWN_CODE and helper_board[index // nb_cols]
+                        [index % nb_cols] != -1):
+                    safe_left += 1
+
+        return flags, nb_cells - flags - unknowns, safe_left
+
+    def is_game_over(self, helper_board):
+        """
+        Check if all safe cells have been revealed.
+
+        Any other helper board, like a list of lists, is read cell by
+        cell instead.
+
+        Parameters:
+            helper_board (Board): Helper board with mines and counts.
+
+        Returns:
+            over (bool): True if the game is won, False otherwise.
+
+        Examples:
+            >>> h = Board.from_lists([[0, -1]], game=False)
+            >>> g = Board(1, 2)
+            >>> g.is_game_over(h)
+            False
+            >>> g.reveal(h, 0, 0)
+            >>> g.is_game_over(h)
+            True
+            >>> m.is_game_over(Board(2, 2), [[0, 1], [-1, 1]])
+            False
+        """
+
+        if not isinstance(helper_board, Board):
+            nb_cols = self.nb_cols
+            for index, code in enumerate(self.cells):
+                if (code == m.UNKNOWN_CODE and helper_board[index // nb_cols]
+                        [index % nb_cols] != -1):
+                    return False
+            return True
+
+        for code, value in zip(self.cells, helper_board.cells):
+            if code == m.UNKNOWN_CODE and value != -1:
+                return False
+
+        return True
+
+    def print_board(self):
+        """
+        Print the board to the console, row by row.
+
+        Returns:
+            None
+
+        Examples:
+            >>> Board.from_lists([[0, -1]], game=False).print_board()
+            0 -1
+        """
+
+        for row in range(self.nb_rows):
+            print(" ".join(str(value) for value in self[row]))
+
+
+class _BoardRow:
+    """
+    One row of a Board, indexed like a row of a list of lists board.
+    """
+
+    __slots__ = ('board', 'start')
+
+    def __init__(self, board, start):
+        self.board = board
+        self.start = start
+
+    def __len__(self):
+        return self.board.nb_cols
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return [self[i] for i in range(*col.indices(self.board.nb_cols))]
+
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+
+        code = self.board.cells[self.start + col]
+        if self.board.game:
+            return m.decode_cell(code)
+        return code
+
+    def __setitem__(self, col, value):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        self.board.cells[self.start + col] = m.encode_cell(value)
@@ -0,0 +1,463 @@
+import hashlib
+import random
+from array import array
+
+import minesweeper as m
+
+
+# Number of rows and columns of one chunk
+CHUNK_SIZE = 64
+
+
+def chunk_seed(seed, chunk_row, chunk_col):
+    """
+    Mix the game seed and the position of a chunk into the chunk's seed.
+
+    Parameters:
+        seed (int): Seed of the whole board.
+        chunk_row (int): Row index of the chunk.
+        chunk_col (int): Column index of the chunk.
+
+    Returns:
+        chunk_seed (int): A 64 bit seed for that chunk only.
+
+    Examples:
+        >>> chunk_seed(1, 0, 0) == chunk_seed(1, 0, 0)
+        True
+        >>> chunk_seed(1, 0, 1) == chunk_seed(1, 1, 0)
+        False
+    """
+
+    key = (str(seed) + ":" + str(chunk_row) + ":" + str(chunk_col)).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+class ChunkedHelperBoard:
+    """
+    A helper board split into square chunks whose mines are made on demand.
+
+    Each chunk gets int(fraction * cells of the chunk) mines, placed with
+    its own random generator seeded by chunk_seed(). A chunk is only
+    generated the first time one of its cells (or a neighbour of one of
+    its cells) is read, and it only stores which cells are mines. The
+    neighbour counts are computed when asked, reading the chunks around
+    when the cell is on a chunk edge, and cached.
+
+    board[row][col] reads cells like the list of lists helper boards, so
+    reveal(), reveal_cascade() and the solver work with it.
+
+    Examples:
+        >>> h = ChunkedHelperBoard(10 ** 6, 10 ** 6, "EASY", seed=3)
+        >>> h.num_mines
+        99853515625
+        >>> value = h[123456][654321]
+        >>> -1 <= value <= 8, h.explored_chunks() <= 9
+        (True, True)
+        >>> ChunkedHelperBoard(10 ** 6, 10 ** 6, "EASY", 3)[123456][654321] == value
+        True
+    """
+
+    def __init__(self, nb_rows, nb_cols, difficulty, seed=0,
+                 chunk_size=CHUNK_SIZE):
+        """
+        Create the board without generating any chunk.
+
+        Parameters:
+            nb_rows (int): Number of rows.
+            nb_cols (int): Number of columns.
+            difficulty (str): Difficulty level or custom fraction.
+            seed (int): Seed of the whole board.
+            chunk_size (int): Number of rows and columns of a chunk.
+        """
+
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+        self.fraction = m.get_difficulty(difficulty)
+
+        # Mine masks and cached counts of the generated chunks
+        self.mines = {}
+        self.counts = {}
+
+        self.num_mines = self.count_mines()
+
+    def __len__(self):
+        return self.nb_rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.nb_rows:
+            raise IndexError("board row out of range")
+        return _HelperRow(self, row)
+
+    def chunk_shape(self, chunk_row, chunk_col):
+        """
+        Get the number of rows and columns of a chunk (smaller at the edges).
+
+        Parameters:
+            chunk_row (int): Row index of the chunk.
+            chunk_col (int): Column index of the chunk.
+
+        Returns:
+            shape (tuple): (rows, cols) of the chunk.
+        """
+
+        size = self.chunk_size
+        return (min(size, self.nb_rows - chunk_row * size),
+                min(size, self.nb_cols - chunk_col * size))
+
+    def count_mines(self):
+        """
+        Compute the total number of mines without generating any chunk.
+
+        All the chunks have the same shape except the last row and column
+        of chunks, so there are at most 4 different shapes to count.
+
+        Returns:
+            num_mines (int): Total number of mines on the board.
+        """
+
+        size = self.chunk_size
+        full_rows, last_rows = divmod(self.nb_rows, size)
+        full_cols, last_cols = divmod(self.nb_cols, size)
+
+        num_mines = 0
+        for rows, nb_chunk_rows in ((size, full_rows), (last_rows, 1)):
+            for cols, nb_chunk_cols in ((size, full_cols), (last_cols, 1)):
+                if rows and cols:
+                    num_mines += (nb_chunk_rows * nb_chunk_cols
+                                  * int(self.fraction * rows * cols))
+
+        return num_mines
+
+    def chunk_mines(self, chunk_row, chunk_col):
+        """
+        Get the mine mask of a chunk, generating it the first time.
+
+        Parameters:
+            chunk_row (int): Row index of the chunk.
+            chunk_col (int): Column index of the chunk.
+
+        Returns:
+            mines (bytearray): 1 for a mine, 0 otherwise, row by row.
+        """
+
+        key = (chunk_row, chunk_col)
+        mines = self.mines.get(key)
+        if mines is None:
+            rows, cols = self.chunk_shape(chunk_row, chunk_col)
+            rng = random.Random(chunk_seed(self.seed, chunk_row, chunk_col))
+
+            mines = bytearray(rows * cols)
+            for row, col in m.sample_mine_positions(
+                    rows, cols, int(self.fraction * rows * cols), rng=rng):
+                mines[row * cols + col] = 1
+            self.mines[key] = mines
+
+        return mines
+
+    def is_mine(self, row, col):
+        """
+        Check if a cell is a mine.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            mine (bool): True if there is a mine on the cell.
+        """
+
+        chunk_row, inner_row = divmod(row, self.chunk_size)
+        chunk_col, inner_col = divmod(col, self.chunk_size)
+        cols = self.chunk_shape(chunk_row, chunk_col)[1]
+
+        return self.chunk_mines(chunk_row, chunk_col)[
+            inner_row * cols + inner_col] == 1
+
+    def value(self, row, col):
+        """
+        Get the helper board value of a cell: -1 or its neighbour count.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            value (int): -1 for a mine, the number of adjacent mines otherwise.
+        """
+
+        if self.is_mine(row, col):
+            return -1
+
+        chunk_row, inner_row = divmod(row, self.chunk_size)
+        chunk_col, inner_col = divmod(col, self.chunk_size)
+        key = (chunk_row, chunk_col)
+        cols = self.chunk_shape(chunk_row, chunk_col)[1]
+
+        # -2 marks the counts that weren't computed yet
+        counts = self.counts.get(key)
+        if counts is None:
+            rows = self.chunk_shape(chunk_row, chunk_col)[0]
+            counts = array('b', [m.UNKNOWN_CODE]) * (rows * cols)
+            self.counts[key] = counts
+
+        index = inner_row * cols + inner_col
+        if counts[index] == m.UNKNOWN_CODE:
+            count = 0
+            for i, j in m.compute_neighbours(self.nb_rows, self.nb_cols,
+                                             row, col):
+                if self.is_mine(i, j):
+                    count += 1
+            counts[index] = count
+
+        return counts[index]
+
+    def explored_chunks(self):
+        """
+        Get the number of chunks generated so far.
+
+        Returns:
+            count (int): Number of chunks in memory.
+        """
+
+        return len(self.mines)
+
+
+class _HelperRow:
+    __slots__ = ('board', 'row')
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.nb_cols
+
+    def __getitem__(self, col):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        return self.board.value(self.row, col)
+
+
+class ChunkedGameBoard:
+    """
+    A game board that only stores the chunks where something was played.
+
+    Cells of chunks that were never written are '?'. The number of flags
+    and of revealed cells is kept up to date on every write, so
+    count_total(board, '?') and count_total(board, '⚑') don't scan
+    anything, and is_game_over() only looks at the stored chunks.
+
+    Examples:
+        >>> g = ChunkedGameBoard(10 ** 6, 10 ** 6)
+        >>> m.flag(g, 5, 5)
+        >>> g[5][5], g[5][6], m.count_total(g, '?') == 10 ** 12 - 1
+        ('⚑', '?', True)
+    """
+
+    def __init__(self, nb_rows, nb_cols, chunk_size=CHUNK_SIZE):
+        """
+        Create an empty game board.
+
+        Parameters:
+            nb_rows (int): Number of rows.
+            nb_cols (int): Number of columns.
+            chunk_size (int): Number of rows and columns of a chunk.
+        """
+
+        self.nb_rows = nb_rows
+        self.nb_cols = nb_cols
+        self.chunk_size = chunk_size
+
+        # Cell codes of the chunks that were written, row by row
+        self.chunks = {}
+        self.flags = 0
+        self.revealed = 0
+
+    def __len__(self):
+        return self.nb_rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.nb_rows:
+            raise IndexError("board row out of range")
+        return _GameRow(self, row)
+
+    def locate(self, row, col):
+        """
+        Find the chunk of a cell and the cell's index inside it.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            key (tuple): (chunk_row, chunk_col) of the chunk.
+            index (int): Flat index of the cell inside the chunk.
+        """
+
+        chunk_row, inner_row = divmod(row, self.chunk_size)
+        chunk_col, inner_col = divmod(col, self.chunk_size)
+        return (chunk_row, chunk_col), inner_row * self.chunk_size + inner_col
+
+    def get(self, row, col):
+        """
+        Get the code of a cell.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            code (int): UNKNOWN_CODE, FLAG_CODE or the revealed number.
+        """
+
+        key, index = self.locate(row, col)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return m.UNKNOWN_CODE
+        return chunk[index]
+
+    def set(self, row, col, code):
+        """
+        Change the code of a cell and update the flag and reveal counts.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+            code (int): UNKNOWN_CODE, FLAG_CODE or the revealed number.
+
+        Returns:
+            None
+        """
+
+        key, index = self.locate(row, col)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = array('b', [m.UNKNOWN_CODE]) * (self.chunk_size ** 2)
+            self.chunks[key] = chunk
+
+        for old_or_new, change in ((chunk[index], -1), (code, 1)):
+            if old_or_new == m.FLAG_CODE:
+                self.flags += change
+            elif old_or_new != m.UNKNOWN_CODE:
+                self.revealed += change
+
+        chunk[index] = code
+
+    def count_total(self, value):
+        """
+        Count how many times a value appears on the board.
+
+        Parameters:
+            value (str): '?', '⚑' or a revealed number.
+
+        Returns:
+            count (int): Number of occurrences of the value.
+        """
+
+        code = m.encode_cell(value)
+        if code == m.UNKNOWN_CODE:
+            return self.nb_rows * self.nb_cols - self.flags - self.revealed
+        elif code == m.FLAG_CODE:
+            return self.flags
+
+        # Other values can only be in the stored chunks
+        return sum(chunk.count(code) for chunk in self.chunks.values())
+
+    def is_game_over(self, helper_board):
+        """
+        Check if all safe cells have been revealed, like is_game_over().
+
+        Like there, a flagged safe cell isn't '?' anymore, so it counts as
+        done. Only the stored chunks are looked at.
+
+        Parameters:
+            helper_board (ChunkedHelperBoard): Board with the mines.
+
+        Returns:
+            over (bool): True if the game is won, False otherwise.
+        """
+
+        safe_total = self.nb_rows * self.nb_cols - helper_board.num_mines
+
+        flagged_safe = 0
+        size = self.chunk_size
+        for (chunk_row, chunk_col), chunk in self.chunks.items():
+            for index in range(len(chunk)):
+                if chunk[index] == m.FLAG_CODE:
+                    inner_row, inner_col = divmod(index, size)
+                    if not helper_board.is_mine(chunk_row * size + inner_row,
+                                                chunk_col * size + inner_col):
+                        flagged_safe += 1
+
+        return self.revealed + flagged_safe == safe_total
+
+    def explored_chunks(self):
+        """
+        Get the number of chunks stored so far.
+
+        Returns:
+            count (int): Number of chunks in memory.
+        """
+
+        return len(self.chunks)
+
+
+class _GameRow:
+    __slots__ = ('board', 'row')
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.nb_cols
+
+    def __getitem__(self, col):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        return m.decode_cell(self.board.get(self.row, col))
+
+    def __setitem__(self, col, value):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        self.board.set(self.row, col, m.encode_cell(value))
+
+
+def init_chunked_game(difficulty, num_cols, num_rows, seed=0,
+                      chunk_size=CHUNK_SIZE):
+    """
+    Initialize chunked boards, like minesweeper.init_game().
+
+    Nothing is generated yet, so this takes the same time for any size.
+    Use minesweeper.GameState with fresh=True to follow the game, since
+    it can't scan the boards.
+
+    Parameters:
+        difficulty (str): Difficulty level or custom fraction.
+        num_cols (int): Number of columns of the board.
+        num_rows (int): Number of rows of the board.
+        seed (int): Seed of the whole board.
+        chunk_size (int): Number of rows and columns of a chunk.
+
+    Returns:
+        game_board (ChunkedGameBoard): Visible board, all '?'.
+        helper_board (ChunkedHelperBoard): Board with mines and counts.
+        num_mines (int): Total number of mines.
+
+    Examples:
+        >>> g, h, n = init_chunked_game("HARD", 10 ** 9, 10 ** 9, seed=7)
+        >>> n == (10 ** 18) // 2, len(g), len(g[0])
+        (True, 1000000000, 1000000000)
+        >>> state = m.GameState(g, h, n, fresh=True)
+        >>> state.is_game_over()
+        False
+    """
+
+    helper_board = ChunkedHelperBoard(num_rows, num_cols, difficulty, seed,
+                                      chunk_size)
+    game_board = ChunkedGameBoard(num_rows, num_cols, chunk_size)
+
+    return game_board, helper_board, helper_board.num_mines
@@ -0,0 +1,467 @@
+"""
+NumPy version of the Minesweeper boards, for very large boards.
+
+The helper board is an int8 array (-1 for mines, 0 to 8 otherwise) and
+the game board is an int8 array of codes (minesweeper.UNKNOWN_CODE,
+minesweeper.FLAG_CODE, or the revealed number). This module needs NumPy,
+which the rest of the game doesn't.
+"""
+
+import numpy as np
+
+import minesweeper as m
+
+
+def neighbour_sum(mask):
+    """
+    Count, for every cell, how many of its neighbours are set in a mask.
+
+    The mask is padded with a border of zeros and the 8 shifted copies
+    are added together, so there is no Python loop over the cells. Any
+    leading dimensions (for example a stack of boards) are kept as is.
+
+    Parameters:
+        mask (ndarray): Boolean array whose last two axes are rows, columns.
+
+    Returns:
+        counts (ndarray): int8 array of the same shape with the counts.
+
+    Examples:
+        >>> neighbour_sum(np.array([[True, False, False],
+        ...                         [False, False, True]])).tolist()
+        [[0, 2, 1], [1, 2, 0]]
+    """
+
+    nb_rows, nb_cols = mask.shape[-2:]
+    padding = [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(mask.astype(np.int8), padding)
+
+    counts = np.zeros(mask.shape, dtype=np.int8)
+    for i in range(3):
+        for j in range(3):
+            if i != 1 or j != 1:
+                counts += padded[..., i:i + nb_rows, j:j + nb_cols]
+
+    return counts
+
+
+def helper_from_mines(mines):
+    """
+    Build a helper board array from a boolean array of mine positions.
+
+    Parameters:
+        mines (ndarray): Boolean array, True where there is a mine.
+
+    Returns:
+        helper (ndarray): int8 helper board.
+
+    Examples:
+        >>> helper_from_mines(np.array([[True, False, False],
+        ...                             [False, False, True]])).tolist()
+        [[-1, 2, 1], [1, 2, -1]]
+    """
+
+    helper = neighbour_sum(mines)
+    helper[mines] = -1
+    return helper
+
+
+def generate_helper_array(nb_rows, nb_cols, nb_mines, excluded=None,
+                          rng=None):
+    """
+    Generate a helper board array with the given number of mines.
+
+    Mines are picked with minesweeper.sample_mine_positions(), so they
+    follow random.seed() like the rest of the game.
+
+    Parameters:
+        nb_rows (int): Number of rows.
+        nb_cols (int): Number of columns.
+        nb_mines (int): Number of mines to place.
+        excluded (list): Optional (row, col) positions that can't be mines.
+        rng (Random): Random generator to use, the random module by default.
+
+    Returns:
+        helper (ndarray): int8 helper board.
+
+    Examples:
+        >>> import random
+        >>> random.seed(0)
+        >>> h = generate_helper_array(4, 5, 6)
+        >>> h.shape, int(count_total_array(h, -1))
+        ((4, 5), 6)
+    """
+
+    positions = m.sample_mine_positions(nb_rows, nb_cols, nb_mines,
+                                        excluded or (), rng)
+
+    mines = np.zeros((nb_rows, nb_cols), dtype=bool)
+    if positions:
+        rows, cols = zip(*positions)
+        mines[list(rows), list(cols)] = True
+
+    return helper_from_mines(mines)
+
+
+def init_game_array(difficulty, num_cols, num_rows, first_click=None,
+                    rng=None):
+    """
+    Initialize the array boards, like minesweeper.init_game().
+
+    minesweeper.init_game(..., arrays=True) calls this, and reveal(),
+    flag(), count_total() and is_game_over() of minesweeper pass the
+    arrays back to this module.
+
+    Parameters:
+        difficulty (str): Chosen difficulty level or custom fraction.
+        num_cols (int): Number of columns of the board.
+        num_rows (int): Number of rows of the board.
+        first_click (tuple): Optional (row, col) of the first reveal.
+        rng (Random): Random generator to use, the random module by default.
+
+    Returns:
+        game_board (ndarray): Game board filled with UNKNOWN_CODE.
+        helper_board (ndarray): int8 helper board.
+        num_mines (int): Total number of mines placed.
+
+    Examples:
+        >>> g, h, n = init_game_array("HARD", 4, 3)
+        >>> g.shape, h.shape, n
+        ((3, 4), (3, 4), 6)
+        >>> import random
+        >>> g, h, n = m.init_game("EASY", 5, 5, (2, 2), arrays=True,
+        ...                       rng=random.Random(0))
+        >>> m.is_game_over(g, h), m.count_total(g, '?')
+        (False, 25)
+        >>> len(m.reveal(h, g, 2, 2, cascade=True))
+        23
+        >>> m.flag(g, 4, 4), m.count_total(g, '⚑'), m.is_game_over(g, h)
+        (None, 1, True)
+    """
+
+    num_mines = m.get_num_mines(difficulty, num_cols, num_rows)
+
+    excluded = None
+    if first_click is not None:
+        excluded = m.safe_zone(num_rows, num_cols,
+                               first_click[0], first_click[1])
+        if num_mines > num_rows * num_cols - len(excluded):
+            excluded = [tuple(first_click)]
+
+    helper_board = generate_helper_array(num_rows, num_cols, num_mines,
+                                         excluded, rng)
+    game_board = np.full((num_rows, num_cols), m.UNKNOWN_CODE, dtype=np.int8)
+
+    return game_board, helper_board, num_mines
+
+
+def count_total_array(board, value):
+    """
+    Count how many times a value appears on an array board.
+
+    Parameters:
+        board (ndarray): Helper board or game board.
+        value (int): The value or code to count.
+
+    Returns:
+        count (int): Number of occurrences of the value.
+
+    Examples:
+        >>> count_total_array(np.array([[0, -1], [-1, 2]]), -1)
+        2
+    """
+
+    return int(np.count_nonzero(board == value))
+
+
+def flag_array(game_board, row, col):
+    """
+    Switch between unknown and flagged on an array game board.
+
+    Parameters:
+        game_board (ndarray): Game board of codes.
+        row (int): Row index of the cell.
+        col (int): Column index of the cell.
+
+    Returns:
+        None
+
+    Examples:
+        >>> g = np.full((1, 2), m.UNKNOWN_CODE, dtype=np.int8)
+        >>> flag_array(g, 0, 1)
+        >>> game_to_lists(g)
+        [['?', '⚑']]
+    """
+
+    if game_board[row, col] == m.UNKNOWN_CODE:
+        game_board[row, col] = m.FLAG_CODE
+    elif game_board[row, col] == m.FLAG_CODE:
+        game_board[row, col] = m.UNKNOWN_CODE
+
+
+def reveal_array(helper_board, game_board, row, col):
+    """
+    Reveal a cell on an array game board, like minesweeper.reveal().
+
+    Parameters:
+        helper_board (ndarray): int8 helper board.
+        game_board (ndarray): Game board of codes.
+        row (int): Row index to reveal.
+        col (int): Column index to reveal.
+
+    Returns:
+        None
+
+    Examples:
+        >>> h = np.array([[0, 1], [-1, 2]], dtype=np.int8)
+        >>> g = np.full((2, 2), m.UNKNOWN_CODE, dtype=np.int8)
+        >>> reveal_array(h, g, 0, 1)
+        >>> game_to_lists(g)
+        [['?', '1'], ['?', '?']]
+    """
+
+    if helper_board[row, col] == -1:
+        raise AssertionError("BOOM! You lost.")
+
+    game_board[row, col] = helper_board[row, col]
+
+
+def reveal_cascade_array(helper_board, game_board, row, col):
+    """
+    Reveal a cell on an array game board and open its zero region.
+
+    Parameters:
+        helper_board (ndarray): int8 helper board.
+        game_board (ndarray): Game board of codes.
+        row (int): Row index to reveal.
+        col (int): Column index to reveal.
+
+    Returns:
+        revealed (list): Newly revealed (row, col) pairs, in board order.
+
+    Examples:
+        >>> h = np.array([[0, 1, -1], [0, 1, 1]], dtype=np.int8)
+        >>> g = np.full((2, 3), m.UNKNOWN_CODE, dtype=np.int8)
+        >>> reveal_cascade_array(h, g, 0, 0)
+        [(0, 0), (0, 1), (1, 0), (1, 1)]
+    """
+
+    unknown = game_board == m.UNKNOWN_CODE
+
+    # A stack of one board, as views, so the cascade writes to game_board
+    reveal_cascade_batch(helper_board[np.newaxis], game_board[np.newaxis],
+                         row, col)
+
+    return [(int(i), int(j)) for i, j
+            in np.argwhere(unknown & (game_board != m.UNKNOWN_CODE))]
+
+
+def is_game_over_array(game_board, helper_board):
+    """
+    Check if every safe cell has been revealed, in one masked reduction.
+
+    Parameters:
+        game_board (ndarray): Game board of codes.
+        helper_board (ndarray): int8 helper board.
+
+    Returns:
+        over (bool): True if the game is won, False otherwise.
+
+    Examples:
+        >>> h = np.array([[0, 1], [-1, 1]], dtype=np.int8)
+        >>> g = game_from_lists([['0', '1'], ['⚑', '?']])
+        >>> is_game_over_array(g, h)
+        False
+        >>> g[1, 1] = 1
+        >>> is_game_over_array(g, h)
+        True
+    """
+
+    return not np.any((helper_board != -1) & (game_board == m.UNKNOWN_CODE))
+
+
+def helper_from_lists(board):
+    """
+    Convert a list of lists helper board to an array.
+
+    Parameters:
+        board (list): Helper board from minesweeper.generate_helper_board().
+
+    Returns:
+        helper (ndarray): int8 helper board.
+
+    Examples:
+        >>> helper_from_lists([[0, 1], [-1, 1]]).dtype
+        dtype('int8')
+    """
+
+    return np.array(board, dtype=np.int8)
+
+
+def helper_to_lists(helper_board):
+    """
+    Convert an array helper board back to a list of lists of ints.
+
+    Parameters:
+        helper_board (ndarray): int8 helper board.
+
+    Returns:
+        board (list): Helper board as used by minesweeper.
+
+    Examples:
+        >>> helper_to_lists(np.array([[0, 1], [-1, 1]], dtype=np.int8))
+        [[0, 1], [-1, 1]]
+    """
+
+    return helper_board.tolist()
+
+
+def game_from_lists(board):
+    """
+    Convert a list of lists game board of characters to an array of codes.
+
+    Parameters:
+        board (list): Game board with '?', '⚑' and numbers as strings.
+
+    Returns:
+        game (ndarray): Game board of codes.
+
+    Examples:
+        >>> game_from_lists([['?', '⚑', '2']]).tolist()
+        [[-2, -3, 2]]
+    """
+
+    return np.array([[m.encode_cell(value) for value in row]
+                     for row in board], dtype=np.int8)
+
+
+def game_to_lists(game_board):
+    """
+    Convert an array game board back to a list of lists of characters.
+
+    Parameters:
+        game_board (ndarray): Game board of codes.
+
+    Returns:
+        board (list): Game board as used by minesweeper.
+
+    Examples:
+        >>> game_to_lists(np.array([[-2, -3, 2]], dtype=np.int8))
+        [['?', '⚑', '2']]
+    """
+
+    return [[m.decode_cell(code) for code in row]
+            for row in game_board.tolist()]
+
+
+def reveal_cascade_batch(helper_boards, game_boards, row, col):
+    """
+    Reveal the same cell on a stack of boards and open their zero regions.
+
+    Every board of the stack is revealed at (row, col), then the unknown
+    neighbours of revealed zeros are revealed, all boards at once, until
+    nothing changes. This opens the same cells as reveal_cascade() on
+    each board.
+
+    Parameters:
+        helper_boards (ndarray): K x rows x cols int8 helper boards.
+        game_boards (ndarray): K x rows x cols game boards of codes.
+        row (int): Row index to reveal.
+        col (int): Column index to reveal.
+
+    Returns:
+        None
+
+    Examples:
+        >>> h = np.array([[[0, 1, -1]], [[1, -1, 1]]], dtype=np.int8)
+        >>> g = np.full(h.shape, m.UNKNOWN_CODE, dtype=np.int8)
+        >>> reveal_cascade_batch(h, g, 0, 0)
+        >>> [game_to_lists(board) for board in g]
+        [[['0', '1', '?']], [['1', '?', '?']]]
+    """
+
+    if np.any(helper_boards[:, row, col] == -1):
+        raise AssertionError("BOOM! You lost.")
+    game_boards[:, row, col] = helper_boards[:, row, col]
+
+    while True:
+        opened = (neighbour_sum(game_boards == 0) > 0) & (
+            game_boards == m.UNKNOWN_CODE)
+        if not opened.any():
+            return
+        game_boards[opened] = helper_boards[opened]
+
+
+def solve_batch(game_boards, helper_boards):
+    """
+    Apply the rules of minesweeper.solve() to a stack of boards at once.
+
+    Each step finds, on every board, the revealed numbers whose flags
+    match their number (their unknown neighbours are safe) and those
+    whose unknown neighbours are all mines, with neighbour_sum(). All
+    those neighbours are then revealed or flagged in one go. Boards drop
+    out of the steps once nothing changes on them. Both rules only make
+    moves that are certain, so the boards end the same as with solve()
+    and plain reveal() and flag() clicks, with the same number of clicks.
+
+    Parameters:
+        game_boards (ndarray): K x rows x cols game boards, changed in place.
+        helper_boards (ndarray): K x rows x cols int8 helper boards.
+
+    Returns:
+        result (dict): 'solved' (bool array: no unknown cell left),
+                       'left_clicks' and 'right_clicks' (int arrays),
+                       and the number of 'steps' taken.
+
+    Examples:
+        >>> h = np.array([[[0, 1, -1]], [[-1, 2, -1]]], dtype=np.int8)
+        >>> g = np.full(h.shape, m.UNKNOWN_CODE, dtype=np.int8)
+        >>> g[:, 0, 1] = h[:, 0, 1]
+        >>> result = solve_batch(g, h)
+        >>> result['solved'].tolist(), result['left_clicks'].tolist()
+        ([False, True], [0, 0])
+        >>> [game_to_lists(board) for board in g]
+        [[['?', '1', '?']], [['⚑', '2', '⚑']]]
+    """
+
+    nb_boards = game_boards.shape[0]
+    left_clicks = np.zeros(nb_boards, dtype=np.int64)
+    right_clicks = np.zeros(nb_boards, dtype=np.int64)
+
+    active = np.arange(nb_boards)
+    steps = 0
+
+    while active.size:
+        games = game_boards[active]
+        helpers = helper_boards[active]
+
+        unknown = games == m.UNKNOWN_CODE
+        unknown_around = neighbour_sum(unknown)
+        flags_around = neighbour_sum(games == m.FLAG_CODE)
+        numbers = (games >= 0) & (unknown_around > 0)
+
+        # Cells next to a number that is done, or that needs all its unknowns
+        safe = unknown & (neighbour_sum(
+            numbers & (games == flags_around)) > 0)
+        mines = unknown & (neighbour_sum(
+            numbers & (games - flags_around == unknown_around)) > 0)
+
+        if np.any(safe & (helpers == -1)):
+            raise AssertionError("BOOM! You lost.")
+
+        games[mines] = m.FLAG_CODE
+        games[safe] = helpers[safe]
+        game_boards[active] = games
+
+        revealed = np.count_nonzero(safe, axis=(1, 2))
+        flagged = np.count_nonzero(mines, axis=(1, 2))
+        left_clicks[active] += revealed
+        right_clicks[active] += flagged
+
+        active = active[(revealed + flagged) > 0]
+        steps += 1
+
+    solved = ~np.any(game_boards == m.UNKNOWN_CODE, axis=(1, 2))
+
+    return {'solved': solved, 'left_clicks': left_clicks,
+            'right_clicks': right_clicks, 'steps': steps}
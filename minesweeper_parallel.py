@@ -0,0 +1,416 @@
+import argparse
+import os
+import random
+import time
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import minesweeper as m
+
+
+# Rows and columns of a tile
+TILE_SIZE = 256
+
+# Shared buffers and board size, set in each worker by attach_boards()
+_shared = {}
+
+
+def attach_boards(game_name, helper_name, nb_rows, nb_cols):
+    """
+    Open the shared boards in a worker process.
+
+    Parameters:
+        game_name (str): Name of the shared memory of the game board codes.
+        helper_name (str): Name of the shared memory of the helper board.
+        nb_rows (int): Number of rows.
+        nb_cols (int): Number of columns.
+
+    Returns:
+        None
+    """
+
+    for key, name in (('game', game_name), ('helper', helper_name)):
+        memory = shared_memory.SharedMemory(name=name)
+        _shared[key + '_memory'] = memory
+        _shared[key] = memory.buf.cast('b')
+    _shared['nb_rows'] = nb_rows
+    _shared['nb_cols'] = nb_cols
+
+
+def detach_boards():
+    """
+    Let go of the shared boards opened by attach_boards().
+
+    Returns:
+        None
+    """
+
+    for key in ('game', 'helper'):
+        _shared.pop(key).release()
+        _shared.pop(key + '_memory').close()
+
+
+def split_tiles(nb_rows, nb_cols, tile_size=TILE_SIZE):
+    """
+    Cut a board into rectangular tiles.
+
+    Parameters:
+        nb_rows (int): Number of rows.
+        nb_cols (int): Number of columns.
+        tile_size (int): Rows and columns of a tile (smaller at the edges).
+
+    Returns:
+        tiles (dict): (top, left, bottom, right) of each tile, bottom and
+                      right excluded, by (tile row, tile column).
+
+    Examples:
+        >>> split_tiles(3, 5, 2)[(1, 2)]
+        (2, 4, 3, 5)
+        >>> len(split_tiles(3, 5, 2))
+        6
+    """
+
+    tiles = {}
+    for tile_row, top in enumerate(range(0, nb_rows, tile_size)):
+        for tile_col, left in enumerate(range(0, nb_cols, tile_size)):
+            tiles[(tile_row, tile_col)] = (
+                top, left, min(top + tile_size, nb_rows),
+                min(left + tile_size, nb_cols))
+    return tiles
+
+
+def tile_cells(bounds, nb_rows, nb_cols, border_only=False):
+    """
+    Get the flat indices of a tile and of the ring of cells around it.
+
+    Parameters:
+        bounds (tuple): (top, left, bottom, right) of the tile.
+        nb_rows (int): Number of rows of the board.
+        nb_cols (int): Number of columns of the board.
+        border_only (bool): Whether to keep only the outer rows and
+                            columns of the tile, next to the ring.
+
+    Returns:
+        cells (list): Flat indices, row by row.
+
+    Examples:
+        >>> tile_cells((1, 1, 4, 4), 5, 5, border_only=True)[:6]
+        [0, 1, 2, 3, 4, 5]
+        >>> len(tile_cells((1, 1, 4, 4), 5, 5)), 12 in tile_cells(
+        ...     (1, 1, 4, 4), 5, 5, border_only=True)
+        (25, False)
+    """
+
+    top, left, bottom, right = bounds
+    first_row, last_row = max(top - 1, 0), min(bottom + 1, nb_rows)
+    first_col, last_col = max(left - 1, 0), min(right + 1, nb_cols)
+
+    cells = []
+    for row in range(first_row, last_row):
+        start = row * nb_cols
+        if border_only and top < row < bottom - 1:
+            # Only the two columns on each side in the middle rows
+            cols = sorted({first_col, left, right - 1, last_col - 1})
+            cells.extend(start + col for col in cols)
+        else:
+            cells.extend(range(start + first_col, start + last_col))
+
+    return cells
+
+
+def solve_tile(bounds, border_only=False):
+    """
+    Run the solver rules on one tile of the shared board.
+
+    minesweeper.solve_cells() runs directly on the shared codes, starting
+    from the tile and the ring of cells around it, whose numbers can
+    prove cells of the tile safe or mined. Only cells inside the tile
+    are clicked, so tiles never write to the same cells, and the solver
+    sees a click outside the tile as a cell that stayed unknown.
+
+    The counts kept by the solver only follow the clicks of this tile,
+    but other tiles only ever remove unknown cells, which can make a
+    rule apply later and never make a wrong one apply.
+
+    Parameters:
+        bounds (tuple): (top, left, bottom, right) of the tile.
+        border_only (bool): Whether to start from the cells along the
+                            edge of the tile only, when only the tiles
+                            around it changed.
+
+    Returns:
+        result (tuple): Number of cells revealed and flagged, and the
+                        set of (row, col) offsets of the tiles around
+                        whose cells may have new moves.
+    """
+
+    top, left, bottom, right = bounds
+    codes = _shared['game']
+    helper = _shared['helper']
+    nb_rows = _shared['nb_rows']
+    nb_cols = _shared['nb_cols']
+
+    clicks = [0, 0]
+    changed_sides = set()
+
+    def inside(cell):
+        row, col = divmod(cell, nb_cols)
+        if not (top <= row < bottom and left <= col < right):
+            return False
+
+        # A cell up to two cells away from another tile changes the
+        # counts of the numbers that tile reads around it
+        if (row - top < 2 or bottom - row <= 2 or col - left < 2
+                or right - col <= 2):
+            rows = [0] + [-1] * (row - top < 2) + [1] * (bottom - row <= 2)
+            cols = [0] + [-1] * (col - left < 2) + [1] * (right - col <= 2)
+            changed_sides.update((i, j) for i in rows for j in cols
+                                 if i or j)
+        return True
+
+    def left_click(cell):
+        if inside(cell):
+            value = helper[cell]
+            if value == -1:
+                raise AssertionError("BOOM! You lost.")
+            codes[cell] = value
+            clicks[0] += 1
+
+    def right_click(cell):
+        if inside(cell):
+            codes[cell] = m.FLAG_CODE
+            clicks[1] += 1
+
+    def read(cell):
+        row, col = divmod(cell, nb_cols)
+        if top <= row < bottom and left <= col < right:
+            return codes[cell]
+        return m.UNKNOWN_CODE
+
+    # The status of the result isn't used, so the unknown cells of the
+    # board aren't counted
+    m.solve_cells(None, codes, read, m.flat_neighbours(nb_rows, nb_cols),
+                  left_click, right_click,
+                  tile_cells(bounds, nb_rows, nb_cols, border_only), 0,
+                  defaultdict(lambda: None))
+
+    return clicks[0], clicks[1], changed_sides
+
+
+def solve_parallel(game_board, helper_board, tile_size=TILE_SIZE,
+                   workers=None):
+    """
+    Solve a board with the rules of solve(), one tile per worker task.
+
+    Both boards are copied once into shared memory, as one byte per
+    cell. Each round, the tiles that may have something to do are solved
+    by the workers with solve_tile(), all reading and writing the same
+    shared game board. A tile is only solved again when a tile next to it
+    changed a cell close enough to read in its ring of numbers, and then
+    starts from its edge only, since the rest of it was already done.
+    The rounds stop when a round changes nothing.
+
+    Every move is proven by the rules, whatever the other tiles have done
+    at that time, so the board ends the same as with solve(), with the
+    same number of clicks.
+
+    Parameters:
+        game_board (list): Visible game board, changed in place.
+        helper_board (list): Board with mines and counts.
+        tile_size (int): Rows and columns of a tile, at least 2.
+        workers (int): Number of processes, 1 to solve in this process,
+                       None for one per core.
+
+    Returns:
+        result (dict): 'status' is 'solved' or 'stuck', with the
+                       'left_clicks', 'right_clicks', 'rounds' and
+                       'tiles_solved'.
+
+    Examples:
+        >>> random.seed(4)
+        >>> g, h, n = m.init_game("EASY", 30, 20, (10, 15))
+        >>> m.reveal(h, g, 10, 15, cascade=True) and None
+        >>> serial = [row[:] for row in g]
+        >>> expected = m.solve(serial, lambda r, c: m.reveal(h, serial, r, c),
+        ...                    lambda r, c: m.flag(serial, r, c))
+        >>> result = solve_parallel(g, h, tile_size=8, workers=1)
+        >>> g == serial, result['left_clicks'] == expected['left_clicks']
+        (True, True)
+    """
+
+    if tile_size < 2:
+        raise ValueError("Tiles must be at least 2 cells wide")
+
+    nb_rows = len(game_board)
+    nb_cols = len(game_board[0])
+    size = nb_rows * nb_cols
+
+    game_memory = shared_memory.SharedMemory(create=True, size=size)
+    helper_memory = shared_memory.SharedMemory(create=True, size=size)
+    pool = None
+    try:
+        game_cells = game_memory.buf.cast('b')
+        helper_cells = helper_memory.buf.cast('b')
+        for row in range(nb_rows):
+            start = row * nb_cols
+            game_cells[start:start + nb_cols] = array(
+                'b', [m.encode_cell(value) for value in game_board[row]])
+            helper_cells[start:start + nb_cols] = array(
+                'b', helper_board[row])
+
+        boards = (game_memory.name, helper_memory.name, nb_rows, nb_cols)
+        if workers == 1:
+            attach_boards(*boards)
+            run = map
+        else:
+            pool = ProcessPoolExecutor(workers, initializer=attach_boards,
+                                       initargs=boards)
+            run = pool.map
+
+        tiles = split_tiles(nb_rows, nb_cols, tile_size)
+        result = {'status': 'stuck', 'left_clicks': 0, 'right_clicks': 0,
+                  'rounds': 0, 'tiles_solved': 0}
+
+        dirty = sorted(tiles)
+        border_only = False
+        while dirty:
+            solved = list(run(solve_tile, [tiles[key] for key in dirty],
+                              [border_only] * len(dirty)))
+            result['rounds'] += 1
+            result['tiles_solved'] += len(dirty)
+
+            # Only the tiles next to a changed border go again
+            next_dirty = set()
+            for (tile_row, tile_col), (revealed, flagged, sides) in zip(
+                    dirty, solved):
+                result['left_clicks'] += revealed
+                result['right_clicks'] += flagged
+                for i, j in sides:
+                    key = (tile_row + i, tile_col + j)
+                    if key in tiles:
+                        next_dirty.add(key)
+            dirty = sorted(next_dirty)
+            border_only = True
+
+        # Copy the result back into the list of lists board
+        for row in range(nb_rows):
+            start = row * nb_cols
+            game_board[row] = [m.decode_cell(code) for code in
+                               game_cells[start:start + nb_cols].tolist()]
+
+        if m.count_total(game_board, '?') == 0:
+            result['status'] = 'solved'
+
+        if workers == 1:
+            detach_boards()
+        game_cells.release()
+        helper_cells.release()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        game_memory.close()
+        game_memory.unlink()
+        helper_memory.close()
+        helper_memory.unlink()
+
+    return result
+
+
+def measure_speedup(size, difficulty="EASY", seed=0, tile_size=TILE_SIZE,
+                    worker_counts=None, log=None):
+    """
+    Time solve() and solve_parallel() on the same board and compare them.
+
+    Parameters:
+        size (int): Number of rows and columns of the board.
+        difficulty (str): Difficulty level or custom fraction.
+        seed (int): Seed given to random before generating the board.
+        tile_size (int): Rows and columns of a tile.
+        worker_counts (list): Numbers of processes to try, by default
+                              1, 2, 4... up to the number of cores.
+        log (file): Where to print each timing, or None.
+
+    Returns:
+        report (dict): 'serial' time, and for each number of workers its
+                       time, speedup and whether the board was identical.
+    """
+
+    if worker_counts is None:
+        cores = os.cpu_count() or 1
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cores:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cores:
+            worker_counts.append(cores)
+
+    random.seed(seed)
+    first_click = (size // 2, size // 2)
+    game_board, helper_board, _ = m.init_game(difficulty, size, size,
+                                              first_click)
+    m.reveal(helper_board, game_board, first_click[0], first_click[1],
+             cascade=True)
+
+    serial_board = [row[:] for row in game_board]
+    start = time.perf_counter()
+    m.solve(serial_board,
+            lambda row, col: m.reveal(helper_board, serial_board, row, col),
+            lambda row, col: m.flag(serial_board, row, col))
+    serial = time.perf_counter() - start
+
+    report = {'size': size, 'cores': os.cpu_count(), 'serial': serial,
+              'parallel': {}}
+    if log is not None:
+        print("serial", "%.3f s" % serial, file=log)
+
+    for workers in worker_counts:
+        board = [row[:] for row in game_board]
+        start = time.perf_counter()
+        solved = solve_parallel(board, helper_board, tile_size, workers)
+        elapsed = time.perf_counter() - start
+
+        report['parallel'][workers] = {
+            'time': elapsed, 'speedup': serial / elapsed,
+            'identical': board == serial_board, 'rounds': solved['rounds'],
+            'tiles_solved': solved['tiles_solved']}
+        if log is not None:
+            print(workers, "workers", "%.3f s" % elapsed,
+                  "speedup %.2f" % (serial / elapsed),
+                  "identical" if board == serial_board else "DIFFERENT",
+                  file=log)
+
+    return report
+
+
+def main(argv=None):
+    """
+    Measure the speedup of the tile solver from the command line.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        None
+    """
+
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Compare the tile parallel solver with solve().")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--difficulty", default="EASY")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="numbers of processes to try")
+    args = parser.parse_args(argv)
+
+    report = measure_speedup(args.size, args.difficulty, args.seed,
+                             args.tile_size, args.workers, sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
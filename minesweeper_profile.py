@@ -0,0 +1,351 @@
+import argparse
+import contextlib
+import cProfile
+import functools
+import json
+import pstats
+import random
+import sys
+import time
+
+import minesweeper as m
+
+
+# Engine functions that are counted and timed inside instrumented().
+# solve() runs its rules inline, so its loop is measured through
+# SOLVER_COUNTERS instead of function calls.
+INSTRUMENTED_FUNCTIONS = [
+    # Neighbour lookups and scans
+    'get_neighbour_table', 'count_total',
+    # Moves
+    'reveal', 'reveal_cascade', 'flag', 'is_game_over',
+    # Exact solver steps
+    'frontier_constraints', 'solve_constraints',
+    # Generation phases
+    'init_game', 'generate_helper_board', 'sample_mine_positions',
+    'place_mines', 'fill_neighbour_counts',
+]
+
+# Solver results that are added up over every solve() call
+SOLVER_TOTALS = ['left_clicks', 'right_clicks', 'cells_checked',
+                 'exact_moves']
+
+
+class EngineStats:
+    """
+    Call counts and times of the engine functions during instrumented().
+
+    Times include the calls made inside a function, so reveal() includes
+    reveal_cascade(), and generate_helper_board() includes its phases.
+
+    Examples:
+        >>> stats = EngineStats()
+        >>> stats.add('flag', 0.5)
+        >>> stats.add('flag', 0.25)
+        >>> stats.calls['flag'], stats.times['flag']
+        (2, 0.75)
+    """
+
+    def __init__(self):
+        """
+        Create empty statistics.
+        """
+
+        self.calls = {}
+        self.times = {}
+        self.solver = {name: 0 for name in SOLVER_TOTALS}
+        self.solver['runs'] = 0
+
+        # Work done inside the solve() loop (see SOLVER_COUNTERS)
+        self.solve_loop = {}
+
+    def add(self, name, elapsed):
+        """
+        Count one call of a function and the time it took.
+
+        Parameters:
+            name (str): Name of the function.
+            elapsed (float): Time taken by the call, in seconds.
+
+        Returns:
+            None
+        """
+
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+
+    def add_solve(self, result):
+        """
+        Add the totals of one solve() result.
+
+        Parameters:
+            result (dict): What solve() returned.
+
+        Returns:
+            None
+        """
+
+        self.solver['runs'] += 1
+        for name in SOLVER_TOTALS:
+            self.solver[name] += result.get(name, 0)
+
+    def as_dict(self):
+        """
+        Get the statistics as plain data, ready to be written as JSON.
+
+        Returns:
+            stats (dict): 'calls', 'times', 'solver' totals and
+                          'solve_loop' counts.
+        """
+
+        return {'calls': dict(self.calls), 'times': dict(self.times),
+                'solver': dict(self.solver),
+                'solve_loop': dict(self.solve_loop)}
+
+    def report(self, file=None):
+        """
+        Print the functions by total time, then the solver totals and the
+        work of the solve() loop.
+
+        Parameters:
+            file (file): Where to print, the console by default.
+
+        Returns:
+            None
+        """
+
+        if file is None:
+            file = sys.stdout
+
+        lines = ["%-26s %10s %12s" % ("function", "calls", "seconds")]
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            lines.append("%-26s %10d %12.6f"
+                         % (name, self.calls[name], self.times[name]))
+        for name, total in self.solver.items():
+            lines.append("solver %-19s %10d" % (name, total))
+        for name, total in self.solve_loop.items():
+            lines.append("solve loop %-15s %10d" % (name, total))
+
+        file.write("\n".join(lines) + "\n")
+
+
+def timed(stats, name, function):
+    """
+    Wrap a function so each call is counted and timed in stats.
+
+    Parameters:
+        stats (EngineStats): Where to add the calls.
+        name (str): Name the calls are added under.
+        function (callable): The function to wrap.
+
+    Returns:
+        wrapper (callable): Function behaving like the original one.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.add(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def timed_solve(stats, solve):
+    """
+    Wrap solve() so its clicks are counted and its results added up.
+
+    Parameters:
+        stats (EngineStats): Where to add the calls.
+        solve (callable): The original solve().
+
+    Returns:
+        wrapper (callable): Function behaving like solve().
+    """
+
+    @functools.wraps(solve)
+    def wrapper(board, left_click, right_click, *args, **kwargs):
+        left_click = timed(stats, 'left_click', left_click)
+        right_click = timed(stats, 'right_click', right_click)
+
+        start = time.perf_counter()
+        try:
+            result = solve(board, left_click, right_click, *args, **kwargs)
+        finally:
+            stats.add('solve', time.perf_counter() - start)
+
+        stats.add_solve(result)
+        return result
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def instrumented(stats=None):
+    """
+    Count and time the engine functions while inside the with block.
+
+    The functions of minesweeper listed in INSTRUMENTED_FUNCTIONS, and
+    solve(), are replaced by wrappers for the duration of the block and
+    put back after it. The engine looks its functions up by name on every
+    call, so the calls between them are measured too. The rules checked
+    inside solve() aren't function calls, so they are counted through
+    SOLVER_COUNTERS. Outside the block, nothing is wrapped and nothing is
+    measured.
+
+    Parameters:
+        stats (EngineStats): Statistics to add to, or None for new ones.
+
+    Returns:
+        stats (EngineStats): Given to the with block.
+
+    Examples:
+        >>> random.seed(0)
+        >>> with instrumented() as stats:
+        ...     g, h, n = m.init_game("EASY", 9, 9, (4, 4))
+        ...     opened = m.reveal(h, g, 4, 4, cascade=True)
+        ...     result = m.solve(g, lambda r, c: m.reveal(h, g, r, c),
+        ...                      lambda r, c: m.flag(g, r, c))
+        >>> stats.calls['init_game'], stats.calls['reveal_cascade']
+        (1, 1)
+        >>> stats.solver['left_clicks'] == stats.calls.get('left_click', 0)
+        True
+        >>> stats.solve_loop['queue_pops'] == stats.solver['cells_checked']
+        True
+        >>> m.SOLVER_COUNTERS is None
+        True
+        >>> m.solve.__name__, hasattr(m.solve, '__wrapped__')
+        ('solve', False)
+    """
+
+    if stats is None:
+        stats = EngineStats()
+
+    originals = {name: getattr(m, name) for name in INSTRUMENTED_FUNCTIONS}
+    originals['solve'] = m.solve
+    originals['SOLVER_COUNTERS'] = m.SOLVER_COUNTERS
+
+    try:
+        for name in INSTRUMENTED_FUNCTIONS:
+            setattr(m, name, timed(stats, name, originals[name]))
+        m.solve = timed_solve(stats, originals['solve'])
+        m.SOLVER_COUNTERS = stats.solve_loop
+        yield stats
+    finally:
+        for name, function in originals.items():
+            setattr(m, name, function)
+
+
+def profile_call(output, function, *args, **kwargs):
+    """
+    Run a function under cProfile and write the profile to a file.
+
+    A file ending in .prof gets the raw profile, for tools like pstats or
+    snakeviz. Any other file gets the text report sorted by cumulative
+    time.
+
+    Parameters:
+        output (str): File to write the profile to.
+        function (callable): The function to profile.
+        *args: Arguments given to the function.
+        **kwargs: Keyword arguments given to the function.
+
+    Returns:
+        result (any): What the function returned.
+    """
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        if output.endswith(".prof"):
+            profiler.dump_stats(output)
+        else:
+            with open(output, "w") as report:
+                stats = pstats.Stats(profiler, stream=report)
+                stats.sort_stats("cumulative").print_stats()
+
+
+def solve_game(size, difficulty, seed=0, exact=False):
+    """
+    Generate a square board and let the solver play it.
+
+    The board is generated and played like in the simulation harness:
+    a safe cascade click in the middle, then solve().
+
+    Parameters:
+        size (int): Number of rows and columns of the board.
+        difficulty (str): Difficulty level or custom fraction.
+        seed (int): Seed given to random before generating the board.
+        exact (bool): Whether the solver uses solve_constraints().
+
+    Returns:
+        result (dict): What solve() returned.
+    """
+
+    random.seed(seed)
+    first_click = (size // 2, size // 2)
+    game_board, helper_board, _ = m.init_game(difficulty, size, size,
+                                              first_click)
+
+    def left_click(row, col):
+        m.reveal(helper_board, game_board, row, col)
+
+    def right_click(row, col):
+        m.flag(game_board, row, col)
+
+    m.reveal(helper_board, game_board, first_click[0], first_click[1],
+             cascade=True)
+    return m.solve(game_board, left_click, right_click, exact)
+
+
+def main(argv=None):
+    """
+    Profile a solver run or an interactive game from the command line.
+
+    The engine statistics are printed on standard error, and with
+    --profile the cProfile output is written to that file as well.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        None
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Measure where the Minesweeper engine spends its time.")
+    parser.add_argument("--play", action="store_true",
+                        help="profile an interactive game instead")
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--difficulty", default="EASY")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exact", action="store_true")
+    parser.add_argument("--profile",
+                        help="write the cProfile output to this file")
+    parser.add_argument("--json", action="store_true",
+                        help="print the statistics as JSON")
+    args = parser.parse_args(argv)
+
+    if args.play:
+        function, call_args = m.play, ()
+    else:
+        function = solve_game
+        call_args = (args.size, args.difficulty, args.seed, args.exact)
+
+    with instrumented() as stats:
+        if args.profile:
+            profile_call(args.profile, function, *call_args)
+        else:
+            function(*call_args)
+
+    if args.json:
+        print(json.dumps(stats.as_dict()), file=sys.stderr)
+    else:
+        stats.report(sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
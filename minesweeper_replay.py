@@ -0,0 +1,331 @@
+import struct
+from array import array
+
+import minesweeper as m
+from minesweeper_board import Board
+from minesweeper_storage import encode_rows
+
+
+# Codes of the moves in the log. Reveal and flag match the choices of
+# play(), and a cascading reveal has its own code since it opens more.
+REVEAL = 0
+FLAG = 1
+REVEAL_CASCADE = 2
+
+# The move log starts with a header (magic, version, rows, cols, mines and
+# moves between snapshots) and then has one fixed size record per move, so
+# move n is found without reading the ones before it
+MAGIC = b"MSWM"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxQQQQ")
+RECORD = struct.Struct("<BII")
+
+# Fewest moves between two snapshots. Bigger boards take longer to
+# snapshot, so they get one every SNAPSHOT_CELLS_PER_MOVE cells per move.
+CHECKPOINT_INTERVAL = 1024
+SNAPSHOT_CELLS_PER_MOVE = 16
+
+
+def snapshot_path(path):
+    """
+    Get the file holding the snapshots of a move log.
+
+    The snapshot file starts with the helper board cells, then has one
+    copy of the game board cells every interval moves, the first one
+    being the board before any move.
+
+    Parameters:
+        path (str): The move log file.
+
+    Returns:
+        path (str): The snapshot file next to it.
+
+    Examples:
+        >>> snapshot_path("game.moves")
+        'game.moves.snap'
+    """
+
+    return path + ".snap"
+
+
+class MoveLog:
+    """
+    Write every move of a game to an append-only log, with snapshots.
+
+    A move is recorded before it is played, so a reveal that loses the
+    game is in the log too. Every interval moves, the game board is copied
+    to the snapshot file, so a Replay can start from the closest snapshot
+    instead of from the first move.
+
+    Examples:
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "game.moves")
+        >>> helper = [[0, 1], [1, -1]]
+        >>> game = m.init_board(2, 2, '?')
+        >>> with MoveLog(path, game, helper, 1, interval=2) as log:
+        ...     log.record(REVEAL, 0, 0)
+        ...     m.reveal(helper, game, 0, 0)
+        ...     log.record(FLAG, 1, 1)
+        ...     m.flag(game, 1, 1)
+        ...     log.record(REVEAL, 0, 1)
+        ...     m.reveal(helper, game, 0, 1)
+        >>> with Replay(path) as replay:
+        ...     len(replay), replay.snapshots(), replay.board_at(3).to_lists()
+        (3, 2, [['0', '1'], ['?', '⚑']])
+    """
+
+    def __init__(self, path, game_board, helper_board, num_mines,
+                 interval=None):
+        """
+        Create the log and its snapshot file, replacing older ones.
+
+        Parameters:
+            path (str): File to write the moves to.
+            game_board (list): Visible board, before the first move logged.
+            helper_board (list): Board with mines and counts.
+            num_mines (int): Total number of mines.
+            interval (int): Moves between snapshots, or None to choose
+                            from the board size.
+        """
+
+        nb_rows = len(helper_board)
+        nb_cols = len(helper_board[0])
+        if interval is None:
+            interval = max(CHECKPOINT_INTERVAL,
+                           nb_rows * nb_cols // SNAPSHOT_CELLS_PER_MOVE)
+
+        self.game_board = game_board
+        self.interval = interval
+        self.moves = 0
+
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, nb_rows, nb_cols,
+                                    num_mines, interval))
+
+        self.snapshot_file = open(snapshot_path(path), "wb")
+        for cells in encode_rows(helper_board, game=False):
+            self.snapshot_file.write(cells)
+        self.snapshot()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def snapshot(self):
+        """
+        Copy the current game board at the end of the snapshot file.
+
+        Returns:
+            None
+        """
+
+        for cells in encode_rows(self.game_board, game=True):
+            self.snapshot_file.write(cells)
+
+    def record(self, op, row, col):
+        """
+        Add a move to the log, before it is played.
+
+        Parameters:
+            op (int): REVEAL, FLAG or REVEAL_CASCADE.
+            row (int): Row index of the move.
+            col (int): Column index of the move.
+
+        Returns:
+            None
+        """
+
+        # The board now shows the moves up to here, which is a checkpoint
+        if self.moves and self.moves % self.interval == 0:
+            self.snapshot()
+
+        self.file.write(RECORD.pack(op, row, col))
+        self.moves += 1
+
+    def flush(self):
+        """
+        Write the buffered moves and snapshots to the files.
+
+        Returns:
+            None
+        """
+
+        self.file.flush()
+        self.snapshot_file.flush()
+
+    def close(self):
+        """
+        Write everything left and close both files.
+
+        Returns:
+            None
+        """
+
+        self.file.close()
+        self.snapshot_file.close()
+
+
+def logged_clicks(log, left_click, right_click, cascade=False):
+    """
+    Wrap the click functions given to the solver so they log their moves.
+
+    Parameters:
+        log (MoveLog): The log to record the moves in.
+        left_click (callable): Function used to reveal a cell.
+        right_click (callable): Function used to flag a cell.
+        cascade (bool): Whether left_click opens zero regions.
+
+    Returns:
+        left_click (callable): Logging version of left_click.
+        right_click (callable): Logging version of right_click.
+    """
+
+    reveal_op = REVEAL_CASCADE if cascade else REVEAL
+
+    def logged_left_click(row, col):
+        log.record(reveal_op, row, col)
+        left_click(row, col)
+
+    def logged_right_click(row, col):
+        log.record(FLAG, row, col)
+        right_click(row, col)
+
+    return logged_left_click, logged_right_click
+
+
+class Replay:
+    """
+    Read a move log and rebuild the game board after any move.
+
+    board_at() starts from the last snapshot before the move and only
+    plays the moves after it, so it takes the same time whether the move
+    is near the start or the end of a long log.
+    """
+
+    def __init__(self, path):
+        """
+        Open a move log and read its helper board.
+
+        Parameters:
+            path (str): File written by MoveLog.
+
+        Raises:
+            ValueError: If the file isn't a move log of this version.
+        """
+
+        self.file = open(path, "rb")
+        self.snapshot_file = open(snapshot_path(path), "rb")
+
+        data = self.file.read(HEADER.size)
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            self.close()
+            raise ValueError(path + " is not a move log")
+
+        (_, version, self.nb_rows, self.nb_cols, self.num_mines,
+         self.interval) = HEADER.unpack(data)
+        if version != VERSION:
+            self.close()
+            raise ValueError("Unsupported move log version " + str(version))
+
+        self.cells = self.nb_rows * self.nb_cols
+        self.helper_board = Board(self.nb_rows, self.nb_cols, game=False,
+                                  cells=self.read_cells(0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        # A record cut short by a crash isn't counted
+        self.file.seek(0, 2)
+        return (self.file.tell() - HEADER.size) // RECORD.size
+
+    def read_cells(self, block):
+        """
+        Read one board worth of cells from the snapshot file.
+
+        Parameters:
+            block (int): 0 for the helper board, k + 1 for snapshot k.
+
+        Returns:
+            cells (array): The cells of that board.
+        """
+
+        self.snapshot_file.seek(block * self.cells)
+        cells = array('b')
+        cells.frombytes(self.snapshot_file.read(self.cells))
+        return cells
+
+    def snapshots(self):
+        """
+        Get the number of snapshots in the log.
+
+        Returns:
+            count (int): Number of complete snapshots.
+        """
+
+        self.snapshot_file.seek(0, 2)
+        return self.snapshot_file.tell() // self.cells - 1
+
+    def moves(self, start=0, stop=None):
+        """
+        Read the moves between two positions of the log.
+
+        Parameters:
+            start (int): Index of the first move.
+            stop (int): Index after the last move, or None for the end.
+
+        Returns:
+            moves (generator): (op, row, col) for each move.
+        """
+
+        if stop is None:
+            stop = len(self)
+
+        self.file.seek(HEADER.size + start * RECORD.size)
+        data = self.file.read((stop - start) * RECORD.size)
+        return RECORD.iter_unpack(data)
+
+    def board_at(self, index):
+        """
+        Rebuild the game board as it was after a number of moves.
+
+        Parameters:
+            index (int): Number of moves played, from 0 to len(self).
+
+        Returns:
+            game_board (Board): The game board after those moves.
+
+        Raises:
+            AssertionError: If one of the moves reveals a mine, like
+                            reveal().
+        """
+
+        # Start from the closest snapshot at or before the move
+        snapshot = min(index // self.interval, self.snapshots() - 1)
+        game_board = Board(self.nb_rows, self.nb_cols,
+                           cells=self.read_cells(snapshot + 1))
+
+        for op, row, col in self.moves(snapshot * self.interval, index):
+            if op == FLAG:
+                m.flag(game_board, row, col)
+            else:
+                m.reveal(self.helper_board, game_board, row, col,
+                         cascade=op == REVEAL_CASCADE)
+
+        return game_board
+
+    def close(self):
+        """
+        Close the log files.
+
+        Returns:
+            None
+        """
+
+        self.file.close()
+        self.snapshot_file.close()
@@ -0,0 +1,507 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import minesweeper as m
+
+
+# Boards with more cells than this are generated in a worker thread, so
+# the event loop keeps answering the other sessions in the meantime
+EXECUTOR_MIN_CELLS = 10000
+
+# Biggest board a session can ask for
+MAX_CELLS = 1000000
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def generate_game(difficulty, num_cols, num_rows, seed=None):
+    """
+    Generate the boards of a new game, like init_game(), with a seed.
+
+    Each game gets its own random generator, so games generated at the
+    same time in different threads never wait for each other.
+
+    Parameters:
+        difficulty (str): Difficulty level or custom fraction.
+        num_cols (int): Number of columns of the board.
+        num_rows (int): Number of rows of the board.
+        seed (int): Seed of the game's random generator, or None.
+
+    Returns:
+        game_board (list): Visible board filled with '?'.
+        helper_board (list): Board with mines and neighbour counts.
+        num_mines (int): Total number of mines placed.
+    """
+
+    return m.init_game(difficulty, num_cols, num_rows,
+                       rng=random.Random(seed))
+
+
+class Session:
+    """
+    One game played over a connection, answering one command per line.
+
+    Commands are words separated by spaces, and every answer is one JSON
+    object on one line, with "ok" false and an "error" when the command
+    can't be done:
+
+        new ROWS COLS DIFFICULTY [SEED]   start a game
+        reveal ROW COL                    reveal a cell (opens zero regions)
+        flag ROW COL                      flag or unflag a cell
+        state                             counts and status of the game
+        quit                              close the connection
+
+    Examples:
+        >>> session = Session()
+        >>> asyncio.run(session.handle("new 2 2 0.25 1"))
+        {'ok': True, 'rows': 2, 'cols': 2, 'mines': 1}
+        >>> session.game.state.helper_board
+        [[-1, 1], [1, 1]]
+        >>> asyncio.run(session.handle("flag 0 0"))
+        {'ok': True, 'status': 'playing', 'changed': [[0, 0, '⚑']]}
+        >>> asyncio.run(session.handle("reveal 1 1"))['changed']
+        [[1, 1, '1']]
+        >>> asyncio.run(session.handle("reveal 9 9"))
+        {'ok': False, 'error': 'Position (9, 9) is out of the board'}
+        >>> asyncio.run(session.handle("new 5 5 inf"))['error']
+        'the difficulty must be a fraction between 0 and 1'
+    """
+
+    def __init__(self):
+        """
+        Create a session with no game yet.
+        """
+
+        self.game = None
+
+    async def handle(self, line):
+        """
+        Run one command and build its answer.
+
+        Parameters:
+            line (str): The command line, without the line break.
+
+        Returns:
+            answer (dict): The answer to send back as JSON.
+        """
+
+        words = line.split()
+        if not words:
+            return {'ok': False, 'error': 'empty command'}
+
+        command, args = words[0].lower(), words[1:]
+        try:
+            if command == "new":
+                return await self.new_game(args)
+            elif command in ("reveal", "flag"):
+                return await self.move(command, args)
+            elif command == "state":
+                return self.get_state()
+            elif command == "quit":
+                return {'ok': True, 'bye': True}
+        except (ValueError, OverflowError) as error:
+            return {'ok': False, 'error': str(error)}
+
+        return {'ok': False, 'error': 'unknown command ' + command}
+
+    async def new_game(self, args):
+        """
+        Start a new game, generating big boards in a worker thread.
+
+        Parameters:
+            args (list): ROWS, COLS, DIFFICULTY and an optional SEED.
+
+        Returns:
+            answer (dict): The size and number of mines of the game.
+        """
+
+        if len(args) not in (3, 4):
+            raise ValueError("usage: new ROWS COLS DIFFICULTY [SEED]")
+
+        num_rows, num_cols = int(args[0]), int(args[1])
+        difficulty = args[2]
+        seed = int(args[3]) if len(args) == 4 else None
+        if num_rows < 1 or num_cols < 1:
+            raise ValueError("the board needs at least one cell")
+        if num_rows * num_cols > MAX_CELLS:
+            raise ValueError("the board can't have more than "
+                             + str(MAX_CELLS) + " cells")
+
+        # Also rejects nan and inf, which would never make a game
+        if not 0 < m.get_difficulty(difficulty) < 1:
+            raise ValueError("the difficulty must be a fraction between "
+                             "0 and 1")
+
+        if num_rows * num_cols > EXECUTOR_MIN_CELLS:
+            loop = asyncio.get_running_loop()
+            boards = await loop.run_in_executor(
+                None, generate_game, difficulty, num_cols, num_rows, seed)
+        else:
+            boards = generate_game(difficulty, num_cols, num_rows, seed)
+
+        self.game = m.Game(cascade=True)
+        self.game.start(*boards, fresh=True)
+
+        return {'ok': True, 'rows': num_rows, 'cols': num_cols,
+                'mines': boards[2]}
+
+    async def move(self, command, args):
+        """
+        Reveal or flag a cell of the current game.
+
+        Reveals on big boards can open huge zero regions, so they are
+        played in a worker thread, like the generation of big boards.
+
+        Parameters:
+            command (str): "reveal" or "flag".
+            args (list): ROW and COL.
+
+        Returns:
+            answer (dict): The game status and the cells that changed,
+                           as [row, col, value] triples.
+        """
+
+        if self.game is None:
+            raise ValueError("no game, start one with new")
+        if len(args) != 2:
+            raise ValueError("usage: " + command + " ROW COL")
+
+        row, col = int(args[0]), int(args[1])
+        game_board = self.game.board
+
+        if command == "flag":
+            changed = self.game.flag(row, col)
+        else:
+            try:
+                if len(game_board) * len(game_board[0]) > EXECUTOR_MIN_CELLS:
+                    loop = asyncio.get_running_loop()
+                    changed = await loop.run_in_executor(
+                        None, self.game.reveal, row, col)
+                else:
+                    changed = self.game.reveal(row, col)
+            except AssertionError:
+                changed = []
+
+        return {'ok': True, 'status': self.game.status(),
+                'changed': [[i, j, game_board[i][j]] for i, j in changed]}
+
+    def get_state(self):
+        """
+        Describe the current game without the board itself.
+
+        Returns:
+            answer (dict): Status, size, mines left, and the number of
+                           revealed and flagged cells.
+        """
+
+        if self.game is None:
+            raise ValueError("no game, start one with new")
+
+        state = self.game.state
+        return {'ok': True, 'status': self.game.status(),
+                'rows': len(state.game_board),
+                'cols': len(state.game_board[0]),
+                'mines_left': state.mines_left(),
+                'revealed': state.revealed,
+                'flags': state.flags}
+
+
+async def read_line(reader):
+    """
+    Read one line, dropping it whole if it is longer than the limit.
+
+    Parameters:
+        reader (StreamReader): Lines sent by the client.
+
+    Returns:
+        line (bytes): The line, b"" at the end of the stream, or None if
+                      the line was too long.
+    """
+
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial
+    except asyncio.LimitOverrunError as error:
+        consumed = error.consumed
+
+    # Drop the start of the line until its end fits in the buffer
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return b""
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+
+
+async def handle_connection(reader, writer):
+    """
+    Serve one client: one Session for the whole connection.
+
+    Parameters:
+        reader (StreamReader): Lines sent by the client.
+        writer (StreamWriter): Where the answers go.
+
+    Returns:
+        None
+    """
+
+    session = Session()
+    try:
+        while True:
+            line = await read_line(reader)
+            if line is None:
+                answer = {'ok': False, 'error': 'line too long'}
+            elif not line:
+                break
+            else:
+                try:
+                    answer = await session.handle(line.decode().strip())
+                except UnicodeDecodeError:
+                    answer = {'ok': False, 'error': 'line is not UTF-8'}
+
+            writer.write((json.dumps(answer) + "\n").encode())
+            await writer.drain()
+
+            if answer.get('bye'):
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Start listening for clients, each one getting its own session.
+
+    Parameters:
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 to let the system pick one.
+
+    Returns:
+        server (Server): The running asyncio server.
+    """
+
+    return await asyncio.start_server(handle_connection, host, port,
+                                      limit=2 ** 20, backlog=4096)
+
+
+async def play_session(host, port, num_rows, num_cols, difficulty, moves,
+                       seed, latencies):
+    """
+    Play one random game as a client, timing every request.
+
+    Parameters:
+        host (str): Address of the server.
+        port (int): Port of the server.
+        num_rows (int): Number of rows of the board.
+        num_cols (int): Number of columns of the board.
+        difficulty (str): Difficulty level or custom fraction.
+        moves (int): Most moves to play before quitting.
+        seed (int): Seed of the board and of the moves.
+        latencies (list): Where the time of each request is added.
+
+    Returns:
+        status (str): The status of the game when the session ended.
+    """
+
+    reader, writer = await asyncio.open_connection(host, port,
+                                                   limit=2 ** 20)
+
+    # The board is generated from seed, so the moves need another stream
+    rng = random.Random(str(seed) + "-moves")
+
+    async def request(line):
+        start = time.perf_counter()
+        writer.write((line + "\n").encode())
+        answer = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        return answer
+
+    try:
+        await request("new %d %d %s %d" % (num_rows, num_cols,
+                                           difficulty, seed))
+        status = 'playing'
+        for _ in range(moves):
+            command = "flag" if rng.random() < 0.2 else "reveal"
+            answer = await request("%s %d %d" % (
+                command, rng.randrange(num_rows), rng.randrange(num_cols)))
+            if answer.get('ok'):
+                status = answer['status']
+            if status != 'playing':
+                break
+
+        await request("state")
+        await request("quit")
+    finally:
+        writer.close()
+
+    return status
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a sorted list, by the nearest rank.
+
+    Parameters:
+        values (list): Sorted values.
+        fraction (float): 0.5 for the median, 0.99 for the 99th percentile.
+
+    Returns:
+        value (float): The value at that rank, or 0.0 for an empty list.
+
+    Examples:
+        >>> percentile([1, 2, 3, 4], 0.5)
+        2
+        >>> percentile(list(range(100)), 0.99)
+        98
+    """
+
+    if not values:
+        return 0.0
+    rank = max(int(round(fraction * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+async def run_load_test(host, port, sessions=1000, concurrency=1000,
+                        num_rows=16, num_cols=16, difficulty="EASY",
+                        moves=20):
+    """
+    Play many sessions at once against a server and measure it.
+
+    Parameters:
+        host (str): Address of the server.
+        port (int): Port of the server.
+        sessions (int): Number of games to play in total.
+        concurrency (int): Most sessions connected at the same time.
+        num_rows (int): Number of rows of each board.
+        num_cols (int): Number of columns of each board.
+        difficulty (str): Difficulty level or custom fraction.
+        moves (int): Most moves of each game.
+
+    Returns:
+        report (dict): Number of sessions and requests, 'elapsed' time,
+                       'sessions_per_second', 'requests_per_second', the
+                       latency percentiles in milliseconds and the final
+                       status counts.
+    """
+
+    latencies = []
+    statuses = {}
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one_session(seed):
+        async with limit:
+            status = await play_session(host, port, num_rows, num_cols,
+                                        difficulty, moves, seed, latencies)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_session(seed) for seed in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {'sessions': sessions, 'requests': len(latencies),
+              'elapsed': elapsed,
+              'sessions_per_second': sessions / elapsed,
+              'requests_per_second': len(latencies) / elapsed,
+              'statuses': statuses}
+    for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99),
+                           ('max', 1.0)):
+        report[name + '_ms'] = percentile(latencies, fraction) * 1000
+
+    return report
+
+
+async def serve(host, port):
+    """
+    Run the server until it is interrupted.
+
+    Parameters:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+
+    Returns:
+        None
+    """
+
+    server = await start_server(host, port)
+    print("Listening on", server.sockets[0].getsockname(), file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+async def load_test(args):
+    """
+    Run a load test, against a server started here when no port is given.
+
+    Parameters:
+        args (Namespace): Parsed command line arguments.
+
+    Returns:
+        report (dict): What run_load_test() returned.
+    """
+
+    server = None
+    port = args.port
+    if port is None:
+        server = await start_server(args.host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    try:
+        return await run_load_test(args.host, port, args.sessions,
+                                   args.concurrency, args.rows, args.cols,
+                                   args.difficulty, args.moves)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+
+def main(argv=None):
+    """
+    Run the server, or a load test, from the command line.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        None
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Serve Minesweeper games over a line based protocol.")
+    parser.add_argument("mode", choices=["serve", "load"])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=None,
+                        help="port to use (load: default is to start a "
+                             "server in this process)")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=16)
+    parser.add_argument("--cols", type=int, default=16)
+    parser.add_argument("--difficulty", default="EASY")
+    parser.add_argument("--moves", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve":
+        port = DEFAULT_PORT if args.port is None else args.port
+        try:
+            asyncio.run(serve(args.host, port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(asyncio.run(load_test(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import minesweeper as m
+import minesweeper_replay
+import minesweeper_storage
+
+
+def run_game(seed, num_rows, num_cols, difficulty, exact=False,
+             log_path=None):
+    """
+    Generate one board from a seed and let the solver play it.
+
+    The first click is in the middle of the board, with the mines placed
+    away from it, and opens the zero region around it. The solver then
+    plays with plain reveal() and flag() clicks.
+
+    With log_path, every move is written to a move log, so the game can
+    be replayed with minesweeper_replay.Replay.
+
+    Parameters:
+        seed (int): Seed given to random before generating the board.
+        num_rows (int): Number of rows of the board.
+        num_cols (int): Number of columns of the board.
+        difficulty (str): Difficulty level or custom fraction.
+        exact (bool): Whether the solver uses solve_constraints().
+        log_path (str): Optional file to log the moves to.
+
+    Returns:
+        result (dict): 'seed', 'outcome' ('won', 'lost' or 'stuck'),
+                       'moves', 'unknown_left' and 'time' in seconds.
+
+    Examples:
+        >>> result = run_game(1, 9, 9, "EASY")
+        >>> result['outcome'], result['moves'] > 0
+        ('won', True)
+        >>> run_game(1, 9, 9, "EASY")['moves'] == result['moves']
+        True
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "game.moves")
+        >>> result = run_game(2, 9, 9, "MEDIUM", log_path=path)
+        >>> with minesweeper_replay.Replay(path) as replay:
+        ...     board = replay.board_at(len(replay))
+        ...     len(replay) == result['moves'], board.count_total('?')
+        (True, 7)
+        >>> result['outcome'], result['unknown_left']
+        ('stuck', 7)
+    """
+
+    random.seed(seed)
+    first_click = (num_rows // 2, num_cols // 2)
+    game_board, helper_board, num_mines = m.init_game(
+        difficulty, num_cols, num_rows, first_click)
+
+    result = play_game(game_board, helper_board, first_click, exact,
+                       log_path, num_mines)
+    return dict({'seed': seed}, **result)
+
+
+def play_game(game_board, helper_board, first_click, exact=False,
+              log_path=None, num_mines=None):
+    """
+    Let the solver play a game from a safe first click.
+
+    Parameters:
+        game_board (list): Visible board, all '?'.
+        helper_board (list): Board with mines and counts.
+        first_click (tuple): (row, col) of a cell without a mine.
+        exact (bool): Whether the solver uses solve_constraints().
+        log_path (str): Optional file to log the moves to (see
+                        minesweeper_replay.logged_clicks()).
+        num_mines (int): Total number of mines, written in the log.
+
+    Returns:
+        result (dict): 'outcome' ('won', 'lost' or 'stuck'), 'moves',
+                       'unknown_left' and 'time' in seconds.
+    """
+
+    def left_click(row, col):
+        m.reveal(helper_board, game_board, row, col)
+
+    def right_click(row, col):
+        m.flag(game_board, row, col)
+
+    log = None
+    if log_path is not None:
+        if num_mines is None:
+            num_mines = m.count_total(helper_board, -1)
+        log = minesweeper_replay.MoveLog(log_path, game_board, helper_board,
+                                         num_mines)
+        log.record(minesweeper_replay.REVEAL_CASCADE, first_click[0],
+                   first_click[1])
+        left_click, right_click = minesweeper_replay.logged_clicks(
+            log, left_click, right_click)
+
+    start = time.perf_counter()
+    moves = 1
+    try:
+        m.reveal(helper_board, game_board, first_click[0], first_click[1],
+                 cascade=True)
+        # Compact boards solve themselves on their codes, unless the
+        # clicks are logged
+        solve_method = getattr(game_board, 'solve', None)
+        if log is not None:
+            solve_method = None
+        if solve_method is not None:
+            solved = solve_method(helper_board, exact)
+        else:
+            solved = m.solve(game_board, left_click, right_click, exact)
+        moves += solved['left_clicks'] + solved['right_clicks']
+        outcome = 'won' if solved['status'] == 'solved' else 'stuck'
+    except AssertionError:
+        outcome = 'lost'
+    finally:
+        if log is not None:
+            log.close()
+    elapsed = time.perf_counter() - start
+
+    return {'outcome': outcome, 'moves': moves,
+            'unknown_left': m.count_total(game_board, '?'),
+            'time': elapsed}
+
+
+def run_fixture(path, exact=False):
+    """
+    Let the solver play a saved game, clicking first in the middle.
+
+    The file is opened without writing back to it (see
+    minesweeper_storage.load_game()), so the same fixture can be played
+    again.
+
+    Parameters:
+        path (str): Saved game written by minesweeper_storage.
+        exact (bool): Whether the solver uses solve_constraints().
+
+    Returns:
+        result (dict): Same as run_game(), with 'fixture' instead of
+                       'seed'.
+    """
+
+    game_board, helper_board, _, _ = minesweeper_storage.load_game(
+        path, writable=False)
+    first_click = (len(game_board) // 2, len(game_board[0]) // 2)
+
+    result = play_game(game_board, helper_board, first_click, exact)
+    return dict({'fixture': path}, **result)
+
+
+def run_games_numpy(seeds, num_rows, num_cols, difficulty):
+    """
+    Play a group of games at once with the batched NumPy solver.
+
+    The boards are the same as in run_game() for the same seeds, and so
+    are the results, except for 'time', which is the time of the whole
+    group divided by its number of games.
+
+    Parameters:
+        seeds (list): Seeds of the games to play.
+        num_rows (int): Number of rows of the boards.
+        num_cols (int): Number of columns of the boards.
+        difficulty (str): Difficulty level or custom fraction.
+
+    Returns:
+        results (list): One result like run_game()'s per seed.
+
+    Examples:
+        >>> [r['moves'] for r in run_games_numpy([1, 2], 9, 9, "EASY")] == [
+        ...     run_game(1, 9, 9, "EASY")['moves'],
+        ...     run_game(2, 9, 9, "EASY")['moves']]
+        True
+    """
+
+    import numpy as np
+    import minesweeper_numpy as mn
+
+    first_click = (num_rows // 2, num_cols // 2)
+    game_boards = []
+    helper_boards = []
+    for seed in seeds:
+        random.seed(seed)
+        game_board, helper_board, _ = mn.init_game_array(
+            difficulty, num_cols, num_rows, first_click)
+        game_boards.append(game_board)
+        helper_boards.append(helper_board)
+
+    game_boards = np.stack(game_boards)
+    helper_boards = np.stack(helper_boards)
+
+    start = time.perf_counter()
+    mn.reveal_cascade_batch(helper_boards, game_boards,
+                            first_click[0], first_click[1])
+    solved = mn.solve_batch(game_boards, helper_boards)
+    elapsed = (time.perf_counter() - start) / len(seeds)
+
+    unknown_left = np.count_nonzero(game_boards == m.UNKNOWN_CODE,
+                                    axis=(1, 2))
+
+    results = []
+    for k, seed in enumerate(seeds):
+        moves = (1 + int(solved['left_clicks'][k])
+                 + int(solved['right_clicks'][k]))
+        results.append({'seed': seed,
+                        'outcome': 'won' if solved['solved'][k] else 'stuck',
+                        'moves': moves,
+                        'unknown_left': int(unknown_left[k]),
+                        'time': elapsed})
+
+    return results
+
+
+def run_game_bitboard(seed, num_rows, num_cols, difficulty):
+    """
+    Play the same game as run_game() with the bitboard backend.
+
+    The board is drawn from the same random numbers as in run_game(), and
+    the solver steps reach the same board with the same clicks, so the
+    results are the same apart from 'time'. The numbers come from a
+    random.Random of the seed, so games don't share the random module.
+
+    Parameters:
+        seed (int): Seed of the random numbers of the board.
+        num_rows (int): Number of rows of the board.
+        num_cols (int): Number of columns of the board.
+        difficulty (str): Difficulty level or custom fraction.
+
+    Returns:
+        result (dict): Same as run_game().
+
+    Examples:
+        >>> result = run_game_bitboard(1, 9, 9, "EASY")
+        >>> result['moves'] == run_game(1, 9, 9, "EASY")['moves']
+        True
+        >>> random.seed(7)
+        >>> _ = run_game_bitboard(3, 9, 9, "MEDIUM")
+        >>> random.random() == random.Random(7).random()
+        True
+    """
+
+    import minesweeper_bitboard as mb
+
+    rng = random.Random(seed)
+    first_click = (num_rows // 2, num_cols // 2)
+    num_mines = m.get_num_mines(difficulty, num_cols, num_rows)
+
+    # Same excluded cells as init_game()
+    excluded = m.safe_zone(num_rows, num_cols, first_click[0], first_click[1])
+    if num_mines > num_rows * num_cols - len(excluded):
+        excluded = [first_click]
+    board = mb.generate_helper_board(num_rows, num_cols, num_mines, excluded,
+                                     rng)
+
+    start = time.perf_counter()
+    board.reveal_cascade(first_click[0], first_click[1])
+    solved = board.solve()
+    elapsed = time.perf_counter() - start
+
+    unknown_left = mb.popcount(board.full & ~(board.revealed | board.flags))
+    return {'seed': seed,
+            'outcome': 'won' if solved['status'] == 'solved' else 'stuck',
+            'moves': 1 + solved['left_clicks'] + solved['right_clicks'],
+            'unknown_left': unknown_left, 'time': elapsed}
+
+
+def run_batch(seeds, num_rows, num_cols, difficulty, exact=False,
+              workers=None, output=None, chunksize=64, backend='python'):
+    """
+    Play one game per seed across worker processes and sum up the results.
+
+    Each game only depends on its own seed, so the results don't depend
+    on the number of workers. They are written as one JSON line per game
+    as soon as they come back, in seed order.
+
+    Parameters:
+        seeds (iterable): Seeds of the games to play.
+        num_rows (int): Number of rows of the boards.
+        num_cols (int): Number of columns of the boards.
+        difficulty (str): Difficulty level or custom fraction.
+        exact (bool): Whether the solver uses solve_constraints().
+        workers (int): Number of processes, 1 to play in this process,
+                       None for one per core.
+        output (file): Where to write the JSON lines, or None.
+        chunksize (int): Number of games sent to a worker at once, which
+                         is also the size of a NumPy group.
+        backend (str): 'python' to play each game with solve(),
+                       'bitboard' to use run_game_bitboard(), or
+                       'numpy' to play groups with run_games_numpy().
+
+    Returns:
+        summary (dict): Number of games, wins, losses and stuck games,
+                        'win_rate', 'elapsed' time and 'games_per_second'.
+
+    Examples:
+        >>> summary = run_batch(range(4), 9, 9, "EASY", workers=1)
+        >>> summary['games'], summary['wins'] + summary['stuck']
+        (4, 4)
+    """
+
+    if backend == 'numpy':
+        if exact:
+            raise ValueError("The NumPy backend has no exact solver")
+
+        # Each task plays a whole group of seeds
+        play_one = partial(run_games_numpy, num_rows=num_rows,
+                           num_cols=num_cols, difficulty=difficulty)
+        seeds = list(seeds)
+        tasks = [seeds[i:i + chunksize]
+                 for i in range(0, len(seeds), chunksize)]
+        task_chunksize = 1
+    elif backend == 'bitboard':
+        if exact:
+            raise ValueError("The bitboard backend has no exact solver")
+
+        play_one = partial(run_game_bitboard, num_rows=num_rows,
+                           num_cols=num_cols, difficulty=difficulty)
+        tasks = seeds
+        task_chunksize = chunksize
+    else:
+        play_one = partial(run_game, num_rows=num_rows, num_cols=num_cols,
+                           difficulty=difficulty, exact=exact)
+        tasks = seeds
+        task_chunksize = chunksize
+
+    summary = {'games': 0, 'wins': 0, 'losses': 0, 'stuck': 0}
+    start = time.perf_counter()
+
+    if workers == 1:
+        results = map(play_one, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(play_one, tasks, chunksize=task_chunksize)
+
+    if backend == 'numpy':
+        results = (result for group in results for result in group)
+
+    try:
+        for result in results:
+            summary['games'] += 1
+            if result['outcome'] == 'won':
+                summary['wins'] += 1
+            elif result['outcome'] == 'lost':
+                summary['losses'] += 1
+            else:
+                summary['stuck'] += 1
+
+            if output is not None:
+                output.write(json.dumps(result) + "\n")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    summary['win_rate'] = summary['wins'] / max(summary['games'], 1)
+    summary['elapsed'] = elapsed
+    summary['games_per_second'] = summary['games'] / elapsed if elapsed else 0
+
+    return summary
+
+
+def main(argv=None):
+    """
+    Run a batch of games from the command line.
+
+    The per-game JSON lines go to --output (standard output by default)
+    and the summary is printed as JSON on standard error.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        None
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Measure the solver's win rate on generated boards.")
+    parser.add_argument("--start", type=int, default=0,
+                        help="first seed")
+    parser.add_argument("--count", type=int, default=1000,
+                        help="number of games (one seed each)")
+    parser.add_argument("--rows", type=int, default=16)
+    parser.add_argument("--cols", type=int, default=16)
+    parser.add_argument("--difficulty", default="EASY",
+                        help="EASY, MEDIUM, HARD or a fraction of mines")
+    parser.add_argument("--exact", action="store_true",
+                        help="use the exact constraint solver when stuck")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes (default: one per core)")
+    parser.add_argument("--output", default="-",
+                        help="JSON lines file, '-' for standard output")
+    parser.add_argument("--backend", choices=["python", "bitboard", "numpy"],
+                        default="python",
+                        help="bitboard uses integer bitsets, numpy plays "
+                             "groups of games at once")
+    parser.add_argument("--chunksize", type=int, default=64,
+                        help="games sent to a worker at once")
+    parser.add_argument("--fixtures", nargs="+", default=[],
+                        help="play these saved games instead of seeds "
+                             "(see minesweeper_storage)")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        # Saved games are played one after the other, in this process
+        if args.fixtures:
+            for path in args.fixtures:
+                output.write(json.dumps(run_fixture(path, args.exact))
+                             + "\n")
+            return
+
+        seeds = range(args.start, args.start + args.count)
+        summary = run_batch(seeds, args.rows, args.cols, args.difficulty,
+                            args.exact, args.workers, output,
+                            args.chunksize, args.backend)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
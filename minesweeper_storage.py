@@ -0,0 +1,225 @@
+import argparse
+import mmap
+import random
+import struct
+from array import array
+
+import minesweeper as m
+from minesweeper_board import Board
+
+
+# File layout: a fixed size header, then the helper board cells, then the
+# game board cells, one signed byte per cell, row by row. Helper cells are
+# -1 for mines and the neighbour counts otherwise, and game cells use the
+# codes from minesweeper (UNKNOWN_CODE, FLAG_CODE or the revealed number).
+MAGIC = b"MSWB"
+VERSION = 1
+
+# Magic, version, rows, cols, mines and seed (-1 when there is no seed),
+# padded so the cells start at a round offset
+HEADER = struct.Struct("<4sHxxQQQq")
+HEADER_SIZE = 64
+
+
+def encode_rows(board, game):
+    """
+    Get the cells of a board as bytes, one row at a time.
+
+    Parameters:
+        board (list): A list of lists board or a Board.
+        game (bool): True for a game board, False for a helper board.
+
+    Returns:
+        rows (generator): One bytes-like object per row (or per board).
+    """
+
+    # Compact boards already store the right bytes
+    if isinstance(board, Board):
+        yield board.cells
+        return
+
+    for row in board:
+        if game:
+            yield array('b', [m.encode_cell(value) for value in row])
+        else:
+            yield array('b', row)
+
+
+def save_game(path, game_board, helper_board, num_mines, seed=None):
+    """
+    Write both boards of a game to a file.
+
+    The boards can be list of lists boards or Boards. The file can be
+    opened again without reading it all with load_game().
+
+    Parameters:
+        path (str): File to write.
+        game_board (list): Visible board.
+        helper_board (list): Board with mines and counts.
+        num_mines (int): Total number of mines.
+        seed (int): Seed the board was made with, or None.
+
+    Returns:
+        None
+
+    Examples:
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "game.msw")
+        >>> save_game(path, [['?', '1']], [[-1, 1]], 1, seed=4)
+        >>> os.path.getsize(path) == HEADER_SIZE + 2 * 2
+        True
+    """
+
+    nb_rows = len(helper_board)
+    nb_cols = len(helper_board[0])
+
+    header = HEADER.pack(MAGIC, VERSION, nb_rows, nb_cols, num_mines,
+                         -1 if seed is None else seed)
+
+    with open(path, "wb") as output:
+        output.write(header.ljust(HEADER_SIZE, b"\0"))
+        for cells in encode_rows(helper_board, game=False):
+            output.write(cells)
+        for cells in encode_rows(game_board, game=True):
+            output.write(cells)
+
+
+def read_header(path):
+    """
+    Read the header of a saved game.
+
+    Parameters:
+        path (str): File written by save_game().
+
+    Returns:
+        header (dict): 'rows', 'cols', 'mines' and 'seed' (or None).
+
+    Raises:
+        ValueError: If the file isn't a saved game of this version.
+    """
+
+    with open(path, "rb") as saved:
+        data = saved.read(HEADER_SIZE)
+
+    if len(data) < HEADER_SIZE:
+        raise ValueError(path + " is too short to be a saved game")
+
+    magic, version, nb_rows, nb_cols, num_mines, seed = (
+        HEADER.unpack_from(data))
+    if magic != MAGIC:
+        raise ValueError(path + " is not a saved game")
+    if version != VERSION:
+        raise ValueError("Unsupported saved game version " + str(version))
+
+    return {'rows': nb_rows, 'cols': nb_cols, 'mines': num_mines,
+            'seed': None if seed == -1 else seed}
+
+
+def load_game(path, writable=True):
+    """
+    Open a saved game through a memory map, without reading the cells.
+
+    The boards are Boards whose cells are views on the mapped file, so
+    opening takes the same time for any size and only the parts of the
+    file that are used get read. When writable, moves on the game board
+    are written straight to the file (see sync_game()). Otherwise the
+    boards can still be played on, but the changes stay in memory.
+
+    Parameters:
+        path (str): File written by save_game().
+        writable (bool): Whether changes are written back to the file.
+
+    Returns:
+        game_board (Board): Visible board.
+        helper_board (Board): Board with mines and counts.
+        num_mines (int): Total number of mines.
+        seed (int): Seed the board was made with, or None.
+
+    Raises:
+        ValueError: If the file isn't a saved game or is cut short.
+
+    Examples:
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "game.msw")
+        >>> save_game(path, [['?', '?']], [[-1, 1]], 1, seed=4)
+        >>> g, h, n, seed = load_game(path)
+        >>> m.reveal(h, g, 0, 1)
+        >>> sync_game(g)
+        >>> g, h, n, seed = load_game(path, writable=False)
+        >>> g.to_lists(), h.to_lists(), n, seed
+        ([['?', '1']], [[-1, 1]], 1, 4)
+    """
+
+    header = read_header(path)
+    nb_rows = header['rows']
+    nb_cols = header['cols']
+    size = nb_rows * nb_cols
+
+    mode = "r+b" if writable else "rb"
+    access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_COPY
+    with open(path, mode) as saved:
+        mapped = mmap.mmap(saved.fileno(), 0, access=access)
+
+    if len(mapped) < HEADER_SIZE + 2 * size:
+        mapped.close()
+        raise ValueError(path + " is cut short")
+
+    # The views keep the map open for as long as the boards are used
+    cells = memoryview(mapped).cast('b')
+    helper_board = Board(nb_rows, nb_cols, game=False,
+                         cells=cells[HEADER_SIZE:HEADER_SIZE + size])
+    game_board = Board(nb_rows, nb_cols, game=True,
+                       cells=cells[HEADER_SIZE + size:HEADER_SIZE + 2 * size])
+
+    return game_board, helper_board, header['mines'], header['seed']
+
+
+def sync_game(game_board):
+    """
+    Make sure the moves played on a loaded game board are on disk.
+
+    Parameters:
+        game_board (Board): Game board returned by load_game().
+
+    Returns:
+        None
+    """
+
+    game_board.cells.obj.flush()
+
+
+def main(argv=None):
+    """
+    Write a saved game from the command line, to use as a fixture.
+
+    The board is made like the simulation does: the random generator is
+    seeded and the mines are placed away from the middle cell, which is
+    where the benchmark and the simulation click first.
+
+    Parameters:
+        argv (list): Command line arguments, or None for sys.argv.
+
+    Returns:
+        None
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Generate a Minesweeper board and save it to a file.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--cols", type=int, default=1000)
+    parser.add_argument("--difficulty", default="EASY",
+                        help="EASY, MEDIUM, HARD or a fraction of mines")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    game_board, helper_board, num_mines = m.init_game(
+        args.difficulty, args.cols, args.rows,
+        (args.rows // 2, args.cols // 2))
+
+    save_game(args.path, game_board, helper_board, num_mines, args.seed)
+
+
+if __name__ == "__main__":
+    main()
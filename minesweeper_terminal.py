@@ -0,0 +1,184 @@
+import sys
+
+
+# ANSI escape sequences used by the renderer
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_LINE = "\x1b[2K"
+CLEAR_BELOW = "\x1b[J"
+
+
+def move_cursor(line, column):
+    """
+    Get the escape sequence that moves the cursor to a screen position.
+
+    Parameters:
+        line (int): Screen line, starting at 1.
+        column (int): Screen column, starting at 1.
+
+    Returns:
+        sequence (str): The ANSI cursor position sequence.
+
+    Examples:
+        >>> move_cursor(3, 10)
+        '\\x1b[3;10H'
+    """
+
+    return "\x1b[" + str(line) + ";" + str(column) + "H"
+
+
+class ViewportRenderer:
+    """
+    Draw a window of a big board in the terminal and update it in place.
+
+    Only height x width cells around the last move are shown, with row and
+    column numbers around them. After the first frame, only the cells that
+    changed are drawn again, by moving the cursor to them, so a turn costs
+    as much as the window or the changes, never the whole board. The
+    window only moves (and is fully redrawn) when a move falls outside it.
+
+    Examples:
+        >>> import io
+        >>> out = io.StringIO()
+        >>> board = [['?'] * 100 for _ in range(100)]
+        >>> view = ViewportRenderer(board, 5, 5, out)
+        >>> view.render(focus=(50, 50))
+        >>> view.top, view.left
+        (48, 48)
+        >>> board[50][51] = '3'
+        >>> view.file = io.StringIO()
+        >>> view.render([(50, 51), (0, 0)], focus=(50, 51))
+        >>> CLEAR_SCREEN in view.file.getvalue(), len(view.file.getvalue())
+        (False, 29)
+    """
+
+    def __init__(self, board, height=20, width=40, file=None):
+        """
+        Create a renderer for a board.
+
+        Parameters:
+            board (list): The game board to draw.
+            height (int): Number of rows shown at once.
+            width (int): Number of columns shown at once.
+            file (file): Where to write, the console by default.
+        """
+
+        self.board = board
+        self.nb_rows = len(board)
+        self.nb_cols = len(board[0])
+        self.height = min(height, self.nb_rows)
+        self.width = min(width, self.nb_cols)
+        self.file = file if file is not None else sys.stdout
+
+        # Width of the row numbers and of each cell on screen
+        self.ruler_width = len(str(self.nb_rows - 1)) + 1
+        self.cell_width = max(len(str(self.nb_cols - 1)), 1) + 1
+
+        # Top-left board cell of the window, None before the first frame
+        self.top = None
+        self.left = None
+
+    def contains(self, row, col):
+        """
+        Check if a board cell is inside the window.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            inside (bool): True if the cell is currently shown.
+        """
+
+        return (self.top is not None
+                and self.top <= row < self.top + self.height
+                and self.left <= col < self.left + self.width)
+
+    def center_on(self, row, col):
+        """
+        Move the window so a cell is in its middle, within the board.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            None
+        """
+
+        self.top = min(max(row - self.height // 2, 0),
+                       self.nb_rows - self.height)
+        self.left = min(max(col - self.width // 2, 0),
+                        self.nb_cols - self.width)
+
+    def cell_text(self, row, col):
+        """
+        Get the escape sequence and text that draw one cell in place.
+
+        Parameters:
+            row (int): Row index of a cell inside the window.
+            col (int): Column index of a cell inside the window.
+
+        Returns:
+            text (str): Cursor move followed by the padded cell value.
+        """
+
+        line = row - self.top + 3
+        column = self.ruler_width + (col - self.left) * self.cell_width + 1
+        return (move_cursor(line, column)
+                + str(self.board[row][col]).rjust(self.cell_width))
+
+    def frame_text(self):
+        """
+        Get the text of the whole window with its rulers.
+
+        Returns:
+            text (str): Escape sequences and text of the full window.
+        """
+
+        parts = [CLEAR_SCREEN, move_cursor(2, 1), " " * self.ruler_width]
+        for col in range(self.left, self.left + self.width):
+            parts.append(str(col).rjust(self.cell_width))
+
+        for row in range(self.top, self.top + self.height):
+            parts.append(move_cursor(row - self.top + 3, 1))
+            parts.append(str(row).rjust(self.ruler_width - 1) + " ")
+            board_row = self.board[row]
+            for col in range(self.left, self.left + self.width):
+                parts.append(str(board_row[col]).rjust(self.cell_width))
+
+        return "".join(parts)
+
+    def render(self, changed=(), focus=None, status=""):
+        """
+        Draw the changes of the last move, with one write to the terminal.
+
+        Parameters:
+            changed (list): (row, col) pairs of the cells that changed.
+            focus (tuple): (row, col) of the last move, or None.
+            status (str): Text shown on the first line.
+
+        Returns:
+            None
+        """
+
+        parts = []
+
+        # Move the window and redraw it all, or only draw the changes
+        if self.top is None or (focus is not None
+                                and not self.contains(focus[0], focus[1])):
+            if focus is None:
+                focus = (0, 0)
+            self.center_on(focus[0], focus[1])
+            parts.append(self.frame_text())
+        else:
+            for row, col in changed:
+                if self.contains(row, col):
+                    parts.append(self.cell_text(row, col))
+
+        parts.append(move_cursor(1, 1) + CLEAR_LINE + status)
+
+        # Leave the cursor under the window for the next prompts
+        parts.append(move_cursor(self.height + 3, 1) + CLEAR_BELOW)
+
+        self.file.write("".join(parts))
+        self.file.flush()
@@ -1,41 +1,294 @@
+import random
+import sys
+import time
+
 import minesweeper as m
 
-def test_bot(helper_board, game_board):
+# States of the cells kept by the Referee
+UNKNOWN = 0
+REVEALED = 1
+FLAGGED = 2
+
+class Referee:
+    """
+    Check every click of a bot and keep the counts to judge it.
+
+    The referee keeps its own state of every cell, one byte each, and
+    only writes the results on the game board for the bot to see. Each
+    click is checked and counted in constant time against that state,
+    so the board is never copied or scanned again, whatever its size.
+    A bot writing on the game board itself changes nothing for the
+    referee, so it can't win that way.
+
+    Examples:
+        >>> referee = Referee([[0, 1], [-1, 1]], [['?', '?'], ['?', '?']])
+        >>> referee.left_click(0, 0)
+        >>> referee.left_click(0, 0)
+        Traceback (most recent call last):
+        ...
+        ValueError: Cell (0, 0) is already revealed
+        >>> verdict = referee.verdict()
+        >>> verdict['status'], verdict['error'], verdict['revealed']
+        ('invalid', 'Cell (0, 0) is already revealed', 1)
+
+        Hiding a revealed cell again doesn't count it twice:
+
+        >>> g = [['?', '?'], ['?', '?']]
+        >>> referee = Referee([[0, 1], [-1, 1]], g)
+        >>> for _ in range(3):
+        ...     try:
+        ...         referee.left_click(0, 0)
+        ...     except ValueError:
+        ...         pass
+        ...     g[0][0] = '?'
+        >>> referee.right_click(1, 0)
+        Traceback (most recent call last):
+        ...
+        ValueError: The game is over
+        >>> verdict = referee.verdict()
+        >>> verdict['status'], verdict['revealed'], verdict['unknown']
+        ('invalid', 1, 3)
+    """
+
+    def __init__(self, helper_board, game_board, total_mines=None,
+                 fresh=False):
+        """
+        Start refereeing a game, reading the cells of the board once.
+
+        Parameters:
+            helper_board (list): Board with mines and counts.
+            game_board (list): Visible board the bot plays on.
+            total_mines (int): Number of mines, counted if not given.
+            fresh (bool): Whether the game board is known to be all '?',
+                          which skips the only scan.
+        """
+
+        if total_mines is None:
+            total_mines = m.count_total(helper_board, -1)
+
+        self.helper_board = helper_board
+        self.game_board = game_board
+        self.total_mines = total_mines
+        self.nb_rows = len(game_board)
+        self.nb_cols = len(game_board[0])
+
+        #state of every cell, by row * nb_cols + col, never shown to the bot
+        self.cells = bytearray(self.nb_rows * self.nb_cols)
+        self.revealed = 0
+        self.flags = 0
+        if not fresh:
+            for i in range(self.nb_rows):
+                for j in range(self.nb_cols):
+                    value = game_board[i][j]
+                    if value == '⚑':
+                        self.cells[i * self.nb_cols + j] = FLAGGED
+                        self.flags += 1
+                    elif value != '?':
+                        self.cells[i * self.nb_cols + j] = REVEALED
+                        self.revealed += 1
+
+        self.left_clicks = 0
+        self.right_clicks = 0
+        self.lost = False
+        self.error = None
+
+        #time spent checking and playing the clicks, the rest is the bot
+        self.referee_time = 0.0
+        self.start_time = time.perf_counter()
+
+    def invalid(self, message):
+        """
+        Stop the game because of a move that can't be played.
+
+        Parameters:
+            message (str): What was wrong with the move.
+
+        Returns:
+            None
+        """
+
+        if self.error is None:
+            self.error = message
+        raise ValueError(message)
+
+    def check_move(self, row, col):
+        """
+        Make sure the game goes on and the cell is on the board.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            index (int): Position of the cell in the referee's state.
+        """
+
+        if self.lost or self.error is not None:
+            self.invalid("The game is over")
+        if not (0 <= row < self.nb_rows and 0 <= col < self.nb_cols):
+            self.invalid("Position " + str((row, col))
+                         + " is out of the board")
+
+        return row * self.nb_cols + col
+
+    def left_click(self, row, col):
+        """
+        Check and play a reveal.
+
+        Parameters:
+            row (int): Row index to reveal.
+            col (int): Column index to reveal.
+
+        Returns:
+            None
+        """
+
+        start = time.perf_counter()
+        try:
+            index = self.check_move(row, col)
+            state = self.cells[index]
+            if state == REVEALED:
+                self.invalid("Cell " + str((row, col))
+                             + " is already revealed")
+            self.left_clicks += 1
+
+            value = self.helper_board[row][col]
+            if value == -1:
+                self.lost = True
+                raise AssertionError("BOOM! You lost.")
+
+            if state == FLAGGED:
+                self.flags -= 1
+            self.cells[index] = REVEALED
+            self.revealed += 1
+            self.game_board[row][col] = str(value)
+        finally:
+            self.referee_time += time.perf_counter() - start
+
+    def right_click(self, row, col):
+        """
+        Check and play a flag switch.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            None
+        """
+
+        start = time.perf_counter()
+        try:
+            index = self.check_move(row, col)
+            state = self.cells[index]
+            if state == REVEALED:
+                self.invalid("Can't flag the revealed cell "
+                             + str((row, col)))
+            self.right_clicks += 1
+
+            if state == FLAGGED:
+                self.cells[index] = UNKNOWN
+                self.flags -= 1
+                self.game_board[row][col] = '?'
+            else:
+                self.cells[index] = FLAGGED
+                self.flags += 1
+                self.game_board[row][col] = '⚑'
+        finally:
+            self.referee_time += time.perf_counter() - start
+
+    def verdict(self):
+        """
+        Judge the game from the referee's own counts.
+
+        Like the old check, the bot only wins when no cell is left
+        unknown and there are as many flags as mines. Since every
+        revealed cell is safe, the flags are then exactly on the mines.
+
+        Returns:
+            verdict (dict): 'status' ('won', 'lost', 'invalid' or
+                            'incomplete'), the 'error' if any, the clicks
+                            and cell counts, and the 'elapsed', 'bot_time'
+                            and 'referee_time' in seconds.
+        """
+
+        elapsed = time.perf_counter() - self.start_time
+        unknown = self.nb_rows * self.nb_cols - self.revealed - self.flags
+
+        if self.lost:
+            status = 'lost'
+        elif self.error is not None:
+            status = 'invalid'
+        elif unknown == 0 and self.flags == self.total_mines:
+            status = 'won'
+        else:
+            status = 'incomplete'
+
+        return {'status': status, 'error': self.error,
+                'left_clicks': self.left_clicks,
+                'right_clicks': self.right_clicks,
+                'revealed': self.revealed, 'flags': self.flags,
+                'unknown': unknown, 'mines': self.total_mines,
+                'elapsed': elapsed,
+                'bot_time': elapsed - self.referee_time,
+                'referee_time': self.referee_time}
+
+def test_bot(helper_board, game_board, render='full', fresh=False):
+    #render picks what gets printed while the bot plays:
+    #'full' prints the whole board after every click (slow on big boards),
+    #'diff' prints only the cell changed by each click,
+    #'quiet' prints only the final board,
+    #'none' prints only the result
+    #fresh skips the first count of a game board that is all '?'
+    
+    referee = Referee(helper_board, game_board, fresh=fresh) #cheat prevention
     
-    total_mines = m.count_total(helper_board, -1)
-    private_board = [] #cheat prevention
-    for row in game_board: #deep copy
-        tmp = []
-        for value in row:
-            tmp.append(value)
-        private_board.append(tmp)
+    def show_click(row, col):
+        if render == 'full':
+            print('Current Board:')
+            m.print_board(game_board)
+        elif render == 'diff':
+            m.print_changes(game_board, [(row, col)])
         
     def left_click(row, col):
-        #tip: consider raising an error here if (row, col) is not a valid cell
-        m.reveal(helper_board, private_board, row, col) #for verification
-        m.reveal(helper_board, game_board, row, col) #for the bot
-        print('Current Board:')
-        m.print_board(game_board)
+        referee.left_click(row, col) #checked, then played for the bot
+        show_click(row, col)
         
     def right_click(row, col):
-        #tip: consider raising an error here if (row, col) is not a valid cell
-        m.flag(private_board, row, col) #for verification
-        m.flag(game_board, row, col) #for the bot
+        referee.right_click(row, col) #checked, then played for the bot
+        show_click(row, col)
+    
+    if render not in ('quiet', 'none'):
         print('Current Board:')
         m.print_board(game_board)
+    try:
+        m.solve(game_board, left_click, right_click)
+    except (AssertionError, ValueError):
+        pass #the referee knows what went wrong
+    if render not in ('full', 'none'):
+        print('Final Board:')
+        m.print_board(game_board)
     
-    print('Current Board:')
-    m.print_board(game_board)
-    m.solve(game_board, left_click, right_click)
-    
-    if m.count_total(private_board, '?') == 0 and \
-       m.count_total(private_board, '⚑') == total_mines:
+    verdict = referee.verdict()
+    if verdict['status'] == 'won':
         #IMPORTANT: in play(), we do not need all mines to be flagged to win,
-        #but we do when testing the bot,
-        #so you will need to modify this condition for play()
+        #but we do when testing the bot (see Referee.verdict())
         print('Congratulations! You won!')
     else:
         print('Bad Bot :(')
+    return verdict
+        
+def bot_on_generated_board(size, difficulty='EASY', seed=0,
+                           render='none'):
+    #plays the bot on a generated square board, from a safe cascade click
+    #in the middle, with the neighbour counts computed only when read
+    random.seed(seed)
+    first_click = (size // 2, size // 2)
+    game_board, helper_board, _ = m.init_game(difficulty, size, size,
+                                              first_click, lazy=True)
+    m.reveal(helper_board, game_board, first_click[0], first_click[1],
+             cascade=True)
+    return test_bot(helper_board, game_board, render)
         
 BOT_TEST_1 = [[[1, -1, 1, 1, 1],
                [1, 1, 1, 2, -1],
@@ -51,4 +304,13 @@ BOT_TEST_1 = [[[1, -1, 1, 1, 1],
 #test_bot(BOT_TEST_1[0], BOT_TEST_1[1])
 
 if __name__ == '__main__':
-    test_bot(BOT_TEST_1[0], BOT_TEST_1[1])
\ No newline at end of file
+    #usage: python minesweeper_testing.py [full|diff|quiet|none]
+    #       python minesweeper_testing.py none SIZE [DIFFICULTY [SEED]]
+    if len(sys.argv) > 2:
+        print(bot_on_generated_board(int(sys.argv[2]),
+                                 sys.argv[3] if len(sys.argv) > 3 else 'EASY',
+                                 int(sys.argv[4]) if len(sys.argv) > 4 else 0,
+                                 sys.argv[1]))
+    else:
+        test_bot(BOT_TEST_1[0], BOT_TEST_1[1],
+                 sys.argv[1] if len(sys.argv) > 1 else 'full')
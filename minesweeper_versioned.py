@@ -0,0 +1,328 @@
+# Number of rows in one block of a VersionedBoard
+BLOCK_ROWS = 32
+
+
+class VersionedBoard:
+    """
+    A game board whose snapshots share every row they have in common.
+
+    The rows are grouped in blocks of BLOCK_ROWS rows, and the board is a
+    list of those blocks. snapshot() gives away the current list without
+    copying anything, and from then on the board copies what it writes
+    to: the list of blocks, the block, and the row of the written cell.
+    Each of those is copied only once per snapshot, so a move costs about
+    one row and one block, and the memory used grows with the number of
+    rows changed, not with the number of snapshots.
+
+    restore() and branch() go back to, or start from, a snapshot in
+    constant time, which is what undo, redo and lookahead need.
+
+    board[row][col] reads and writes cells like the list of lists boards,
+    so flag(), reveal(), reveal_cascade() and the solver work with it.
+
+    Examples:
+        >>> board = VersionedBoard([['?', '?'], ['?', '?']])
+        >>> before = board.snapshot()
+        >>> board[0][1] = '1'
+        >>> what_if = board.branch()
+        >>> what_if[1][1] = '⚑'
+        >>> board.to_lists(), what_if.to_lists()
+        ([['?', '1'], ['?', '?']], [['?', '1'], ['?', '⚑']])
+        >>> board.restore(before)
+        >>> board.to_lists()
+        [['?', '?'], ['?', '?']]
+    """
+
+    def __init__(self, board, block_rows=BLOCK_ROWS):
+        """
+        Create a versioned board with a copy of a list of lists board.
+
+        Parameters:
+            board (list): The board to start from.
+            block_rows (int): Number of rows in one block.
+        """
+
+        self.nb_rows = len(board)
+        self.nb_cols = len(board[0])
+        self.block_rows = block_rows
+
+        self.blocks = [[list(row) for row in board[start:start + block_rows]]
+                       for start in range(0, self.nb_rows, block_rows)]
+
+        # What was copied since the last snapshot, and can be written to
+        self.own_blocks_list = True
+        self.owned_blocks = set()
+        self.owned_rows = set()
+
+        # Number of rows copied so far, to see the memory used
+        self.row_copies = 0
+
+    def __len__(self):
+        return self.nb_rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.nb_rows:
+            raise IndexError("board row out of range")
+        return _VersionedRow(self, row)
+
+    def get(self, row, col):
+        """
+        Read a cell.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+
+        Returns:
+            value (str): The cell.
+        """
+
+        return self.blocks[row // self.block_rows][row % self.block_rows][col]
+
+    def set(self, row, col, value):
+        """
+        Write a cell, copying its row and block first if they are shared.
+
+        Parameters:
+            row (int): Row index of the cell.
+            col (int): Column index of the cell.
+            value (str): The new value.
+
+        Returns:
+            None
+        """
+
+        block_index, inner_row = divmod(row, self.block_rows)
+
+        if not self.own_blocks_list:
+            self.blocks = list(self.blocks)
+            self.own_blocks_list = True
+
+        block = self.blocks[block_index]
+        if block_index not in self.owned_blocks:
+            block = list(block)
+            self.blocks[block_index] = block
+            self.owned_blocks.add(block_index)
+
+        cells = block[inner_row]
+        if row not in self.owned_rows:
+            cells = list(cells)
+            block[inner_row] = cells
+            self.owned_rows.add(row)
+            self.row_copies += 1
+
+        cells[col] = value
+
+    def snapshot(self):
+        """
+        Freeze the current board, in constant time.
+
+        Returns:
+            snapshot (list): The blocks of the board, to give to restore()
+                             or branch(). It must not be changed.
+        """
+
+        self.own_blocks_list = False
+        self.owned_blocks = set()
+        self.owned_rows = set()
+
+        return self.blocks
+
+    def restore(self, snapshot):
+        """
+        Go back to a snapshot, in constant time.
+
+        Parameters:
+            snapshot (list): What snapshot() returned, on this board or on
+                             a board of the same size.
+
+        Returns:
+            None
+        """
+
+        self.blocks = snapshot
+        self.own_blocks_list = False
+        self.owned_blocks = set()
+        self.owned_rows = set()
+
+    def branch(self):
+        """
+        Get a separate board starting from this one, in constant time.
+
+        Moves played on either board don't show on the other one, which
+        is what a solver needs to try a move and look ahead.
+
+        Returns:
+            board (VersionedBoard): The new board.
+        """
+
+        board = VersionedBoard.__new__(VersionedBoard)
+        board.nb_rows = self.nb_rows
+        board.nb_cols = self.nb_cols
+        board.block_rows = self.block_rows
+        board.row_copies = 0
+        board.restore(self.snapshot())
+
+        return board
+
+    def count_total(self, value):
+        """
+        Count the cells with a value, see count_total().
+
+        Parameters:
+            value (str): The value to count.
+
+        Returns:
+            count (int): Number of cells with that value.
+        """
+
+        count = 0
+        for block in self.blocks:
+            for cells in block:
+                count += cells.count(value)
+        return count
+
+    def to_lists(self):
+        """
+        Get a copy of the board as a list of lists.
+
+        Returns:
+            board (list): The board.
+        """
+
+        return [list(cells) for block in self.blocks for cells in block]
+
+
+class _VersionedRow:
+    __slots__ = ('board', 'row')
+
+    def __init__(self, board, row):
+        self.board = board
+        self.row = row
+
+    def __len__(self):
+        return self.board.nb_cols
+
+    def __iter__(self):
+        return iter(self.board.blocks[self.row // self.board.block_rows]
+                    [self.row % self.board.block_rows])
+
+    def __getitem__(self, col):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        return self.board.get(self.row, col)
+
+    def __setitem__(self, col, value):
+        if not 0 <= col < self.board.nb_cols:
+            raise IndexError("board column out of range")
+        self.board.set(self.row, col, value)
+
+
+class History:
+    """
+    Undo and redo for a GameState played on a VersionedBoard.
+
+    Each entry is a snapshot of the board with the counts of the state,
+    so going back and forth takes constant time.
+
+    Examples:
+        >>> import minesweeper as m
+        >>> board = VersionedBoard(m.init_board(2, 2, '?'))
+        >>> state = m.GameState(board, [[0, 1], [-1, 1]], 1)
+        >>> history = History(state)
+        >>> history.record()
+        >>> state.reveal(0, 0)
+        [(0, 0)]
+        >>> history.undo(), board.to_lists(), state.revealed
+        (True, [['?', '?'], ['?', '?']], 0)
+        >>> history.redo(), board.to_lists(), state.revealed
+        (True, [['0', '?'], ['?', '?']], 1)
+        >>> history.redo()
+        False
+    """
+
+    def __init__(self, state):
+        """
+        Start an empty history.
+
+        Parameters:
+            state (GameState): The game, whose game board is a
+                               VersionedBoard.
+        """
+
+        self.state = state
+        self.undo_entries = []
+        self.redo_entries = []
+
+    def capture(self):
+        """
+        Get an entry for the current board and counts.
+
+        Returns:
+            entry (tuple): Snapshot, counts and helper board.
+        """
+
+        state = self.state
+        return (state.game_board.snapshot(), state.flags, state.revealed,
+                state.safe_left, state.helper_board)
+
+    def apply(self, entry):
+        """
+        Put the board and counts of an entry back.
+
+        Parameters:
+            entry (tuple): What capture() returned.
+
+        Returns:
+            None
+        """
+
+        state = self.state
+        snapshot, flags, revealed, safe_left, helper_board = entry
+        state.game_board.restore(snapshot)
+
+        # The counts of safe cells changed if the mines were placed since
+        if helper_board is state.helper_board:
+            state.flags, state.revealed, state.safe_left = (
+                flags, revealed, safe_left)
+        else:
+            state.recount()
+
+    def record(self):
+        """
+        Remember the game before a move, which clears the moves to redo.
+
+        Returns:
+            None
+        """
+
+        self.undo_entries.append(self.capture())
+        self.redo_entries = []
+
+    def undo(self):
+        """
+        Go back one move.
+
+        Returns:
+            done (bool): False if there was no move to undo.
+        """
+
+        if not self.undo_entries:
+            return False
+        self.redo_entries.append(self.capture())
+        self.apply(self.undo_entries.pop())
+        return True
+
+    def redo(self):
+        """
+        Play again the last move undone.
+
+        Returns:
+            done (bool): False if there was no move to redo.
+        """
+
+        if not self.redo_entries:
+            return False
+        self.undo_entries.append(self.capture())
+        self.apply(self.redo_entries.pop())
+        return True